@@ -0,0 +1,21 @@
+"""Benchmarks of errorgeopy, in the style of airspeed velocity (asv). Each
+benchmark class is parameterised over the size of its synthetic input;
+:code:`time_` methods report run time, and :code:`peakmem_` methods the peak
+memory of the process running them.
+
+To compare the current working tree against the last commit, offline, in the
+current environment::
+
+    asv run --environment existing --quick
+    asv continuous --environment existing HEAD~1 HEAD
+
+To track performance across commits (building a virtualenv per commit)::
+
+    asv run master~10..master
+    asv compare master~1 master
+
+Benchmarks of inputs that the current implementations cannot handle in
+reasonable time or memory are skipped (see :code:`benchmarks.common.skip`).
+
+.. moduleauthor Richard Law <richard.m.law@gmail.com>
+"""
@@ -0,0 +1,21 @@
+"""Benchmarks of `errorgeopy.address.Address`.
+"""
+
+from benchmarks.common import ADDRESSES, address, skip
+
+
+class Dedupe(object):
+    params = ADDRESSES
+    param_names = ['addresses']
+    timeout = 600
+
+    def setup(self, n):
+        # Quadratic; takes tens of seconds from 1,000 addresses
+        skip(n > 1000)
+        self.address = address(n)
+
+    def time_dedupe(self, n):
+        self.address.dedupe()
+
+    def peakmem_dedupe(self, n):
+        self.address.dedupe()
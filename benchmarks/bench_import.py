@@ -0,0 +1,27 @@
+"""Benchmarks of the time taken to import errorgeopy, each in a fresh
+interpreter. Short-lived workers pay this on every start, so the scientific
+libraries are only imported when first needed.
+"""
+
+
+def timeraw_import_errorgeopy():
+    return "import errorgeopy"
+
+
+def timeraw_import_geocoders():
+    return "import errorgeopy.geocoders"
+
+
+def timeraw_import_geocoders_and_pool():
+    return "from errorgeopy.geocoders import GeocoderPool; GeocoderPool()"
+
+
+def timeraw_import_utils_and_cluster():
+    return """
+    import geopy
+    from errorgeopy.location import Location
+    Location([
+        geopy.Location(str(i), geopy.Point(-41.29 + i / 100, 174.78), {})
+        for i in range(5)
+    ]).convex_hull
+    """
@@ -0,0 +1,71 @@
+"""Benchmarks of `errorgeopy.location.Location` geometry and clustering.
+"""
+
+from errorgeopy import utils
+from errorgeopy.location import Location, batch_metrics
+
+from benchmarks.common import POINTS, ROWS, batch, location, skip
+
+
+class ConcaveHull(object):
+    params = POINTS
+    param_names = ['points']
+    timeout = 600
+
+    def setup(self, n):
+        self.location = location(n)
+
+    def time_concave_hull(self, n):
+        self.location.concave_hull
+
+    def peakmem_concave_hull(self, n):
+        self.location.concave_hull
+
+
+class MinimumBoundingCircle(object):
+    params = POINTS
+    param_names = ['points']
+    timeout = 300
+
+    def setup(self, n):
+        self.location = location(n)
+
+    def time_mbc(self, n):
+        self.location.mbc
+
+    def peakmem_mbc(self, n):
+        self.location.mbc
+
+
+class DBSCAN(object):
+    params = POINTS
+    param_names = ['points']
+    timeout = 300
+
+    def setup(self, n):
+        # The dense (n, n) distance matrices need gigabytes from 10,000 points
+        skip(n > 1000)
+        self.location = location(n)
+
+    def time_dbscan(self, n):
+        utils.dbscan(self.location, Location)
+
+    def peakmem_dbscan(self, n):
+        utils.dbscan(self.location, Location)
+
+
+class BatchMetrics(object):
+    params = ROWS
+    param_names = ['rows']
+    timeout = 300
+
+    def setup(self, n):
+        self.batch = batch(n)
+
+    def time_batch_metrics(self, n):
+        self.batch._cache.clear()
+        batch_metrics(self.batch)
+
+    def peakmem_batch_metrics(self, n):
+        self.batch._cache.clear()
+        batch_metrics(self.batch)
@@ -0,0 +1,72 @@
+"""Benchmarks of `errorgeopy.geocoders.GeocoderPool` queries, against fake
+in-process geocoders (measuring the pool's own overhead) and end-to-end against
+a `errorgeopy.mockserver.MockGeocodingServer`.
+"""
+
+import geopy
+
+from errorgeopy.geocoders import GeocoderPool
+from errorgeopy.mockserver import MockGeocodingServer
+
+from benchmarks.common import points
+
+
+class FakeGeocoder(geopy.geocoders.base.Geocoder):
+    """Answers every query at once with a fixed set of candidates."""
+
+    def __init__(self, candidates, seed=0):
+        super(FakeGeocoder, self).__init__()
+        self.seed = seed
+        self.candidates = [
+            geopy.Location('Candidate {}'.format(i), geopy.Point(lat, lon), {})
+            for i, (lat, lon) in enumerate(points(candidates, seed=seed))
+        ]
+
+    def geocode(self, query, **kwargs):
+        return self.candidates
+
+
+class PoolFanOut(object):
+    params = ([1, 4, 16], [5, 1000])
+    param_names = ['providers', 'candidates']
+
+    def setup(self, providers, candidates):
+        # Each provider is a distinct instance (with its own candidates), so
+        # every one is queried rather than coalesced into a single call
+        self.pool = GeocoderPool(geocoders=[
+            FakeGeocoder(candidates, seed=i) for i in range(providers)
+        ])
+
+    def teardown(self, providers, candidates):
+        self.pool.close()
+
+    def time_geocode(self, providers, candidates):
+        self.pool.geocode('Oriental Bay, Wellington')
+
+    def time_geocode_many(self, providers, candidates):
+        for _ in self.pool.geocode_many(
+                'Query {}'.format(i) for i in range(100)):
+            pass
+
+    def peakmem_geocode_many(self, providers, candidates):
+        for _ in self.pool.geocode_many(
+                'Query {}'.format(i) for i in range(100)):
+            pass
+
+
+class PoolMockServer(object):
+    params = [1, 100]
+    param_names = ['queries']
+
+    def setup(self, queries):
+        self.server = MockGeocodingServer(candidates=5, seed=0).start()
+        self.pool = GeocoderPool(geocoders=self.server.geocoders())
+        self.queries = ['Query {}'.format(i) for i in range(queries)]
+
+    def teardown(self, queries):
+        self.pool.close()
+        self.server.stop()
+
+    def time_geocode_many(self, queries):
+        for _ in self.pool.geocode_many(self.queries):
+            pass
@@ -0,0 +1,96 @@
+"""Synthetic inputs for the benchmarks. Everything is generated from fixed
+seeds, so that results are comparable across commits.
+"""
+
+import numpy as np
+import geopy
+
+from errorgeopy.location import Location, LocationBatch
+from errorgeopy.address import Address
+
+#: Numbers of candidate points in synthetic `errorgeopy.location.Location`s.
+POINTS = [5, 100, 1000, 10000, 100000]
+
+#: Numbers of rows (queries) in synthetic `errorgeopy.location.LocationBatch`es.
+ROWS = [1000, 100000, 1000000]
+
+#: Numbers of candidate strings in synthetic `errorgeopy.address.Address`es.
+ADDRESSES = [5, 100, 1000, 10000]
+
+STREETS = ('Great North Road', 'High Street', 'Aurora Street', 'Oriental Parade',
+           'Lambton Quay', 'Cuba Street', 'Willis Street', 'The Terrace')
+SUBURBS = ('Grey Lynn', 'Lower Hutt', 'Petone', 'Oriental Bay', 'Te Aro',
+           'Thorndon', 'Kelburn', 'Newtown')
+CITIES = ('Auckland', 'Wellington', 'Lower Hutt')
+
+
+def skip(condition):
+    """Skips a benchmark (from its :code:`setup`) when :code:`condition` holds,
+    in the manner understood by asv.
+    """
+    if condition:
+        raise NotImplementedError
+
+
+def points(n, clusters=3, spread=0.005, seed=0):
+    """An (n, 2) array of (latitude, longitude) points, scattered normally
+    about a few cluster centres near Wellington.
+    """
+    rng = np.random.RandomState(seed)
+    centres = np.array([-41.29, 174.78]) + rng.uniform(
+        -0.05, 0.05, size=(clusters, 2))
+    labels = rng.randint(clusters, size=n)
+    return centres[labels] + rng.normal(scale=spread, size=(n, 2))
+
+
+def location(n, seed=0):
+    """A `errorgeopy.location.Location` of n synthetic candidates.
+    """
+    return Location([
+        geopy.Location('Candidate {}'.format(i), geopy.Point(lat, lon), {})
+        for i, (lat, lon) in enumerate(points(n, seed=seed))
+    ])
+
+
+def batch(rows, candidates=8, seed=0):
+    """A `errorgeopy.location.LocationBatch` of rows of up to
+    :code:`candidates` synthetic candidates (some rows having none).
+    """
+    rng = np.random.RandomState(seed)
+    sizes = rng.randint(candidates + 1, size=rows)
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    coordinates = np.zeros((offsets[-1], 3))
+    coordinates[:, 1::-1] = points(offsets[-1], seed=seed)
+    return LocationBatch(coordinates, offsets)
+
+
+def address_strings(n, seed=0):
+    """n synthetic addresses, many of them near-duplicates of one another
+    (differing in case, abbreviation or by a typo), as geocoders produce.
+    """
+    rng = np.random.RandomState(seed)
+    addresses = []
+    for _ in range(n):
+        address = '{} {}, {}, {}'.format(
+            rng.randint(1, 400), STREETS[rng.randint(len(STREETS))],
+            SUBURBS[rng.randint(len(SUBURBS))], CITIES[rng.randint(len(CITIES))])
+        variant = rng.randint(4)
+        if variant == 1:
+            address = address.upper()
+        elif variant == 2:
+            address = address.replace('Street', 'St').replace('Road', 'Rd')
+        elif variant == 3:
+            i = rng.randint(len(address))
+            address = address[:i] + address[i + 1:]
+        addresses.append(address)
+    return addresses
+
+
+def address(n, seed=0):
+    """A `errorgeopy.address.Address` of n synthetic candidates.
+    """
+    return Address([
+        geopy.Location(a, geopy.Point(lat, lon), {})
+        for a, (lat, lon) in zip(
+            address_strings(n, seed=seed), points(n, seed=seed))
+    ])
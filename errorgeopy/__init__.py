@@ -6,12 +6,34 @@
 .. moduleauthor:: Richard Law <richard.m.law@gmail.com>
 """
 
+import threading
+
 __version__ = '1.0.1'
 
+_default_pool_members = None
+_default_pool_lock = threading.Lock()
+
+
+def default_pool_members():
+    """The geocoders used by a `errorgeopy.geocoders.GeocoderPool` without a
+    configuration. Built on first call (rather than on import), and shared
+    thereafter.
 
-def _get_default_pool_members():
-    from geopy.geocoders import Nominatim, GoogleV3
-    return (Nominatim(), GoogleV3())
+    Also available as the module attribute :code:`DEFAULT_GEOCODER_POOL` on
+    Python 3.7 and later; use this function on earlier versions.
+    """
+    global _default_pool_members
+    if _default_pool_members is None:
+        with _default_pool_lock:
+            if _default_pool_members is None:
+                from geopy.geocoders import Nominatim, GoogleV3
+                _default_pool_members = (Nominatim(), GoogleV3())
+    return _default_pool_members
 
 
-DEFAULT_GEOCODER_POOL = _get_default_pool_members()
+def __getattr__(name):
+    # DEFAULT_GEOCODER_POOL is built on first access (Python 3.7 and later)
+    if name == 'DEFAULT_GEOCODER_POOL':
+        return default_pool_members()
+    raise AttributeError("module {!r} has no attribute {!r}".format(
+        __name__, name))
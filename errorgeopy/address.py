@@ -35,11 +35,18 @@ class Address(object):
         responses from as many services that were capable of returning a
         response to a query.  Each member of the array is a
         :code:`geopy.location.Location` object.
+        :code:`dropped` (:code:`list`): Names of the geocoders that were
+        queried, but whose responses are not included (e.g. because they
+        missed a deadline).
+        :code:`providers` (:code:`list`): Name of the geocoder that produced
+        each candidate, when known.
     """
 
     @check_location_type
     def __init__(self, addresses):
         self._addresses = addresses or None
+        self.dropped = []
+        self.providers = []
 
     def __unicode__(self):
         return '\n'.join([str(a) for a in self.addresses])
@@ -0,0 +1,268 @@
+"""Caches of geocoding responses, so that repeated queries to a provider can be
+answered without a network request. A cache is given to a
+`errorgeopy.geocoders.GeocoderPool` on instantiation, and is consulted for each
+(provider, query) pair before the query is sent to the provider.
+
+Two backends are provided:
+
+- `MemoryCache`, a least-recently-used cache held in memory, and
+- `SQLiteCache`, a cache stored in an SQLite database on disk (in write-ahead
+  logging mode, so that several processes can share one file).
+
+Both expire entries after an optional time-to-live, and count hits and misses.
+Any object with `get` and `set` methods of the same signatures may be used
+instead.
+
+.. moduleauthor Richard Law <richard.m.law@gmail.com>
+"""
+
+import json
+import time
+import hashlib
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import geopy
+
+
+def _jsonable(value):
+    """Default for :code:`json.dumps`, used when building cache keys. Objects
+    without a JSON form are represented by their type (their :code:`repr`
+    would often include a memory address, which differs between processes).
+    """
+    if isinstance(value, geopy.Point):
+        return [value.latitude, value.longitude, value.altitude]
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    return '<{}.{}>'.format(type(value).__module__, type(value).__qualname__)
+
+
+def normalize_query(query):
+    """Puts a query into a canonical form for use in a cache key: whitespace is
+    collapsed in string queries, and points are reduced to a list of floats.
+    """
+    if isinstance(query, str):
+        return ' '.join(query.split())
+    if isinstance(query, geopy.Point):
+        return [query.latitude, query.longitude]
+    if isinstance(query, (list, tuple)):
+        return [float(q) for q in query]
+    return query
+
+
+def make_key(provider, method, query, kwargs=None, config=None,
+             instance=None):
+    """Builds the string key of a cached response: the SHA-256 digest of a
+    canonical (JSON) form of the request, so that keys are of a fixed length,
+    are the same in every process, and do not reveal any credentials in the
+    configuration.
+
+    Args:
+        provider (str): Name of the geocoding service.
+        method (str): Name of the geocoder method (e.g. "geocode", "reverse").
+        query (str, tuple or geopy.point.Point): The query.
+
+    Kwargs:
+        kwargs (dict): Keyword arguments of the method.
+        config (dict): Configuration of the geocoder.
+        instance: Identity of the geocoder, distinguishing geocoders of the
+            same provider and configuration (see
+            `errorgeopy.geocoders.Geocoder.identity`).
+
+    Returns:
+        str
+    """
+    request = json.dumps(
+        [provider, method, normalize_query(query), kwargs or {}, config or {},
+         instance],
+        sort_keys=True,
+        default=_jsonable)
+    return hashlib.sha256(request.encode('utf-8')).hexdigest()
+
+
+class Cache(object):
+    """Base class for caches; counts hits and misses. Subclasses implement
+    :code:`_get`, :code:`_set` and :code:`clear`.
+    """
+
+    def __init__(self, ttl=None):
+        """
+        Kwargs:
+            ttl (float): Number of seconds after which a cached response
+                expires. Responses never expire if this is None.
+        """
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def __contains__(self, key):
+        return self._get(key) is not None
+
+    def get(self, key):
+        """Returns the cached value for :code:`key`, or None if there is no
+        unexpired value.
+        """
+        value = self._get(key)
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        """Caches :code:`value` under :code:`key`.
+        """
+        self._set(key, value)
+
+    @property
+    def stats(self):
+        """Dictionary of the number of cache hits and misses, and the hit rate.
+        """
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0
+        }
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _set(self, key, value):
+        raise NotImplementedError
+
+    def clear(self):
+        """Removes all entries from the cache.
+        """
+        raise NotImplementedError
+
+
+class MemoryCache(Cache):
+    """An in-memory, least-recently-used cache. Safe to use from several
+    threads.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        """
+        Kwargs:
+            maxsize (int): The maximum number of entries. When full, the least
+                recently used entry is evicted. Unbounded if None.
+            ttl (float): Number of seconds after which an entry expires.
+        """
+        super(MemoryCache, self).__init__(ttl=ttl)
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def _get(self, key):
+        with self._lock:
+            try:
+                expires, value = self._data[key]
+            except KeyError:
+                return None
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def _set(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCache(Cache):
+    """A cache stored in an SQLite database. Values are pickled. The database
+    is opened in write-ahead logging mode, so it may be shared by several
+    processes (on the same host). Each thread uses its own connection.
+    """
+
+    def __init__(self, path, ttl=None, timeout=30):
+        """
+        Args:
+            path (str): Path to the database file; created if it does not
+                exist.
+
+        Kwargs:
+            ttl (float): Number of seconds after which an entry expires.
+            timeout (float): Number of seconds to wait for another process to
+                release a lock on the database.
+        """
+        super(SQLiteCache, self).__init__(ttl=ttl)
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._connection as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS responses '
+                '(key TEXT PRIMARY KEY, value BLOB, expires REAL)')
+
+    def __len__(self):
+        return self._connection.execute(
+            'SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    @property
+    def _connection(self):
+        conn = getattr(self._local, 'connection', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = conn
+        return conn
+
+    def _get(self, key):
+        row = self._connection.execute(
+            'SELECT value, expires FROM responses WHERE key = ?',
+            (key, )).fetchone()
+        if row is None:
+            return None
+        value, expires = row
+        if expires is not None and expires < time.time():
+            with self._connection as conn:
+                conn.execute('DELETE FROM responses WHERE key = ?', (key, ))
+            return None
+        return pickle.loads(value)
+
+    def _set(self, key, value):
+        expires = time.time() + self.ttl if self.ttl is not None else None
+        with self._connection as conn:
+            conn.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?)',
+                         (key, sqlite3.Binary(pickle.dumps(value)), expires))
+
+    def purge(self):
+        """Deletes expired entries from the database.
+        """
+        with self._connection as conn:
+            conn.execute('DELETE FROM responses WHERE expires < ?',
+                         (time.time(), ))
+
+    def clear(self):
+        with self._connection as conn:
+            conn.execute('DELETE FROM responses')
+
+    def close(self):
+        """Closes the calling thread's connection to the database.
+        """
+        conn = getattr(self._local, 'connection', None)
+        if conn is not None:
+            conn.close()
+            self._local.connection = None
@@ -0,0 +1,191 @@
+"""Persistent HTTP connections for geocoding services.
+
+geopy (1.x) fetches every geocoding response with
+:code:`urllib.request.urlopen`, which opens (and, for HTTPS, negotiates TLS
+for) a fresh connection per request. `KeepAliveOpener` is a thread-safe,
+drop-in replacement for that callable which keeps a small pool of idle
+:code:`http.client` connections per host, so that repeated queries to the same
+provider reuse an open connection.
+
+.. moduleauthor Richard Law <richard.m.law@gmail.com>
+"""
+
+import io
+import ssl
+import socket
+import threading
+import http.client
+from urllib.parse import urlsplit, urljoin
+from urllib.request import Request
+from urllib.error import HTTPError, URLError
+
+#: Status codes of the redirects followed by `KeepAliveOpener`.
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+#: Maximum number of redirects followed for one request, as by
+#: :code:`urllib.request.urlopen`.
+MAX_REDIRECTS = 10
+
+
+def _headers(items):
+    """A dictionary of headers from (name, value) pairs, with names in title
+    case, as header names are case-insensitive (urllib gives "User-agent"
+    where geopy gives "User-Agent").
+    """
+    return {name.title(): value for name, value in items}
+
+
+class Response(object):
+    """A completely read HTTP response, with the parts of the interface of the
+    object returned by :code:`urllib.request.urlopen` that geopy uses.
+    """
+
+    def __init__(self, url, status, reason, headers, body):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self._body = io.BytesIO(body)
+
+    def read(self, *args):
+        return self._body.read(*args)
+
+    def getcode(self):
+        return self.status
+
+    def geturl(self):
+        return self.url
+
+    def info(self):
+        return self.headers
+
+
+class KeepAliveOpener(object):
+    """Callable with the signature of :code:`urllib.request.urlopen` that
+    reuses connections. Responses are read in full before the connection is
+    returned to the pool, so connections are never shared between threads.
+    Redirects are followed (up to `MAX_REDIRECTS`) as by :code:`urlopen`;
+    other responses with a status of 300 or more raise
+    :code:`urllib.error.HTTPError`. Proxies are not supported.
+    """
+
+    def __init__(self, headers=None, maxsize=10, context=None):
+        """
+        Kwargs:
+            headers (dict): Headers sent with every request (e.g. the
+                `User-Agent` of a geocoder), unless the request overrides them.
+            maxsize (int): Maximum number of idle connections kept per host.
+            context (ssl.SSLContext): Context for HTTPS connections. Defaults
+                to :code:`ssl.create_default_context()`.
+        """
+        self._headers = _headers((headers or {}).items())
+        self._maxsize = maxsize
+        self._context = context or ssl.create_default_context()
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _connect(self, scheme, netloc, timeout):
+        if scheme == 'https':
+            return http.client.HTTPSConnection(
+                netloc, timeout=timeout, context=self._context)
+        elif scheme == 'http':
+            return http.client.HTTPConnection(netloc, timeout=timeout)
+        raise URLError('unknown url type: {}'.format(scheme))
+
+    def _acquire(self, key, timeout):
+        with self._lock:
+            idle = self._idle.get(key)
+            conn = idle.pop() if idle else None
+        if conn is None:
+            return self._connect(key[0], key[1], timeout), False
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn, True
+
+    def _release(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self._maxsize:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        """Closes all idle connections.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+    def _request(self, method, url, data, headers, timeout):
+        """Makes a single request, on a pooled connection.
+
+        Returns:
+            Tuple of the :code:`http.client.HTTPResponse` and its body.
+        """
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+        while True:
+            conn, reused = self._acquire(key, timeout)
+            try:
+                conn.request(method, path, body=data, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+            except socket.timeout:
+                conn.close()
+                raise
+            except (http.client.HTTPException, OSError) as error:
+                conn.close()
+                if reused:
+                    # The server dropped an idle connection; retry on a new one
+                    continue
+                raise URLError(error)
+            break
+        if response.will_close:
+            conn.close()
+        else:
+            self._release(key, conn)
+        return response, body
+
+    def __call__(self, url, data=None, timeout=socket._GLOBAL_DEFAULT_TIMEOUT,
+                 **kwargs):
+        headers = dict(self._headers)
+        method = 'POST' if data is not None else 'GET'
+        if isinstance(url, Request):
+            headers.update(_headers(url.header_items()))
+            method = url.get_method()
+            data = url.data if data is None else data
+            url = url.full_url
+        redirects = 0
+        while True:
+            response, body = self._request(method, url, data, headers, timeout)
+            if response.status not in REDIRECT_CODES:
+                break
+            # Redirects are followed as by urllib.request.urlopen: GET and HEAD
+            # requests on any redirect, POST requests (made afresh as GET) on
+            # 301, 302 and 303
+            location = response.getheader('Location')
+            if (location is None or redirects >= MAX_REDIRECTS
+                    or not (method in ('GET', 'HEAD') or
+                            (method == 'POST' and response.status < 307))):
+                raise HTTPError(url, response.status, response.reason,
+                                response.msg, io.BytesIO(body))
+            redirects += 1
+            url = urljoin(url, location)
+            if urlsplit(url).scheme not in ('http', 'https'):
+                raise HTTPError(url, response.status, response.reason,
+                                response.msg, io.BytesIO(body))
+            if method == 'POST':
+                method, data = 'GET', None
+                headers = {k: v for k, v in headers.items()
+                           if k.lower() not in ('content-length',
+                                                'content-type')}
+        if response.status >= 300:
+            raise HTTPError(url, response.status, response.reason,
+                            response.msg, io.BytesIO(body))
+        return Response(url, response.status, response.reason, response.msg,
+                        body)
@@ -14,22 +14,51 @@ for the sake of efficiency. Both forward and backward ("reverse") geocoding is
 supported, but note that not all geocoding services exposed via `errorgeopy`
 support both methods.
 
+Each `GeocoderPool` owns a long-lived executor (a
+:code:`concurrent.futures.ThreadPoolExecutor` sized to the number of configured
+geocoders, unless you supply your own), so that repeated queries only pay for
+task submission. Close the pool when you are done with it, or use it as a
+context manager.
+
+Responses may be cached (see `errorgeopy.cache`) by supplying a cache to the
+pool, so that repeated queries to a provider skip the network entirely.
+
+Coroutine equivalents of the query methods (`GeocoderPool.ageocode`,
+`GeocoderPool.areverse` and their batch variants) are available for use from
+:code:`asyncio` applications.
+
 .. moduleauthor Richard Law <richard.m.law@gmail.com>
 """
 
 import os
+import time
+import asyncio
+import weakref
 import collections
+import collections.abc
 import warnings
-from multiprocessing.dummy import Pool as ThreadPool
-from itertools import repeat
+import threading
+from concurrent.futures import (ThreadPoolExecutor, Future, CancelledError,
+                                wait, FIRST_COMPLETED)
 from collections import OrderedDict
 import copy
+import functools
+import urllib.request
 
 import geopy
 
 from errorgeopy.address import Address
 from errorgeopy.location import Location
-from errorgeopy import utils, DEFAULT_GEOCODER_POOL
+from errorgeopy import utils, default_pool_members
+from errorgeopy.connection import KeepAliveOpener
+from errorgeopy.cache import make_key
+from errorgeopy.policies import TokenBucket, CircuitBreaker, RetryPolicy
+from errorgeopy.stats import PoolStats, RequestEvent
+
+
+#: Options of a geocoder's configuration that set its policies, rather than
+#: being passed to geopy.
+POLICY_OPTIONS = ('concurrency', 'rate_limit', 'circuit_breaker', 'retry')
 
 
 def _action(geocoder, query, method, kwargs={}, skip_timeouts=True):
@@ -94,16 +123,79 @@ def _reverse(geocoder, query, kwargs={}, skip_timeouts=True):
     return _action(geocoder, query, 'reverse', kwargs, skip_timeouts)
 
 
+def _chain(outer, inner):
+    """Done-callback copying the outcome of future :code:`inner` to future
+    :code:`outer`.
+    """
+    if inner.cancelled():
+        outer.set_exception(CancelledError())
+    elif inner.exception() is not None:
+        outer.set_exception(inner.exception())
+    else:
+        outer.set_result(inner.result())
+
+
+def _retrieve(future):
+    """Done-callback marking the exception of an asyncio future as retrieved,
+    where it is handled elsewhere.
+    """
+    if not future.cancelled():
+        future.exception()
+
+
+def _release_cancelled(breaker, future):
+    """Done-callback releasing the request allowed by
+    `errorgeopy.policies.CircuitBreaker` :code:`breaker`, if it was cancelled
+    before it started.
+    """
+    if future.cancelled():
+        breaker.release()
+
+
+def _refund_cancelled(limit, future):
+    """Done-callback refunding to `errorgeopy.policies.TokenBucket`
+    :code:`limit` the token reserved for a request, if the request was
+    cancelled before it started.
+    """
+    if future.cancelled():
+        limit.refund()
+
+
+class _Job(object):
+    """A query being run against several geocoders in a batch, collecting the
+    response of each geocoder as it arrives.
+    """
+    __slots__ = ('query', 'results', 'remaining', 'dropped')
+
+    def __init__(self, query, size):
+        self.query = query
+        self.results = [None] * size
+        self.remaining = size
+        self.dropped = []
+
+    def done(self, index, result):
+        self.results[index] = result
+        self.remaining -= 1
+
+    def skip(self, index, name):
+        self.dropped.append(name)
+        self.done(index, [])
+
+    def collect(self, callback, collect, names):
+        return collect(callback, zip(names, self.results), self.dropped)
+
+
 # TODO is it possible to use/inherit a geopy class and extend on the fly?
 class Geocoder(object):
     """A single geocoder exposing access to a geocoding web service with geopy.
     Thin wrapping over the geopy.geocoders.Geocoder set of geocoding services.
     Used by `errorgeopy.GeocoderPool` to access the configuration of each
     component service. The base `geopy.geocoders.Geocoder` object can be
-    obtained via the `geocoder` attribute.
+    obtained via the `geocoder` attribute; it is built once and then reused,
+    along with its HTTP connections, for every query to the service.
     """
 
-    def __init__(self, name, config):
+    def __init__(self, name, config, geocoder=None, index=0):
         """A single geocoding service with configuration.
 
         Args:
@@ -111,6 +203,12 @@ class Geocoder(object):
                 geopy.
             config (dict): Configuration for that geocoder, meeting the geopy
                 API.
+
+        Kwargs:
+            geocoder (geopy.geocoders.base.Geocoder): An existing geopy
+                geocoder to use, rather than building one from `config`.
+            index (int): The position of :code:`geocoder` among the pool's
+                geocoders of the same class.
         """
         self._name = name
         config = config or {}
@@ -118,13 +216,80 @@ class Geocoder(object):
             'geocode', None) else {}
         self._reverse_kwargs = config.pop('reverse') if config.get(
             'reverse', None) else {}
+        self._concurrency = config.pop('concurrency', None)
+        self._rate_limit = TokenBucket.from_config(
+            config.pop('rate_limit', None))
+        self._circuit_breaker = CircuitBreaker.from_config(
+            config.pop('circuit_breaker', None))
+        self._retry = RetryPolicy.from_config(config.pop('retry', None))
         self._config = config
+        self._geocoder = geocoder
+        self._identity = None
+        if geocoder is not None:
+            self._identity = {
+                'index': index,
+                'attributes': {
+                    k: v
+                    for k, v in vars(geocoder).items()
+                    if isinstance(v, (str, int, float, bool, type(None)))
+                }
+            }
+        self._opener = None
+        self._lock = threading.Lock()
+        self._semaphores = weakref.WeakKeyDictionary()
 
     @property
     def geocoder(self):
-        """The `geopy.geocoders.Geocoder` instance.
+        """The `geopy.geocoders.Geocoder` instance. Instantiated on first
+        access, and shared by all subsequent queries (it is safe to use from
+        several threads at once).
+        """
+        if self._geocoder is None:
+            with self._lock:
+                if self._geocoder is None:
+                    self._geocoder = geopy.get_geocoder_for_service(
+                        self.name)(**self._config)
+        if self._opener is None:
+            with self._lock:
+                if self._opener is None:
+                    self._opener = self._keep_alive(self._geocoder)
+        return self._geocoder
+
+    @staticmethod
+    def _keep_alive(geocoder):
+        """Replaces the default :code:`urlopen` of a (geopy 1.x) geocoder with
+        a `errorgeopy.connection.KeepAliveOpener`, so that connections to the
+        service are reused. Geocoders with proxies (their own, or from the
+        environment's :code:`HTTP_PROXY` and the like) or a custom opener, and
+        those that manage their own HTTP sessions, are left alone.
+
+        Returns:
+            The opener in use by the geocoder, or False if it was not replaced.
         """
-        return geopy.get_geocoder_for_service(self.name)(**self._config)
+        if getattr(geocoder, 'urlopen', None) is not urllib.request.urlopen:
+            return False
+        if getattr(geocoder, 'proxies', None) or urllib.request.getproxies():
+            return False
+        geocoder.urlopen = KeepAliveOpener(
+            headers=getattr(geocoder, 'headers', None))
+        return geocoder.urlopen
+
+    def close(self):
+        """Closes any idle connections held open to the geocoding service.
+        """
+        if self._opener:
+            self._opener.close()
+
+    def semaphore(self, loop):
+        """An :code:`asyncio.Semaphore` limiting the number of concurrent
+        requests made to the service from coroutines running on :code:`loop`,
+        or None if the geocoder has no concurrency limit.
+        """
+        if not self._concurrency:
+            return None
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self._concurrency)
+        return self._semaphores[loop]
 
     @property
     def name(self):
@@ -132,6 +297,19 @@ class Geocoder(object):
         """
         return self._name
 
+    @property
+    def identity(self):
+        """What distinguishes the geocoder from others of the same name and
+        configuration, in the keys of its requests (for caching and
+        coalescing). None for a geocoder built from configuration, which is
+        the only one of its name in a pool. For a geocoder given as a geopy
+        object (whose configuration is unknown), the object's simple
+        attributes (such as its domain and API key) and its position among
+        the pool's geocoders of the same class; so that each is queried, and
+        cached, separately, in the same way in every process.
+        """
+        return self._identity
+
     @property
     def config(self):
         """The configuration of the geocoder (less the kwargs for the `geocode`
@@ -139,6 +317,37 @@ class Geocoder(object):
         """
         return self._config
 
+    @property
+    def concurrency(self):
+        """The maximum number of concurrent requests that coroutines will make
+        to the service (the `concurrency` option of the geocoder's
+        configuration), or None if there is no limit.
+        """
+        return self._concurrency
+
+    @property
+    def rate_limit(self):
+        """The `errorgeopy.policies.TokenBucket` limiting the rate of requests
+        to the service (built from the `rate_limit` option of the geocoder's
+        configuration), or None if requests are not rate limited.
+        """
+        return self._rate_limit
+
+    @property
+    def circuit_breaker(self):
+        """The `errorgeopy.policies.CircuitBreaker` of the service (built from
+        the `circuit_breaker` option of the geocoder's configuration), or None.
+        """
+        return self._circuit_breaker
+
+    @property
+    def retry(self):
+        """The `errorgeopy.policies.RetryPolicy` for requests to the service
+        (built from the `retry` option of the geocoder's configuration), or
+        None if failed requests are not retried.
+        """
+        return self._retry
+
 
 class GeocoderPool(object):
     """A "pool" of objects that inherit from
@@ -150,7 +359,9 @@ class GeocoderPool(object):
     (e.g. a universal :code:`country_bias`), although this is not enforced.
     """
 
-    def __init__(self, config=None, geocoders=None):
+    def __init__(self, config=None, geocoders=None, executor=None,
+                 max_workers=None, cache=None, coalesce=True, normalizer=None,
+                 instrument=False, policies=None):
         """Initialises a pool of geocoders to run queries over in parallel.
 
         Args:
@@ -161,6 +372,37 @@ class GeocoderPool(object):
                 used to provide arguments to the `geocode` and `reverse`
                 methods.
 
+        Kwargs:
+            executor (concurrent.futures.Executor): An executor that queries
+                will be submitted to. Supply one to share workers between
+                several pools; a shared executor is not shut down when this
+                pool is closed. By default the pool creates (on first use) and
+                owns a thread pool.
+            max_workers (int): Size of the thread pool created by the pool when
+                no `executor` is given. Defaults to the number of geocoders.
+            cache (errorgeopy.cache.Cache): A cache of provider responses,
+                consulted before each provider is queried. Non-empty responses
+                are cached, keyed on the provider, its configuration, the query
+                and the keyword arguments of the geocoding method.
+            coalesce (bool): Whether concurrent identical requests (the same
+                query, method and provider) share a single request to the
+                provider, rather than each making their own.
+            normalizer (errorgeopy.normalize.QueryNormalizer): Puts each query
+                into a canonical form used as its key for caching and
+                coalescing, so that near-duplicate queries are treated as one.
+                The providers are sent the query as given (that of the first
+                caller, for coalesced queries), as the canonical form may not
+                mean the same thing to them.
+            instrument (bool): Whether to aggregate statistics of the requests
+                made to each provider (see `GeocoderPool.stats`).
+            policies (dict): The policy options (`concurrency`, `rate_limit`,
+                `circuit_breaker` and `retry`, described below) of the
+                `geocoders`, keyed by the name of their class, for pools that
+                are not built from a `config` (which holds them instead).
+                Geocoders of the same class share a policy given as an
+                instance, but each get their own if it is given as a
+                dictionary of arguments.
+
         Notes:
             The structure of the configuration file (GeocoderPool.fromfile) or
             dictionary (GeocoderPool.__init__) must match the names of geopy
@@ -173,18 +415,60 @@ class GeocoderPool(object):
             by geopy will be used if any keyword arguments are absent in the
             configuration.
 
+            In addition to the geopy options, each geocoder's configuration may
+            include:
+
+            - `concurrency`: the maximum number of requests that the coroutine
+              methods (`ageocode`, `areverse` and their batch variants) will
+              have in flight to that service at once.
+            - `rate_limit`: the maximum rate of requests to the service, as a
+              number of requests per second or a dictionary of arguments for
+              `errorgeopy.policies.TokenBucket` (e.g. `{rate: 1, burst: 1}`
+              for Nominatim's usage policy).
+            - `circuit_breaker`: a dictionary of arguments for
+              `errorgeopy.policies.CircuitBreaker` (may be empty, to use the
+              defaults). While a service is failing, queries skip it instead
+              of waiting for it, and list it in the `dropped` attribute of
+              their results.
+            - `retry`: a dictionary of arguments for
+              `errorgeopy.policies.RetryPolicy` (may be empty, to use the
+              defaults), so that requests failing with a transient error are
+              retried after a delay.
+
+            Policies may also be given as instances of their classes.
+
+            A geocoder that fails to respond does not prevent the results of
+            the others being returned: a warning is emitted, and the geocoder
+            is listed in the `dropped` attribute of the result.
+
         .. _`geopy documentation`: http://geopy.readthedocs.io/en/latest/
         """
         self._config = config
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._max_workers = max_workers
+        self._executor_lock = threading.Lock()
+        self._closed = False
+        self._cache = cache
+        self._coalesce = coalesce
+        self._normalizer = normalizer
+        self._stats = PoolStats() if instrument else None
+        self._hooks = []
+        self._flights = {}
+        self._flights_lock = threading.Lock()
         cfg = copy.deepcopy(config)
+        policies = policies or {}
         if config:
             if not isinstance(config, dict):
                 raise TypeError(
                     "GeocoderPool configuration must be a dictionary")
+            if policies:
+                raise ValueError(
+                    "GeocoderPool policies must be given in its configuration")
             self._geocoders = [Geocoder(gc, cfg[gc]) for gc in cfg]
         else:
-            geocoders = geocoders or DEFAULT_GEOCODER_POOL
-            if not isinstance(geocoders, collections.Iterable):
+            geocoders = geocoders or default_pool_members()
+            if not isinstance(geocoders, collections.abc.Iterable):
                 raise TypeError(
                     "GeocoderPool member geocoders must be an iterable set")
             if not all(
@@ -193,9 +477,19 @@ class GeocoderPool(object):
                 raise TypeError(
                     "GeocoderPool member geocoders must be geopy.geocoder geocoder"
                 )
-            self._geocoders = [
-                Geocoder(type(gc).__name__, None) for gc in geocoders
-            ]
+            for name, options in policies.items():
+                unknown = set(options) - set(POLICY_OPTIONS)
+                if unknown:
+                    raise ValueError("Unknown policy options for {}: {}".format(
+                        name, ', '.join(sorted(unknown))))
+            counts = collections.Counter()
+            self._geocoders = []
+            for gc in geocoders:
+                name = type(gc).__name__
+                self._geocoders.append(
+                    Geocoder(name, dict(policies.get(name, {})), geocoder=gc,
+                             index=counts[name]))
+                counts[name] += 1
 
     def __unicode__(self):
         return '\n'.join([g.name for g in self._geocoders])
@@ -203,6 +497,96 @@ class GeocoderPool(object):
     def __str__(self):
         return self.__unicode__()
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self, wait=True):
+        """Releases the worker threads and idle connections of the pool.
+        Queries cannot be run against a closed pool. An executor supplied on
+        instantiation is left running, as it may be shared with other pools.
+
+        Kwargs:
+            wait (bool): Whether to block until running queries are finished.
+        """
+        with self._executor_lock:
+            self._closed = True
+            if self._owns_executor and self._executor is not None:
+                self._executor.shutdown(wait=wait)
+            self._executor = None
+        for geocoder in self._geocoders:
+            geocoder.close()
+
+    @property
+    def closed(self):
+        """Whether the pool has been closed.
+        """
+        return self._closed
+
+    @property
+    def executor(self):
+        """The :code:`concurrent.futures.Executor` that geocoding tasks are
+        submitted to. Created on first access if one was not supplied on
+        instantiation, and then reused for the lifetime of the pool. It can be
+        passed to other pools in order to share worker threads.
+        """
+        if self._executor is None:
+            with self._executor_lock:
+                if self._closed:
+                    raise RuntimeError("GeocoderPool has been closed")
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self._max_workers or len(self.geocoders))
+        return self._executor
+
+    @property
+    def stats(self):
+        """The `errorgeopy.stats.PoolStats` of requests made to each provider,
+        or None if the pool is not instrumented. Use its :code:`snapshot`
+        method to read the statistics.
+        """
+        return self._stats
+
+    def add_hook(self, hook):
+        """Registers a function to be called with an
+        `errorgeopy.stats.RequestEvent` after every request to a provider
+        (including each retry). Hooks are called from worker threads, and
+        should be quick.
+        """
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        """Unregisters a function registered with `GeocoderPool.add_hook`.
+        """
+        self._hooks.remove(hook)
+
+    def _observe(self, geocoder, func, query, duration, result=None,
+                 error=None):
+        """Builds a `errorgeopy.stats.RequestEvent` for a request to a
+        provider, and passes it to the pool's statistics and hooks.
+        """
+        event = RequestEvent(geocoder.name, func.__name__.lstrip('_'), query,
+                             duration, len(result) if result else 0, error)
+        if self._stats is not None:
+            self._stats.record(event)
+        for hook in self._hooks:
+            hook(event)
+
+    @property
+    def normalizer(self):
+        """The `errorgeopy.normalize.QueryNormalizer` applied to queries, or
+        None if queries are sent as given.
+        """
+        return self._normalizer
+
+    @property
+    def cache(self):
+        """The cache of provider responses, or None if responses are not cached.
+        """
+        return self._cache
+
     @property
     def config(self):
         """The (parsed) configuration that will be referred to
@@ -274,7 +658,272 @@ class GeocoderPool(object):
             with open(config, 'r') as cfg:
                 return cls(config=caller(cfg))
 
-    def _pool_query(self, query, func, attr, callback):
+    def _normalize(self, query, func):
+        """The canonical form of :code:`query`, for the geocoding method
+        performed by :code:`func`, if the pool has a normalizer. Used only to
+        key requests; providers are sent the original query.
+        """
+        if self._normalizer is None:
+            return query
+        return self._normalizer.normalize(query, func.__name__.lstrip('_'))
+
+    def _cached(self, geocoder, query, func, attr):
+        """Looks up the response of :code:`geocoder` to :code:`query` (in its
+        canonical form) in the cache.
+
+        Returns:
+            Tuple of the key identifying the request (used for caching and
+            coalescing) and the cached response (None if there is no cached
+            response).
+        """
+        key = make_key(geocoder.name, func.__name__.lstrip('_'), query,
+                       getattr(geocoder, attr), geocoder.config,
+                       geocoder.identity)
+        if self._cache is None:
+            return key, None
+        return key, self._cache.get(key)
+
+    def _flight(self, key, geocoder, query, func, attr, throttle=True):
+        """Submits :code:`_call` to the executor, unless an identical request
+        (with the same :code:`key`) is already in flight, in which case the
+        caller shares its future. If :code:`throttle`, a new request first
+        reserves a token from the geocoder's rate limit, and is submitted only
+        once the token is due, so that no worker sleeps waiting for it.
+
+        Returns:
+            A future.
+        """
+        if not self._coalesce:
+            return self._schedule(geocoder, throttle, self._call, geocoder,
+                                  query, func, attr, key)
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight[1] += 1
+                return flight[0]
+            future = self._schedule(geocoder, throttle, self._call, geocoder,
+                                    query, func, attr, key)
+            self._flights[key] = [future, 1]
+        future.add_done_callback(functools.partial(self._land, key))
+        return future
+
+    def _schedule(self, geocoder, throttle, fn, *args):
+        """Submits :code:`fn` to the executor, after reserving a token from
+        the geocoder's rate limit if :code:`throttle`. When the token is not
+        yet available, submission is deferred by a timer rather than made now
+        to a worker that would sleep. The returned future may be cancelled
+        until the request starts, in which case the token is refunded and the
+        request released by the geocoder's circuit breaker.
+
+        Returns:
+            A future.
+        """
+        limit = geocoder.rate_limit if throttle else None
+        breaker = geocoder.circuit_breaker
+        delay = limit.reserve() if limit is not None else 0
+        if not delay:
+            try:
+                future = self.executor.submit(fn, *args)
+            except Exception:
+                if limit is not None:
+                    limit.refund()
+                if breaker is not None:
+                    breaker.release()
+                raise
+        else:
+            future = self._defer(delay, fn, *args)
+        if limit is not None:
+            future.add_done_callback(
+                functools.partial(_refund_cancelled, limit))
+        if breaker is not None:
+            future.add_done_callback(
+                functools.partial(_release_cancelled, breaker))
+        return future
+
+    def _defer(self, delay, fn, *args):
+        """Submits :code:`fn` to the executor after :code:`delay` seconds,
+        unless the returned future is cancelled first.
+
+        Returns:
+            A future.
+        """
+        future = Future()
+
+        def submit():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                inner = self.executor.submit(fn, *args)
+            except Exception as error:
+                future.set_exception(error)
+                return
+            inner.add_done_callback(functools.partial(_chain, future))
+
+        timer = threading.Timer(delay, submit)
+        timer.daemon = True
+        future.add_done_callback(
+            lambda f: timer.cancel() if f.cancelled() else None)
+        timer.start()
+        return future
+
+    def _land(self, key, future):
+        """Done-callback of a coalesced request; forgets the request, so that
+        later identical requests are made afresh.
+        """
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            if flight is not None and flight[0] is future:
+                del self._flights[key]
+
+    def _abandon(self, key, future):
+        """Stops waiting on the future of a request. The request is cancelled
+        (if it has not started) only when no other caller is waiting on it.
+        """
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            if flight is not None and flight[0] is future:
+                flight[1] -= 1
+                if flight[1] > 0:
+                    return
+        future.cancel()
+
+    def _call(self, geocoder, query, func, attr, key=None):
+        """Performs :code:`func` for :code:`query` against a single geocoder,
+        caching a non-empty response under :code:`key`. The caller is
+        responsible for the geocoder's rate limit on the first attempt. Failed
+        requests are retried according to the geocoder's retry policy, and
+        their outcomes recorded by its circuit breaker. A timeout on the last
+        attempt gives an empty response.
+        """
+        breaker, retry = geocoder.circuit_breaker, geocoder.retry
+        observed = self._stats is not None or self._hooks
+        attempt = 0
+        while True:
+            attempt += 1
+            start = time.monotonic()
+            try:
+                result = func(geocoder.geocoder, query,
+                              getattr(geocoder, attr), False)
+            except Exception as error:
+                duration = time.monotonic() - start
+                if observed:
+                    self._observe(geocoder, func, query, duration, error=error)
+                if breaker is not None:
+                    if breaker.ignores(error):
+                        breaker.release()
+                    else:
+                        breaker.record(False, duration)
+                if (retry is not None and retry.should_retry(error, attempt)
+                        and (breaker is None or
+                             breaker.state != breaker.OPEN)):
+                    time.sleep(retry.delay(attempt))
+                    if geocoder.rate_limit is not None:
+                        geocoder.rate_limit.acquire()
+                    continue
+                if isinstance(error, geopy.exc.GeocoderTimedOut):
+                    return []
+                raise
+            duration = time.monotonic() - start
+            if observed:
+                self._observe(geocoder, func, query, duration, result=result)
+            if breaker is not None:
+                breaker.record(True, duration)
+            break
+        if self._cache is not None and result:
+            self._cache.set(key, result)
+        return result
+
+    @staticmethod
+    def _result(geocoder, future):
+        """The response of a geocoder from a completed future, or None (with a
+        warning) if the request failed.
+        """
+        try:
+            return future.result()
+        except Exception as error:
+            warnings.warn("Geocoder {} failed: {!r}".format(
+                geocoder.name, error))
+            return None
+
+    def _submit(self, query, func, attr):
+        """Submits :code:`func` for :code:`query`, with kwargs :code:`attr`,
+        against each configured geocoder. Cached responses are not resubmitted,
+        and geocoders whose circuit breaker is open are skipped.
+
+        Returns:
+            A list of (geocoder, key, future) tuples. The future is None for
+            skipped geocoders.
+        """
+        futures = []
+        request = self._normalize(query, func)
+        for geocoder in self.geocoders:
+            key, cached = self._cached(geocoder, request, func, attr)
+            breaker = geocoder.circuit_breaker
+            if cached is None and breaker is not None and not breaker.allow():
+                future = None
+            elif cached is not None:
+                future = Future()
+                future.set_result(cached)
+            else:
+                future = self._flight(key, geocoder, query, func, attr)
+            futures.append((geocoder, key, future))
+        return futures
+
+    @staticmethod
+    def _collect(callback, responses, dropped):
+        """Flattens the responses of the geocoders to a query, given as
+        (geocoder name, response) pairs, into one list, and performs
+        :code:`callback` on it. The output's :code:`providers` attribute names
+        the geocoder of each candidate, and its :code:`dropped` attribute the
+        geocoders that did not respond.
+        """
+        locations, providers = [], []
+        for name, response in responses:
+            if not isinstance(response, list):
+                response = [response]
+            locations.extend(response)
+            providers.extend([name] * len(response))
+        result = callback(locations)
+        result.providers = providers
+        result.dropped = dropped
+        return result
+
+    @staticmethod
+    def _wait(futures, timeout, first):
+        """Waits for the futures of a query until they are all done, or
+        :code:`timeout` seconds have passed, or :code:`first` of them have
+        produced a non-empty response.
+
+        Returns:
+            The set of futures that are done.
+        """
+        if timeout is None and first is None:
+            wait(futures)
+            return set(futures)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        # Responses already to hand (e.g. cached, or from a coalesced request
+        # that has finished) are kept however short the deadline
+        done = {f for f in futures if f.done()}
+        not_done = set(futures) - done
+        while not_done:
+            if first is not None and sum(
+                    1 for f in done
+                    if not f.cancelled() and f.exception() is None and
+                    f.result()) >= first:
+                break
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    done |= {f for f in not_done if f.done()}
+                    break
+            finished, not_done = wait(
+                not_done, timeout=remaining, return_when=FIRST_COMPLETED)
+            done |= finished
+        return done
+
+    def _pool_query(self, query, func, attr, callback, timeout=None,
+                    first=None):
         """Uses :code:`query` to perform :code:`func` with kwargs :code:`attr`
         in parallel against all configured geocoders. Performs :code:`callback`
         function on the result list of addresses or locations.
@@ -286,26 +935,131 @@ class GeocoderPool(object):
                 geocoder.
             callback (func): Function to run over iterable result.
 
+        Kwargs:
+            timeout (float): Seconds to wait for geocoders to respond.
+            first (int): Stop waiting once this many geocoders have responded
+                with candidates.
+
         Returns:
-            Output of `callback`.
-        """
-        pool = ThreadPool()
-        results = pool.starmap(func,
-                               zip([g.geocoder for g in self.geocoders],
-                                   repeat(query),
-                                   [getattr(g, attr) for g in self.geocoders]))
-        pool.close()
-        pool.join()
-        locations = []
-        for location in results:
-            if isinstance(location, list):
-                locations.extend(location)
+            Output of `callback`, with its `dropped` attribute listing the
+            names of geocoders that were not waited for, and its `providers`
+            attribute the name of the geocoder of each candidate.
+        """
+        submitted = self._submit(query, func, attr)
+        done = self._wait([f for _, _, f in submitted if f is not None],
+                          timeout, first)
+        dropped, results = [], []
+        for geocoder, key, future in submitted:
+            response = None
+            if future in done:
+                response = self._result(geocoder, future)
+            elif future is not None:
+                self._abandon(key, future)
+            if response is None:
+                dropped.append(geocoder.name)
             else:
-                locations.append(location)
-        # locations = [item for sublist in results for item in sublist]
-        return callback(locations)
+                results.append((geocoder.name, response))
+        return self._collect(callback, results, dropped)
+
+    def _pool_query_many(self, queries, func, attr, callback, ordered,
+                         max_pending):
+        """Generator that performs :code:`_pool_query` for each member of
+        :code:`queries`, with at most :code:`max_pending` queries submitted or
+        awaiting collection at any one time.
+
+        Each geocoder has its own queue of requests. Requests are only handed
+        to the executor once the geocoder's rate limit allows them to be made,
+        so rate-limited geocoders never hold up worker threads that could be
+        serving other geocoders.
+
+        Yields:
+            (query, output of `callback`) tuples.
+        """
+        if max_pending is None:
+            max_pending = self._max_workers or len(self.geocoders)
+        if max_pending < 1:
+            raise ValueError("max_pending must be at least 1")
+        geocoders = list(self.geocoders)
+        names = [g.name for g in geocoders]
+        backlogs = [collections.deque() for _ in geocoders]
+        queries = iter(queries)
+        jobs = collections.deque()
+        pending = {}
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(jobs) < max_pending:
+                    try:
+                        query = next(queries)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    job = _Job(query, len(geocoders))
+                    jobs.append(job)
+                    request = self._normalize(query, func)
+                    for i, geocoder in enumerate(geocoders):
+                        key, cached = self._cached(geocoder, request, func,
+                                                   attr)
+                        if cached is not None:
+                            job.done(i, cached)
+                        else:
+                            backlogs[i].append((job, i, key))
+
+                delay = None
+                for geocoder, backlog in zip(geocoders, backlogs):
+                    limit = geocoder.rate_limit
+                    breaker = geocoder.circuit_breaker
+                    while backlog:
+                        job, i, key = backlog[0]
+                        if (breaker is not None and
+                                breaker.state == breaker.OPEN):
+                            backlog.popleft()
+                            job.skip(i, geocoder.name)
+                            continue
+                        if limit is not None and not limit.try_acquire():
+                            break
+                        backlog.popleft()
+                        if breaker is not None and not breaker.allow():
+                            job.skip(i, geocoder.name)
+                            continue
+                        future = self._flight(key, geocoder, job.query, func,
+                                              attr, False)
+                        pending.setdefault(future, []).append(
+                            (job, i, geocoder, key))
+                    if backlog:
+                        wait_time = limit.delay()
+                        delay = wait_time if delay is None else min(
+                            delay, wait_time)
+
+                while jobs and not jobs[0].remaining:
+                    job = jobs.popleft()
+                    yield job.query, job.collect(callback, self._collect, names)
+                if not ordered and any(not j.remaining for j in jobs):
+                    complete = [j for j in jobs if not j.remaining]
+                    jobs = collections.deque(j for j in jobs if j.remaining)
+                    for job in complete:
+                        yield job.query, job.collect(callback, self._collect, names)
+
+                if not jobs and exhausted:
+                    return
+                if pending:
+                    done, _ = wait(
+                        pending, timeout=delay, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        for job, i, geocoder, _ in pending.pop(future):
+                            response = self._result(geocoder, future)
+                            if response is None:
+                                job.skip(i, geocoder.name)
+                            else:
+                                job.done(i, response)
+                elif delay is not None:
+                    time.sleep(delay)
+        finally:
+            for future, waiters in pending.items():
+                for _, _, _, key in waiters:
+                    self._abandon(key, future)
 
-    def geocode(self, query):
+    def geocode(self, query, timeout=None, first=None):
         """Forward geocoding: given a string address, return a point location.
         ErrorGeoPy does this, and also provides you with ways to interrogate the
         spatial error in the result.
@@ -314,12 +1068,21 @@ class GeocoderPool(object):
             query (str): Address you want to find the location of (with spatial
                 error).
 
+        Kwargs:
+            timeout (float): A deadline, in seconds, for the query. The result
+                is built from the providers that responded in time; the rest
+                are abandoned, and named in the `dropped` attribute of the
+                result. By default, waits for every provider.
+            first (int): Return as soon as this many providers have responded
+                with candidates, dropping the rest.
+
         Returns:
             A list of `errorgeopy.address.Address` instances.
         """
-        return self._pool_query(query, _geocode, '_geocode_kwargs', Location)
+        return self._pool_query(query, _geocode, '_geocode_kwargs', Location,
+                                timeout, first)
 
-    def reverse(self, query):
+    def reverse(self, query, timeout=None, first=None):
         """Reverse geocoding: given a point location, returns a string address.
         ErrorGeoPy does this, and also provides you with ways to interrogate the
         uncertainty in the result.
@@ -329,7 +1092,233 @@ class GeocoderPool(object):
             "%(latitude)s, %(longitude)s"): The coordinates for which you wish
             to obtain the closest human-readable addresses.
 
+        Kwargs:
+            timeout (float): A deadline, in seconds, for the query. See
+                `GeocoderPool.geocode`.
+            first (int): Return as soon as this many providers have responded
+                with candidates. See `GeocoderPool.geocode`.
+
         Returns:
             A list of `errorgeopy.location.Location` instances.
         """
-        return self._pool_query(query, _reverse, '_reverse_kwargs', Address)
+        return self._pool_query(query, _reverse, '_reverse_kwargs', Address,
+                                timeout, first)
+
+    def geocode_many(self, queries, ordered=True, max_pending=None):
+        """Batch forward geocoding: geocodes every address in an iterable,
+        running queries in parallel with one another as well as across
+        providers. Queries are consumed lazily, so the iterable may be a
+        generator over a very large input.
+
+        Args:
+            queries (iterable of str): Addresses you want to find the locations
+                of.
+
+        Kwargs:
+            ordered (bool): If True (the default), results are yielded in the
+                order of `queries`. Otherwise they are yielded as soon as each
+                query is complete.
+            max_pending (int): The maximum number of queries in flight (or, when
+                `ordered`, finished but waiting on an earlier query) at any one
+                time, which bounds memory use. Defaults to the number of worker
+                threads; the executor determines how many geocoding requests
+                actually run at once, so for large batches construct the pool
+                with a suitable `max_workers`.
+
+        Yields:
+            Tuples of (query, `errorgeopy.location.Location`).
+        """
+        return self._pool_query_many(queries, _geocode, '_geocode_kwargs',
+                                     Location, ordered, max_pending)
+
+    def reverse_many(self, queries, ordered=True, max_pending=None):
+        """Batch reverse geocoding: reverse geocodes every point location in an
+        iterable. See `GeocoderPool.geocode_many` for a description of the
+        keyword arguments.
+
+        Args:
+            queries (iterable): Points, in any form accepted by
+                `GeocoderPool.reverse`.
+
+        Yields:
+            Tuples of (query, `errorgeopy.address.Address`).
+        """
+        return self._pool_query_many(queries, _reverse, '_reverse_kwargs',
+                                     Address, ordered, max_pending)
+
+    async def _arun(self, loop, geocoder, query, request, func, attr):
+        """Coroutine that runs :code:`func` for :code:`query` (whose canonical
+        form is :code:`request`) for a single geocoder on the pool's executor,
+        respecting the geocoder's concurrency limit. Returns None if the
+        geocoder's circuit breaker is open, or (with a warning) if the request
+        failed.
+        """
+        key, cached = self._cached(geocoder, request, func, attr)
+        if cached is not None:
+            return cached
+        with self._flights_lock:
+            flight = self._flights.get(key) if self._coalesce else None
+            if flight is not None:
+                flight[1] += 1
+        if flight is not None:
+            return await self._await_flight(loop, geocoder, key, flight[0])
+        breaker = geocoder.circuit_breaker
+        if breaker is not None and not breaker.allow():
+            return None
+        return await self._arun_call(loop, geocoder, query, func, attr, key)
+
+    async def _arun_call(self, loop, geocoder, query, func, attr, key):
+        """Coroutine that waits (without blocking the event loop) for the
+        geocoder's concurrency limit and rate limit to allow a request, and
+        then makes it on the pool's executor (or joins an identical request in
+        flight). If the coroutine is cancelled while it waits, the request is
+        given up: its token is refunded, and it is released by the geocoder's
+        circuit breaker.
+        """
+        semaphore = geocoder.semaphore(loop)
+        limit, breaker = geocoder.rate_limit, geocoder.circuit_breaker
+        try:
+            if semaphore is not None:
+                await semaphore.acquire()
+        except asyncio.CancelledError:
+            if breaker is not None:
+                breaker.release()
+            raise
+        try:
+            if limit is not None:
+                try:
+                    await asyncio.sleep(limit.reserve())
+                except asyncio.CancelledError:
+                    limit.refund()
+                    if breaker is not None:
+                        breaker.release()
+                    raise
+            future = self._flight(key, geocoder, query, func, attr, False)
+            return await self._await_flight(loop, geocoder, key, future)
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+    async def _await_flight(self, loop, geocoder, key, future):
+        """Coroutine that awaits the future of a (possibly coalesced) request,
+        and gives its response as `GeocoderPool._result` does. Cancelling the
+        coroutine does not cancel the request outright: the coroutine stops
+        waiting on it, as with :code:`_abandon`, so that it is cancelled only
+        when no other caller is waiting on it.
+        """
+        wrapped = asyncio.wrap_future(future, loop=loop)
+        # The outcome is read from the request's own future, below
+        wrapped.add_done_callback(_retrieve)
+        try:
+            await asyncio.wait({wrapped})
+        finally:
+            if not future.done():
+                self._abandon(key, future)
+        return self._result(geocoder, future)
+
+    async def _apool_query(self, query, func, attr, callback):
+        """Coroutine equivalent of :code:`_pool_query`.
+        """
+        loop = asyncio.get_event_loop()
+        request = self._normalize(query, func)
+        geocoders = list(self.geocoders)
+        results = await asyncio.gather(
+            *[self._arun(loop, g, query, request, func, attr)
+              for g in geocoders],
+            return_exceptions=True)
+        # Failed requests have already been dropped; anything raised is an
+        # error of the pool itself (e.g. that it is closed), as it is for
+        # `GeocoderPool.geocode`
+        for response in results:
+            if isinstance(response, BaseException):
+                raise response
+        return self._collect(
+            callback,
+            [(g.name, r) for g, r in zip(geocoders, results) if r is not None],
+            [g.name for g, r in zip(geocoders, results) if r is None])
+
+    async def _apool_query_many(self, queries, func, attr, callback,
+                                max_pending):
+        """Coroutine equivalent of :code:`_pool_query_many`, always in order.
+        """
+        if max_pending is None:
+            max_pending = self._max_workers or len(self.geocoders)
+        if max_pending < 1:
+            raise ValueError("max_pending must be at least 1")
+        queries = enumerate(queries)
+        results = {}
+
+        async def worker():
+            # Workers share the iterator, so queries are drawn from it only
+            # as fast as they are answered
+            for i, query in queries:
+                results[i] = query, await self._apool_query(
+                    query, func, attr, callback)
+
+        await asyncio.gather(*[worker() for _ in range(max_pending)])
+        return [results[i] for i in range(len(results))]
+
+    async def ageocode(self, query):
+        """Coroutine equivalent of `GeocoderPool.geocode`. Requests to all
+        providers are made concurrently, without blocking the event loop.
+
+        Args:
+            query (str): Address you want to find the location of (with spatial
+                error).
+
+        Returns:
+            An `errorgeopy.location.Location` instance.
+        """
+        return await self._apool_query(query, _geocode, '_geocode_kwargs',
+                                       Location)
+
+    async def areverse(self, query):
+        """Coroutine equivalent of `GeocoderPool.reverse`. Requests to all
+        providers are made concurrently, without blocking the event loop.
+
+        Args:
+            query (`geopy.point.Point`, iterable of (lat, lon), or string as
+            "%(latitude)s, %(longitude)s"): The coordinates for which you wish
+            to obtain the closest human-readable addresses.
+
+        Returns:
+            An `errorgeopy.address.Address` instance.
+        """
+        return await self._apool_query(query, _reverse, '_reverse_kwargs',
+                                       Address)
+
+    async def ageocode_many(self, queries, max_pending=None):
+        """Coroutine equivalent of `GeocoderPool.geocode_many`.
+
+        Args:
+            queries (iterable of str): Addresses you want to find the locations
+                of.
+
+        Kwargs:
+            max_pending (int): The maximum number of queries in flight at any
+                one time. Defaults to the number of worker threads.
+
+        Returns:
+            A list of (query, `errorgeopy.location.Location`) tuples, in the
+            order of `queries`.
+        """
+        return await self._apool_query_many(queries, _geocode,
+                                            '_geocode_kwargs', Location,
+                                            max_pending)
+
+    async def areverse_many(self, queries, max_pending=None):
+        """Coroutine equivalent of `GeocoderPool.reverse_many`. See
+        `GeocoderPool.ageocode_many` for a description of the keyword
+        arguments.
+
+        Args:
+            queries (iterable): Points, in any form accepted by
+                `GeocoderPool.reverse`.
+
+        Returns:
+            A list of (query, `errorgeopy.address.Address`) tuples, in the
+            order of `queries`.
+        """
+        return await self._apool_query_many(queries, _reverse,
+                                            '_reverse_kwargs', Address,
+                                            max_pending)
@@ -9,18 +9,26 @@ A "LocationClusters" object, also defined here, is also a collection of
 addresses. but is slightly less abstract in that the members of the collection
 are organised into clusters, based on some clustering algorithm.
 
-Heavy use is made of shapely in return values of methods for these classes.
+A "LocationBatch" holds the candidates of many queries in columnar (numpy)
+form, for computing error metrics of a large batch of geocodes at once; the
+`batch_metrics` function computes the common ones in a single call.
+
+Heavy use is made of shapely in return values of methods for these classes
+(although it is not imported until it is first needed). Geometry is in degrees
+of longitude and latitude, except for the metric measures of error (such as
+`Location.mbc_radius`), for which candidates are projected with
+`errorgeopy.projection`.
 
 .. moduleauthor Richard Law <richard.m.law@gmail.com>
 """
 
+from collections import namedtuple
 from functools import wraps
 
+import numpy as np
 import geopy
-from shapely.geometry import MultiPoint, GeometryCollection
-from shapely.ops import transform
 
-from errorgeopy import utils
+from errorgeopy import utils, metrics, projection
 
 
 def _check_points_exist(func):
@@ -98,15 +106,64 @@ def _check_cluster_calculable(func):
     return inner
 
 
+def _cached(func):
+    """Decorator for caching the result of a method, per arguments, in the
+    :code:`_cache` of the first argument (a Location or LocationClusters). A
+    Location's cache is cleared when it is modified with :code:`__setitem__`.
+    """
+
+    @wraps(func)
+    def inner(self, *args, **kwargs):
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        try:
+            return self._cache[key]
+        except KeyError:
+            result = self._cache[key] = func(self, *args, **kwargs)
+            return result
+
+    return inner
+
+
+Triangulation = namedtuple(
+    'Triangulation', ['simplices', 'circumcentres', 'circumradii', 'quality'])
+Triangulation.__doc__ = """The Delaunay triangulation of the candidates of a
+`Location`.
+
+Attributes:
+    simplices (numpy.ndarray): (M, 3) array of the indices of the candidates
+        at the vertices of each triangle.
+    circumcentres (numpy.ndarray): (M, 2) array of the (longitude, latitude)
+        circumcentre of each triangle.
+    circumradii (numpy.ndarray): The circumradius of each triangle, in
+        degrees.
+    quality (numpy.ndarray): The radius ratio of each triangle (see
+        `errorgeopy.utils.triangle_quality`): 1 when equilateral, near 0 for
+        slivers.
+"""
+
+
 class Location(object):
     """Represents a collection of parsed geocoder responses, each of which
     are geopy.Location objects, representing the results of different
     geocoding services for the same query.
+
+    The coordinates of the candidates, and the geometries derived from them,
+    are computed when first needed and then cached, until a candidate is
+    replaced (by assigning to an index of the Location).
+
+    Attributes:
+        dropped (list): Names of the geocoders that were queried, but whose
+            responses are not included (e.g. because they missed a deadline).
+        providers (list): Name of the geocoder that produced each candidate,
+            when known (it is set by `errorgeopy.geocoders.GeocoderPool`).
     """
 
     @utils.check_location_type
     def __init__(self, locations):
         self._locations = locations or []
+        self.dropped = []
+        self.providers = []
+        self._cache = {}
 
     def __unicode__(self):
         return '\n'.join(self.addresses)
@@ -124,6 +181,7 @@ class Location(object):
         if not isinstance(value, geopy.Location):
             raise TypeError
         self.locations[index] = value
+        self._cache.clear()
 
     def __eq__(self, other):
         if not isinstance(other, Location):
@@ -169,13 +227,30 @@ class Location(object):
         return [l.point for l in self.locations]
 
     @property
+    @_cached
+    def coordinates(self):
+        """A read-only (N, 3) numpy array of float64 (longitude, latitude,
+        altitude) of the candidate locations, in the order of
+        :code:`Location.locations`. Built once, and used by the geometry and
+        clustering methods.
+        """
+        coordinates = utils.array_geopy_points_to_xyz_array(self.points)
+        coordinates.flags.writeable = False
+        return coordinates
+
+    @property
+    @_cached
+    @metrics.timed('geometry')
     @_check_points_exist
     def multipoint(self):
         """A shapely.geometry.MultiPoint of the Location members.
         """
+        from shapely.geometry import MultiPoint
         return MultiPoint(self._shapely_points())
 
     @property
+    @_cached
+    @metrics.timed('geometry')
     @_check_points_exist
     def centroid(self):
         """A shapely.geometry.Point of the centre of all candidate address
@@ -184,6 +259,8 @@ class Location(object):
         return self.multipoint.centroid
 
     @property
+    @_cached
+    @metrics.timed('geometry')
     @_check_points_exist
     def most_central_location(self):
         """A shapely.geometry.Point representing the geometry of the candidate
@@ -193,37 +270,141 @@ class Location(object):
         return utils.point_nearest_point(self._shapely_points(), self.centroid)
 
     @property
+    @_cached
+    @metrics.timed('geometry')
     @_check_points_exist
     def mbc(self):
         """A shapely.geometry.Polygon representing the minimum bounding circle
-        of the candidate locations.
+        of the candidate locations (a 64-sided polygon approximating the
+        circle; see `Location.mbc_circle` for the circle itself).
         """
-        return utils.minimum_bounding_circle(
-            [p[0:2] for p in self._tuple_points()])
+        return self.mbc_circle.polygon()
 
     @property
+    @_cached
+    @metrics.timed('geometry')
+    @_check_points_exist
+    def mbc_circle(self):
+        """The minimum bounding circle of the candidate locations, as an
+        `errorgeopy.utils.Circle`: an (x, y, radius) tuple, whose polygon is
+        built on demand with :code:`polygon(resolution)`. Deterministic, for
+        the same candidates.
+        """
+        return utils.enclosing_circle(self.coordinates)
+
+    @property
+    def concave_hull(self):
+        """A concave hull of the Location, as a shapely.geometry.Polygon object
+        (or MultiPolygon); the `Location.alpha_shape` with the default alpha.
+        Needs at least four candidates, or else this property is None.
+        """
+        return self.alpha_shape()
+
+    @_cached
+    @metrics.timed('geometry', 'concave_hull')
     @_check_concave_hull_calcuable
     @_check_polygonisable
-    def concave_hull(self, alpha=0.15):
-        """A concave hull of the Location, as a shapely.geometry.Polygon object.
-        Needs at least four candidates, or else this property is None.
+    def alpha_shape(self, alpha=0.15):
+        """The alpha shape of the Location: the union of the triangles of the
+        Delaunay triangulation of its candidates whose circumradius is less
+        than alpha. A shapely.geometry.Polygon, or a MultiPolygon if the shape
+        is in several parts; None with fewer than four candidates, or if no
+        triangle is small enough.
 
         Kwargs:
-            alpha (float): The parameter for the alpha shape
+            alpha (float): The parameter for the alpha shape, in degrees; the
+                larger it is, the closer the shape is to the convex hull.
         """
-        return utils.concave_hull([p[0:2] for p in self._tuple_points()],
-                                  alpha)
+        return utils.concave_hull(self.coordinates[:, :2], alpha)
 
     @property
+    @_cached
+    @metrics.timed('geometry')
+    @_check_convex_hull_calcuable
+    def triangulation(self):
+        """The Delaunay triangulation of the candidates, with the circumcircle
+        and quality of each triangle, as a `Triangulation`; for diagnosing
+        the shape of a cloud of candidates. Needs at least three candidates,
+        not all collinear, or else this property is None.
+        """
+        from scipy.spatial import Delaunay
+        points = self.coordinates[:, :2]
+        try:
+            simplices = Delaunay(points).simplices
+        except RuntimeError:
+            # scipy.spatial.qhull.QhullError
+            return None
+        triangles = points[simplices]
+        centres, radii = utils.circumcircles(triangles)
+        return Triangulation(simplices, centres, radii,
+                             utils.triangle_quality(triangles))
+
+    @property
+    @_cached
+    @metrics.timed('geometry')
     @_check_convex_hull_calcuable
     @_check_polygonisable
     def convex_hull(self):
         """A convex hull of the Location, as a shapely.geometry.Polygon
-        object. Needs at least three candidates, or else this property is None.
+        object (or a LineString or Point, if the candidates are collinear or
+        coincident). Needs at least three candidates, or else this property is
+        None.
+        """
+        return utils.convex_hull(self.coordinates)
+
+    @property
+    @_cached
+    @_check_points_exist
+    def crs(self):
+        """The metric coordinate reference system chosen for the candidates
+        (see `errorgeopy.projection.local_crs`): the EPSG code of the UTM
+        zone they lie in, or, if they are spread more widely, the PROJ string
+        of an azimuthal equidistant projection centred on them.
+        """
+        return projection.local_crs(self.coordinates)
+
+    @_cached
+    def projected(self, crs=None):
+        """Read-only (N, 2) array of the (x, y) of the candidates, projected
+        to :code:`crs` (an EPSG code or PROJ string; by default,
+        `Location.crs`), in a single transformation of the whole array.
         """
-        return utils.convex_hull(self._tuple_points())
+        projected = projection.project(self.coordinates, crs or self.crs)
+        projected.flags.writeable = False
+        return projected
 
     @property
+    @_cached
+    @metrics.timed('geometry')
+    @_check_points_exist
+    def mbc_radius(self):
+        """The radius, in metres, of the minimum bounding circle of the
+        candidates (in `Location.crs`).
+        """
+        return utils.enclosing_circle(self.projected()).radius
+
+    @property
+    @_cached
+    @metrics.timed('geometry')
+    @_check_points_exist
+    def hull_area(self):
+        """The area, in square metres, of the convex hull of the candidates
+        (in `Location.crs`); 0 if they are collinear or coincident.
+        """
+        return utils.convex_hull(self.projected()).area
+
+    @_cached
+    @metrics.timed('clustering')
+    @_check_points_exist
+    def cluster_count(self, epsilon=100):
+        """The number of clusters among the candidates, where candidates
+        within :code:`epsilon` metres of one another (in `Location.crs`) are
+        in the same cluster.
+        """
+        return utils.cluster_count(self.projected(), epsilon)
+
+    @property
+    @_cached
     @_check_points_exist
     def clusters(self):
         """Clusters that have been identified in the Location's candidate
@@ -231,18 +412,19 @@ class Location(object):
         """
         return LocationClusters(self)
 
+    @_cached
     def _shapely_points(self, epsg=None):
-        if epsg:
-            projection = utils.get_proj(epsg)
-            points = [transform(projection, p) for p in self.points]
-        return utils.array_geopy_points_to_shapely_points(self.points)
+        return utils.xyz_array_to_shapely_points(self._xyz(epsg))
 
+    @_cached
     def _tuple_points(self, epsg=None):
-        if epsg:
-            projection = utils.get_proj(epsg)
-            points = [transform(projection, p) for p in self.points]
-        return utils.array_geopy_points_to_xyz_tuples(self.points
-                                                      if not epsg else points)
+        return [tuple(c) for c in self._xyz(epsg).tolist()]
+
+    def _xyz(self, epsg=None):
+        if not epsg:
+            return self.coordinates
+        return np.column_stack(
+            [self.projected(epsg), self.coordinates[:, 2]])
 
 
 # TODO it'd be nice to have the names of the geocoder that produced each cluster member; this would require extending geopy.Location to include this information
@@ -254,6 +436,7 @@ class LocationClusters(object):
 
     def __init__(self, location):
         self._location = location
+        self._cache = {}
 
     def __len__(self):
         return len(self.clusters)
@@ -268,6 +451,8 @@ class LocationClusters(object):
         return self.clusters[index]
 
     @property
+    @_cached
+    @metrics.timed('clustering')
     @_check_cluster_calculable
     def clusters(self):
         """A sequence of clusters identified from the input. May have length 0
@@ -279,6 +464,7 @@ class LocationClusters(object):
     def geometry_collection(self):
         """GeometryCollection of clusters as multipoint geometries.
         """
+        from shapely.geometry import GeometryCollection
         return GeometryCollection(
             [c.location.multipoint for c in self.clusters])
 
@@ -286,4 +472,339 @@ class LocationClusters(object):
     def cluster_centres(self):
         """Multipoint of cluster geometric centroids.
         """
+        from shapely.geometry import MultiPoint
         return MultiPoint([c.centroid for c in self.clusters])
+
+
+class LocationBatch(object):
+    """A columnar collection of the candidate locations of many queries, such
+    as the output of `errorgeopy.geocoders.GeocoderPool.geocode_many`.
+
+    The coordinates of all candidates are held in one (M, 3) float64 array of
+    (longitude, latitude, altitude), with the candidates of row i at
+    :code:`coordinates[offsets[i]:offsets[i + 1]]`. The geocoder of each
+    candidate is stored as an index into :code:`provider_names`. Error metrics
+    are computed for all rows at once, with distances in metres (on a local
+    equirectangular projection about each row's centroid). Rows are accessed
+    by index, as `LocationRow` views.
+    """
+
+    def __init__(self, coordinates, offsets, providers=None,
+                 provider_names=(), addresses=None, queries=None):
+        """
+        Args:
+            coordinates (numpy.ndarray): (M, 3) array of the (longitude,
+                latitude, altitude) of all candidates.
+            offsets (numpy.ndarray): (N + 1, ) array of the start of each row
+                in :code:`coordinates`, followed by M.
+
+        Kwargs:
+            providers (numpy.ndarray): (M, ) array of the index, in
+                :code:`provider_names`, of the geocoder of each candidate (-1
+                if unknown).
+            provider_names (sequence of str): Names of the geocoders.
+            addresses (sequence of str): The address of each candidate.
+            queries (sequence): The query of each row.
+        """
+        self.coordinates = np.asarray(coordinates, dtype=np.float64).reshape(
+            (-1, 3))
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        if (self.offsets[0] != 0 or self.offsets[-1] != len(self.coordinates)
+                or np.any(np.diff(self.offsets) < 0)):
+            raise ValueError("offsets must increase from 0 to the number of "
+                             "candidates")
+        if providers is None:
+            providers = np.full(len(self.coordinates), -1)
+        self.providers = np.asarray(providers, dtype=np.int16)
+        self.provider_names = tuple(provider_names)
+        self.addresses = addresses
+        self.queries = queries
+        for array in (self.coordinates, self.offsets, self.providers):
+            array.flags.writeable = False
+        self._cache = {}
+
+    @classmethod
+    def from_locations(cls, locations, queries=None, addresses=True):
+        """Builds a LocationBatch from a sequence of `Location` objects (whose
+        geocoders are known from their :code:`providers` attributes).
+
+        Kwargs:
+            queries (sequence): The query of each Location.
+            addresses (bool): Whether to keep the address of each candidate.
+        """
+        locations = list(locations)
+        coordinates, sizes, providers, names = [], [], [], {}
+        for location in locations:
+            points = location.points
+            sizes.append(len(points))
+            coordinates.extend(
+                (p.longitude, p.latitude, p.altitude) for p in points)
+            known = getattr(location, 'providers', None)
+            if known and len(known) == len(points):
+                providers.extend(names.setdefault(name, len(names))
+                                 for name in known)
+            else:
+                providers.extend([-1] * len(points))
+        return cls(
+            coordinates,
+            np.concatenate([[0], np.cumsum(sizes, dtype=np.int64)]),
+            providers,
+            sorted(names, key=names.get),
+            addresses=[a for l in locations for a in l.addresses]
+            if addresses else None,
+            queries=list(queries) if queries is not None else None)
+
+    @classmethod
+    def from_arrays(cls, arrays, queries=None):
+        """Builds a LocationBatch from a sequence of arrays of candidates, one
+        per row, each of shape (n, 2) or (n, 3): (longitude, latitude[,
+        altitude]).
+
+        Kwargs:
+            queries (sequence): The query of each row.
+        """
+        arrays = [np.asarray(a, dtype=np.float64).reshape((len(a), -1))
+                  if len(a) else np.zeros((0, 3)) for a in arrays]
+        coordinates = np.zeros((sum(len(a) for a in arrays), 3))
+        offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+        for i, array in enumerate(arrays):
+            offsets[i + 1] = offsets[i] + len(array)
+            coordinates[offsets[i]:offsets[i + 1], :array.shape[1]] = array
+        return cls(coordinates, offsets,
+                   queries=list(queries) if queries is not None else None)
+
+    @classmethod
+    def from_results(cls, results, addresses=True):
+        """Builds a LocationBatch from (query, `Location`) pairs, as yielded
+        by `errorgeopy.geocoders.GeocoderPool.geocode_many`.
+
+        Kwargs:
+            addresses (bool): Whether to keep the address of each candidate.
+        """
+        queries, locations = [], []
+        for query, location in results:
+            queries.append(query)
+            locations.append(location)
+        return cls.from_locations(locations, queries, addresses)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("LocationBatch index out of range")
+        return LocationRow(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield LocationRow(self, index)
+
+    @property
+    def sizes(self):
+        """The number of candidates in each row.
+        """
+        return np.diff(self.offsets)
+
+    @property
+    @_cached
+    def centroids(self):
+        """(N, 2) array of the (longitude, latitude) centre of the candidates
+        of each row (NaN for rows without candidates).
+        """
+        return utils.ragged_means(self.coordinates[:, :2], self.offsets)
+
+    @property
+    @_cached
+    def distances(self):
+        """(M, ) array of the great-circle distance, in metres, of each
+        candidate from the centroid of its row.
+        """
+        return utils.haversine(self.coordinates[:, :2],
+                               np.repeat(self.centroids, self.sizes, axis=0))
+
+    @property
+    @_cached
+    def max_distances(self):
+        """The greatest distance, in metres, of any candidate of each row from
+        the row's centroid.
+        """
+        return utils.ragged_reduce(np.maximum, self.distances, self.offsets)
+
+    @property
+    @_cached
+    def mean_distances(self):
+        """The mean distance, in metres, of the candidates of each row from
+        the row's centroid.
+        """
+        return utils.ragged_means(self.distances, self.offsets)
+
+    @property
+    @_cached
+    def most_central(self):
+        """The index, in :code:`coordinates`, of the candidate of each row
+        nearest its centroid (-1 for rows without candidates); the batch
+        equivalent of `Location.most_central_location`.
+        """
+        return utils.ragged_argmin(self.distances, self.offsets)
+
+    def _projected(self):
+        """The (longitude, latitude) of each candidate, projected to metres
+        about the centroid of its row.
+        """
+        origins = np.repeat(self.centroids, self.sizes, axis=0)
+        return utils.local_metres(self.coordinates[:, None, :2],
+                                  origins)[:, 0]
+
+    @property
+    @_cached
+    def mbc_radii(self):
+        """The radius, in metres, of the minimum bounding circle of the
+        candidates of each row.
+        """
+        return utils.ragged_apply(
+            lambda points: utils.batch_enclosing_circles(points)[1],
+            self._projected(), self.offsets)
+
+    @property
+    @_cached
+    def hull_areas(self):
+        """The area, in square metres, of the convex hull of the candidates of
+        each row.
+        """
+        return utils.ragged_apply(utils.batch_convex_hull_areas,
+                                  self._projected(), self.offsets)
+
+    @_cached
+    def cluster_counts(self, epsilon=100):
+        """The number of clusters among the candidates of each row, where
+        candidates within :code:`epsilon` metres of one another are in the
+        same cluster.
+        """
+        return utils.ragged_apply(
+            lambda points: utils.batch_cluster_counts(points, epsilon),
+            self._projected(), self.offsets, empty=0)
+
+
+class LocationRow(object):
+    """A view of one row (the candidates of one query) of a `LocationBatch`.
+    """
+    __slots__ = ('_batch', '_index')
+
+    def __init__(self, batch, index):
+        self._batch = batch
+        self._index = index
+
+    def __len__(self):
+        return int(self._batch.sizes[self._index])
+
+    @property
+    def _slice(self):
+        offsets = self._batch.offsets
+        return slice(offsets[self._index], offsets[self._index + 1])
+
+    @property
+    def query(self):
+        if self._batch.queries is None:
+            return None
+        return self._batch.queries[self._index]
+
+    @property
+    def coordinates(self):
+        """Read-only (n, 3) array of (longitude, latitude, altitude).
+        """
+        return self._batch.coordinates[self._slice]
+
+    @property
+    def providers(self):
+        """Name of the geocoder of each candidate (None if unknown).
+        """
+        names = self._batch.provider_names
+        return [names[i] if i >= 0 else None
+                for i in self._batch.providers[self._slice]]
+
+    @property
+    def addresses(self):
+        if self._batch.addresses is None:
+            return None
+        return list(self._batch.addresses[self._slice])
+
+    @property
+    def centroid(self):
+        return self._batch.centroids[self._index]
+
+    @property
+    def mbc_radius(self):
+        return self._batch.mbc_radii[self._index]
+
+    @property
+    def hull_area(self):
+        return self._batch.hull_areas[self._index]
+
+    @property
+    def max_distance(self):
+        return self._batch.max_distances[self._index]
+
+    @property
+    def mean_distance(self):
+        return self._batch.mean_distances[self._index]
+
+    def location(self):
+        """The row as a `Location` of geopy.Location objects.
+        """
+        addresses = self.addresses or [None] * len(self)
+        location = Location([
+            geopy.Location(address, geopy.Point(lat, lon, alt), {})
+            for address, (lon, lat, alt) in zip(
+                addresses, self.coordinates.tolist())
+        ])
+        location.providers = self.providers
+        return location
+
+
+BatchMetrics = namedtuple('BatchMetrics', [
+    'centroids', 'most_central', 'max_distances', 'mean_distances', 'mbc_radii'
+])
+BatchMetrics.__doc__ = """Error metrics of each row of a batch of geocodes.
+
+Attributes:
+    centroids (numpy.ndarray): (N, 2) (longitude, latitude) centroids.
+    most_central (numpy.ndarray): (N, 2) (longitude, latitude) of the
+        candidate nearest each centroid.
+    max_distances (numpy.ndarray): Greatest distance, in metres, of a
+        candidate from its centroid.
+    mean_distances (numpy.ndarray): Mean distance, in metres, of the
+        candidates from their centroid.
+    mbc_radii (numpy.ndarray): Radius, in metres, of the minimum bounding
+        circle of the candidates.
+
+Rows without candidates are NaN throughout.
+"""
+
+
+def batch_metrics(candidates):
+    """Computes the centroid, most central candidate, dispersion and minimum
+    bounding circle radius of many sets of candidates at once, without
+    building a `Location` (or any shapely geometry) for each set.
+
+    Args:
+        candidates: A `LocationBatch`, or a sequence of either `Location`
+            objects or arrays of (longitude, latitude[, altitude]).
+
+    Returns:
+        BatchMetrics
+    """
+    if isinstance(candidates, LocationBatch):
+        batch = candidates
+    else:
+        candidates = list(candidates)
+        if all(isinstance(c, Location) for c in candidates):
+            batch = LocationBatch.from_locations(candidates, addresses=False)
+        else:
+            batch = LocationBatch.from_arrays(candidates)
+    most_central = np.full((len(batch), 2), np.nan)
+    found = batch.most_central >= 0
+    most_central[found] = batch.coordinates[batch.most_central[found], :2]
+    return BatchMetrics(batch.centroids, most_central, batch.max_distances,
+                        batch.mean_distances, batch.mbc_radii)
@@ -0,0 +1,281 @@
+"""Metrics of errorgeopy, in the Prometheus text exposition format, for scraping
+from a running service. A `MetricsRegistry` renders:
+
+- the requests made by each registered (instrumented)
+  `errorgeopy.geocoders.GeocoderPool`, per provider and method (see
+  `errorgeopy.stats`);
+- the hits, misses and hit ratio of each registered cache (see
+  `errorgeopy.cache`); and
+- the time spent in `errorgeopy.location.Location` geometry operations and in
+  clustering, once timing is enabled with `enable_timing`.
+
+For example::
+
+    gpool = GeocoderPool(instrument=True, cache=MemoryCache())
+    registry = MetricsRegistry()
+    registry.register_pool(gpool)
+    enable_timing()
+    print(registry.render())
+    server = registry.serve(9100)  # Optional; serves /metrics
+
+Operations are timed into the module's `REGISTRY`, which is also the registry
+to register pools with if only one is needed. While timing is disabled (the
+default), a timed operation costs a single attribute lookup.
+
+.. moduleauthor Richard Law <richard.m.law@gmail.com>
+"""
+
+import time
+import threading
+from functools import wraps
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+
+from errorgeopy.stats import DEFAULT_BUCKETS, Histogram
+
+#: Content type of the Prometheus text exposition format.
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_POOL_COUNTERS = (
+    ('requests', 'errorgeopy_provider_requests_total',
+     'Requests made to geocoding providers.'),
+    ('timeouts', 'errorgeopy_provider_timeouts_total',
+     'Requests to geocoding providers that timed out.'),
+    ('errors', 'errorgeopy_provider_errors_total',
+     'Requests to geocoding providers that failed, other than by timing out.'),
+    ('empty', 'errorgeopy_provider_empty_responses_total',
+     'Requests to geocoding providers that found nothing.'),
+    ('candidates', 'errorgeopy_provider_candidates_total',
+     'Candidates returned by geocoding providers.'),
+)
+
+
+def _escape(value):
+    return (str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n'))
+
+
+def _labels(**labels):
+    return '{' + ','.join('{}="{}"'.format(k, _escape(v))
+                          for k, v in sorted(labels.items())) + '}'
+
+
+def _number(value):
+    if isinstance(value, str):
+        return value
+    return repr(float(value))
+
+
+def _header(lines, name, kind, help):
+    lines.append('# HELP {} {}'.format(name, help))
+    lines.append('# TYPE {} {}'.format(name, kind))
+
+
+def _histogram(lines, name, snapshot, **labels):
+    for bound, count in snapshot['buckets'].items():
+        lines.append('{}_bucket{} {}'.format(
+            name, _labels(le=_number(bound), **labels), count))
+    lines.append('{}_sum{} {}'.format(name, _labels(**labels),
+                                      _number(snapshot['sum'])))
+    lines.append('{}_count{} {}'.format(name, _labels(**labels),
+                                        snapshot['count']))
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class MetricsRegistry(object):
+    """A collection of pools and caches whose metrics are rendered together,
+    and of the durations of timed operations. Safe to use from several threads.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Kwargs:
+            buckets (sequence of float): Upper bounds, in seconds, of the
+                buckets of operation duration histograms.
+        """
+        self.buckets = buckets
+        self._pools = {}
+        self._caches = {}
+        self._operations = {}
+        self._lock = threading.Lock()
+
+    def register_pool(self, pool, name='default'):
+        """Adds a `errorgeopy.geocoders.GeocoderPool` to the registry, under
+        the :code:`pool` label :code:`name`. The pool must have been created
+        with :code:`instrument=True`. The pool's cache, if any, is registered
+        under the same name.
+        """
+        if pool.stats is None:
+            raise ValueError("Only instrumented pools can be registered")
+        with self._lock:
+            self._pools[name] = pool
+        if pool.cache is not None:
+            self.register_cache(pool.cache, name)
+
+    def register_cache(self, cache, name='default'):
+        """Adds a cache (an `errorgeopy.cache.Cache`) to the registry, under
+        the :code:`cache` label :code:`name`.
+        """
+        with self._lock:
+            self._caches[name] = cache
+
+    def unregister(self, name):
+        """Removes the pool and cache registered under :code:`name`.
+        """
+        with self._lock:
+            self._pools.pop(name, None)
+            self._caches.pop(name, None)
+
+    def observe(self, kind, operation, duration):
+        """Records that an operation took :code:`duration` seconds.
+
+        Args:
+            kind (str): The kind of operation ("geometry" or "clustering").
+            operation (str): Name of the operation.
+            duration (float): Seconds taken.
+        """
+        key = (kind, operation)
+        with self._lock:
+            histogram = self._operations.get(key)
+            if histogram is None:
+                histogram = self._operations[key] = Histogram(self.buckets)
+            histogram.observe(duration)
+
+    def reset(self):
+        """Discards the recorded operation durations.
+        """
+        with self._lock:
+            self._operations = {}
+
+    def render(self):
+        """The metrics, in the Prometheus text exposition format.
+        """
+        with self._lock:
+            pools = sorted(self._pools.items())
+            caches = sorted(self._caches.items())
+            operations = sorted(
+                (key, histogram.snapshot())
+                for key, histogram in self._operations.items())
+        lines = []
+        series = [(name, provider, method, stats)
+                  for name, pool in pools
+                  for provider, methods in sorted(pool.stats.snapshot().items())
+                  for method, stats in sorted(methods.items())]
+        for field, metric, help in _POOL_COUNTERS:
+            _header(lines, metric, 'counter', help)
+            for name, provider, method, stats in series:
+                lines.append('{}{} {}'.format(metric, _labels(
+                    pool=name, provider=provider, method=method), stats[field]))
+        metric = 'errorgeopy_provider_request_duration_seconds'
+        _header(lines, metric, 'histogram',
+                'Duration of requests to geocoding providers.')
+        for name, provider, method, stats in series:
+            _histogram(lines, metric, stats['latency'],
+                       pool=name, provider=provider, method=method)
+        cache_stats = [(name, cache.stats) for name, cache in caches]
+        for field, metric, kind, help in (
+                ('hits', 'errorgeopy_cache_hits_total', 'counter',
+                 'Cache lookups that found a response.'),
+                ('misses', 'errorgeopy_cache_misses_total', 'counter',
+                 'Cache lookups that found nothing.'),
+                ('hit_rate', 'errorgeopy_cache_hit_ratio', 'gauge',
+                 'Proportion of cache lookups that found a response.')):
+            _header(lines, metric, kind, help)
+            for name, stats in cache_stats:
+                lines.append('{}{} {}'.format(metric, _labels(cache=name),
+                                              _number(stats[field])))
+        metric = 'errorgeopy_operation_duration_seconds'
+        _header(lines, metric, 'histogram',
+                'Duration of Location geometry and clustering operations.')
+        for (kind, operation), snapshot in operations:
+            _histogram(lines, metric, snapshot, kind=kind, operation=operation)
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port=0, host='127.0.0.1'):
+        """Serves the metrics over HTTP (at "/metrics") from a background
+        thread.
+
+        Kwargs:
+            port (int): Port to listen on; 0 for any free port.
+            host (str): Address to listen on.
+
+        Returns:
+            The server; its :code:`server_address` is the address listened on,
+            and its :code:`shutdown` method stops it.
+        """
+        server = _Server((host, port), _Handler)
+        server.registry = self
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        return server
+
+
+#: The registry into which operations are timed.
+REGISTRY = MetricsRegistry()
+
+_timing = False
+
+
+def enable_timing():
+    """Starts timing `errorgeopy.location.Location` geometry operations and
+    clustering into `REGISTRY`.
+    """
+    global _timing
+    _timing = True
+
+
+def disable_timing():
+    """Stops timing operations.
+    """
+    global _timing
+    _timing = False
+
+
+def timed(kind, operation=None):
+    """Decorator that records the duration of each call of a function in
+    `REGISTRY` while timing is enabled.
+
+    Args:
+        kind (str): The kind of operation ("geometry" or "clustering").
+
+    Kwargs:
+        operation (str): Name of the operation; defaults to the name of the
+            function.
+    """
+
+    def decorator(func):
+        name = operation or func.__name__
+
+        @wraps(func)
+        def inner(*args, **kwargs):
+            if not _timing:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                REGISTRY.observe(kind, name, time.perf_counter() - start)
+
+        return inner
+
+    return decorator
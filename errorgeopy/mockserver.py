@@ -0,0 +1,389 @@
+"""An in-process fake geocoding web service, for testing and benchmarking a
+`errorgeopy.geocoders.GeocoderPool` end-to-end without network access.
+
+`MockGeocodingServer` answers HTTP requests in the JSON dialects of the
+Nominatim and ArcGIS services, as parsed by geopy's geocoders of the same
+names. Each response can be delayed by a latency drawn from a distribution, or
+replaced by an HTTP error at a given rate, per dialect. Queries are answered
+with canned responses where these have been added, or otherwise with
+synthetic candidates that are deterministic for a query (and that differ a
+little between dialects, as real services do)::
+
+    with MockGeocodingServer(latency=lognormal(0.05, 0.5), seed=1) as server:
+        server.add_response('Oriental Bay', [
+            ('Oriental Bay, Wellington', -41.2910862, 174.7882479)])
+        gpool = GeocoderPool(server.config())
+        location = gpool.geocode('Oriental Bay')
+
+`MockGeocodingServer.config` gives a pool configuration (geopy 2 geocoders
+accept a :code:`domain` and :code:`scheme`); `MockGeocodingServer.geocoders`
+gives geopy geocoders pointed at the server with any version of geopy.
+
+.. moduleauthor Richard Law <richard.m.law@gmail.com>
+"""
+
+import json
+import math
+import time
+import random
+import hashlib
+import threading
+from collections import Counter
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from urllib.parse import urlsplit, urlunsplit, parse_qs
+
+import geopy
+
+#: Paths of the services of each dialect, and the method each one implements.
+PATHS = {
+    '/search': ('Nominatim', 'geocode'),
+    '/reverse': ('Nominatim', 'reverse'),
+    '/arcgis/rest/services/World/GeocodeServer/findAddressCandidates':
+    ('ArcGIS', 'geocode'),
+    '/arcgis/rest/services/World/GeocodeServer/find': ('ArcGIS', 'geocode'),
+    '/arcgis/rest/services/World/GeocodeServer/reverseGeocode':
+    ('ArcGIS', 'reverse'),
+}
+
+#: The dialects spoken by the server.
+DIALECTS = ('Nominatim', 'ArcGIS')
+
+
+def constant(seconds):
+    """A latency distribution that always gives :code:`seconds`.
+    """
+    return lambda rng: seconds
+
+
+def uniform(low, high):
+    """A latency distribution uniform between :code:`low` and :code:`high`
+    seconds.
+    """
+    return lambda rng: rng.uniform(low, high)
+
+
+def exponential(mean):
+    """An exponential latency distribution with the given mean, in seconds.
+    """
+    return lambda rng: rng.expovariate(1 / mean)
+
+
+def lognormal(median, sigma):
+    """A log-normal latency distribution, with the given median (in seconds)
+    and shape; a long-tailed distribution typical of web services.
+    """
+    return lambda rng: rng.lognormvariate(math.log(median), sigma)
+
+
+def _distribution(latency):
+    if callable(latency):
+        return latency
+    return constant(latency or 0)
+
+
+def _digest(*parts):
+    """A deterministic float in [0, 1) for the given parts.
+    """
+    digest = hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+    return int(digest[:12], 16) / 16**12
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        status, body = self.server.mock.respond(url.path, params)
+        body = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class MockGeocodingServer(object):
+    """A fake geocoding service, speaking the Nominatim and ArcGIS dialects,
+    served over HTTP from a background thread. Use as a context manager, or
+    call `MockGeocodingServer.start` and `MockGeocodingServer.stop`.
+
+    Attributes:
+        requests (collections.Counter): Number of requests received, keyed by
+            (dialect, method).
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0, error_rate=0,
+                 error_status=500, candidates=1, spread=0.01,
+                 origin=(-41.29, 174.78), seed=None, dialects=None):
+        """
+        Kwargs:
+            host (str): Address to listen on.
+            port (int): Port to listen on; 0 for any free port.
+            latency: Delay before each response, in seconds; either a number
+                or a distribution (a function of a `random.Random`, such as
+                those built by `uniform`, `exponential` and `lognormal`).
+            error_rate (float): Proportion of requests answered with an error.
+            error_status (int): HTTP status of error responses.
+            candidates (int): Number of synthetic candidates for a forward
+                query without a canned response.
+            spread (float): Distance, in degrees, within which synthetic
+                candidates are scattered.
+            origin (tuple): (latitude, longitude) around which synthetic
+                candidates are placed.
+            seed: Seed for latencies and errors.
+            dialects (dict): Overrides of :code:`latency`, :code:`error_rate`
+                and :code:`error_status` for each dialect, e.g.
+                :code:`{'ArcGIS': {'error_rate': 0.5}}`.
+        """
+        defaults = {
+            'latency': latency,
+            'error_rate': error_rate,
+            'error_status': error_status
+        }
+        self._behaviour = {}
+        for dialect in DIALECTS:
+            behaviour = dict(defaults, **(dialects or {}).get(dialect, {}))
+            behaviour['latency'] = _distribution(behaviour['latency'])
+            self._behaviour[dialect] = behaviour
+        self.candidates = candidates
+        self.spread = spread
+        self.origin = origin
+        self.requests = Counter()
+        self._address = (host, port)
+        self._responses = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        """Starts serving, if not already serving.
+
+        Returns:
+            The `MockGeocodingServer`.
+        """
+        if self._server is None:
+            self._server = _Server(self._address, _Handler)
+            self._server.mock = self
+            thread = threading.Thread(
+                target=self._server.serve_forever, daemon=True)
+            thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    @property
+    def netloc(self):
+        """The "host:port" the server is listening on.
+        """
+        if self._server is None:
+            raise RuntimeError("The server has not been started")
+        return '{}:{}'.format(*self._server.server_address[:2])
+
+    @property
+    def url(self):
+        """The base URL of the server.
+        """
+        return 'http://{}'.format(self.netloc)
+
+    def config(self, dialects=DIALECTS):
+        """A `errorgeopy.geocoders.GeocoderPool` configuration of geocoders
+        pointed at the server (requires geopy 2, whose geocoders accept a
+        :code:`domain`).
+
+        Kwargs:
+            dialects (sequence of str): Names of the geocoders to configure.
+        """
+        config = {}
+        for dialect in dialects:
+            config[dialect] = {'domain': self.netloc, 'scheme': 'http'}
+            if dialect == 'Nominatim':
+                config[dialect]['user_agent'] = 'errorgeopy-mockserver'
+        return config
+
+    def geocoders(self, dialects=DIALECTS):
+        """geopy geocoders pointed at the server, for the :code:`geocoders`
+        argument of a `errorgeopy.geocoders.GeocoderPool`.
+
+        Kwargs:
+            dialects (sequence of str): Names of the geocoders to build.
+        """
+        geocoders = []
+        for dialect in dialects:
+            cls = geopy.get_geocoder_for_service(dialect)
+            try:
+                geocoder = cls(user_agent='errorgeopy-mockserver')
+            except TypeError:
+                geocoder = cls()
+            for attr in ('api', 'reverse_api'):
+                parts = urlsplit(getattr(geocoder, attr))
+                setattr(geocoder, attr,
+                        urlunsplit(('http', self.netloc) + parts[2:]))
+            geocoders.append(geocoder)
+        return geocoders
+
+    def add_response(self, query, candidates, dialect=None):
+        """Adds a canned response.
+
+        Args:
+            query (str or tuple): An address (for forward geocoding) or a
+                (latitude, longitude) tuple (for reverse geocoding).
+            candidates (list): (address, latitude, longitude) tuples; an empty
+                list for a query that finds nothing.
+
+        Kwargs:
+            dialect (str): The dialect the response is for; all dialects if
+                None.
+        """
+        if isinstance(query, (list, tuple)):
+            query = tuple(round(float(q), 6) for q in query)
+        with self._lock:
+            self._responses[(dialect, query)] = list(candidates)
+
+    def _candidates(self, dialect, query):
+        for key in ((dialect, query), (None, query)):
+            if key in self._responses:
+                return self._responses[key]
+        if isinstance(query, tuple):
+            number = 1 + int(_digest(query) * 200)
+            return [('{} Mock Street, Wellington'.format(number), ) + query]
+        candidates = []
+        for i in range(self.candidates):
+            bearing = 2 * math.pi * _digest(query, i)
+            distance = self.spread * _digest(query, i, dialect)
+            candidates.append(
+                ('{} ({})'.format(query, i + 1),
+                 self.origin[0] + distance * math.sin(bearing),
+                 self.origin[1] + distance * math.cos(bearing)))
+        return candidates
+
+    def respond(self, path, params):
+        """The HTTP status and JSON body of the response to a request.
+
+        Args:
+            path (str): The path of the request URL.
+            params (dict): The query parameters of the request.
+
+        Returns:
+            tuple: (status, body)
+        """
+        if path not in PATHS:
+            return 404, {'error': 'Not found: {}'.format(path)}
+        dialect, method = PATHS[path]
+        behaviour = self._behaviour[dialect]
+        with self._lock:
+            self.requests[(dialect, method)] += 1
+            delay = behaviour['latency'](self._random)
+            failed = self._random.random() < behaviour['error_rate']
+        if delay > 0:
+            time.sleep(delay)
+        if failed:
+            return behaviour['error_status'], {'error': 'Service unavailable'}
+        if method == 'reverse':
+            if dialect == 'Nominatim':
+                query = (params['lat'], params['lon'])
+            else:
+                query = tuple(params['location'].split(',')[::-1])
+            query = tuple(round(float(q), 6) for q in query)
+        else:
+            query = params.get('q') or params.get('singleLine') or params.get(
+                'text', '')
+        with self._lock:
+            candidates = self._candidates(dialect, query)
+        limit = params.get('limit') or params.get('maxLocations')
+        if limit is not None:
+            candidates = candidates[:int(limit)]
+        return 200, getattr(self, '_{}_{}'.format(dialect.lower(), method))(
+            path, candidates)
+
+    @staticmethod
+    def _nominatim_geocode(path, candidates):
+        return [{
+            'place_id': i,
+            'lat': str(lat),
+            'lon': str(lon),
+            'display_name': address
+        } for i, (address, lat, lon) in enumerate(candidates)]
+
+    @staticmethod
+    def _nominatim_reverse(path, candidates):
+        if not candidates:
+            return {'error': 'Unable to geocode'}
+        address, lat, lon = candidates[0]
+        return {'lat': str(lat), 'lon': str(lon), 'display_name': address}
+
+    @staticmethod
+    def _arcgis_geocode(path, candidates):
+        if path.endswith('/find'):
+            # The older endpoint, used by geopy 1.x
+            return {
+                'locations': [{
+                    'name': address,
+                    'feature': {
+                        'geometry': {
+                            'x': lon,
+                            'y': lat
+                        },
+                        'attributes': {}
+                    }
+                } for address, lat, lon in candidates]
+            }
+        return {
+            'candidates': [{
+                'address': address,
+                'location': {
+                    'x': lon,
+                    'y': lat
+                },
+                'score': 100,
+                'attributes': {}
+            } for address, lat, lon in candidates]
+        }
+
+    @staticmethod
+    def _arcgis_reverse(path, candidates):
+        if not candidates:
+            return {
+                'error': {
+                    'code': 400,
+                    'message': 'Cannot perform query. Invalid query parameters.',
+                    'details':
+                    ['Unable to find address for the specified location.']
+                }
+            }
+        address, lat, lon = candidates[0]
+        return {
+            'address': {
+                'Match_addr': address,
+                'LongLabel': address,
+                'Address': '',
+                'City': '',
+                'Region': '',
+                'Postal': '',
+                'CountryCode': ''
+            },
+            'location': {
+                'x': lon,
+                'y': lat
+            }
+        }
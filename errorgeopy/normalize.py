@@ -0,0 +1,124 @@
+"""Normalisation of geocoding queries. Queries that differ only trivially (in
+case, whitespace, punctuation or abbreviation, or in coordinates beyond a given
+precision) are put into one canonical form by a `QueryNormalizer`. A
+`errorgeopy.geocoders.GeocoderPool` given a normalizer uses the canonical
+form of each query to key its cache and to coalesce identical requests, so
+that near-duplicate queries cost one request. The providers are still sent the
+query as it was given: the canonical form is only a key, and may not mean the
+same thing to a provider (the expansion of "St" is right for "High St", but
+not for "St Heliers").
+
+    >>> normalizer = QueryNormalizer()
+    >>> normalizer.geocode('66 Great North Road, Grey Lynn')
+    '66 great north road grey lynn'
+    >>> normalizer.geocode('66  great north rd. grey lynn')
+    '66 great north road grey lynn'
+    >>> normalizer.reverse((-41.29108621, 174.788247912))
+    (-41.291086, 174.788248)
+
+.. moduleauthor Richard Law <richard.m.law@gmail.com>
+"""
+
+import re
+
+import geopy
+
+#: Default expansions of common (English-language) address abbreviations.
+ABBREVIATIONS = {
+    'ave': 'avenue',
+    'av': 'avenue',
+    'blvd': 'boulevard',
+    'cl': 'close',
+    'cres': 'crescent',
+    'ct': 'court',
+    'dr': 'drive',
+    'hwy': 'highway',
+    'ln': 'lane',
+    'mt': 'mount',
+    'nth': 'north',
+    'pde': 'parade',
+    'pl': 'place',
+    'rd': 'road',
+    'sq': 'square',
+    'st': 'street',
+    'sth': 'south',
+    'tce': 'terrace',
+}
+
+_PUNCTUATION = re.compile(r'[^\w\s]', re.UNICODE)
+
+
+class QueryNormalizer(object):
+    """A configurable pipeline that puts forward (address) queries and reverse
+    (point) queries into a canonical form.
+
+    Forward queries pass through each of the enabled steps, in order: case
+    folding, punctuation removal, abbreviation expansion and whitespace
+    collapsing, followed by any extra steps. Reverse queries are reduced to a
+    (latitude, longitude) tuple rounded to :code:`precision` decimal places.
+    """
+
+    def __init__(self, casefold=True, punctuation=True,
+                 abbreviations=ABBREVIATIONS, whitespace=True, precision=6,
+                 steps=()):
+        """
+        Kwargs:
+            casefold (bool): Whether to fold forward queries to lower case.
+            punctuation (bool): Whether to replace punctuation with spaces.
+            abbreviations (dict): Mapping of (lower case) abbreviations to
+                their expansions, applied word by word. None to disable.
+            whitespace (bool): Whether to collapse runs of whitespace, and
+                strip leading and trailing whitespace.
+            precision (int): Number of decimal places to which the coordinates
+                of reverse queries are rounded. None to disable.
+            steps (sequence of functions): Extra steps, each taking and
+                returning a string, applied to forward queries after the
+                built-in steps.
+        """
+        self.precision = precision
+        self.abbreviations = abbreviations
+        self.steps = []
+        if casefold:
+            self.steps.append(str.casefold)
+        if punctuation:
+            self.steps.append(lambda q: _PUNCTUATION.sub(' ', q))
+        if abbreviations:
+            self.steps.append(self._expand)
+        if whitespace:
+            self.steps.append(lambda q: ' '.join(q.split()))
+        self.steps.extend(steps)
+
+    def _expand(self, query):
+        return ' '.join(
+            self.abbreviations.get(word.lower(), word)
+            for word in query.split())
+
+    def geocode(self, query):
+        """The canonical form of a forward geocoding query (an address).
+        """
+        for step in self.steps:
+            query = step(query)
+        return query
+
+    def reverse(self, query):
+        """The canonical form of a reverse geocoding query: a point, given in
+        any form accepted by `errorgeopy.geocoders.GeocoderPool.reverse`, as a
+        (latitude, longitude) tuple.
+        """
+        if isinstance(query, (list, tuple)):
+            latitude, longitude = float(query[0]), float(query[1])
+        else:
+            point = geopy.Point(query)
+            latitude, longitude = point.latitude, point.longitude
+        if self.precision is not None:
+            latitude = round(latitude, self.precision)
+            longitude = round(longitude, self.precision)
+        return latitude, longitude
+
+    def normalize(self, query, method):
+        """The canonical form of :code:`query` for the geocoding method named
+        :code:`method` ("geocode" or "reverse").
+        """
+        if method == 'reverse':
+            return self.reverse(query)
+        return self.geocode(query)
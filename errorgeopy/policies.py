@@ -0,0 +1,353 @@
+"""Policies governing how a `errorgeopy.geocoders.GeocoderPool` makes requests
+to each of its geocoding services. Policies are configured per geocoder,
+alongside the geopy options in the pool's configuration::
+
+    Nominatim:
+      rate_limit:
+        rate: 1
+        burst: 1
+      geocode:
+        exactly_one: false
+
+- `TokenBucket` limits the rate of requests made to a service (the
+  :code:`rate_limit` option, either a number of requests per second or a
+  dictionary of keyword arguments).
+- `CircuitBreaker` stops requests being made to a service that is failing or
+  responding too slowly, until it has had time to recover (the
+  :code:`circuit_breaker` option, a dictionary of keyword arguments).
+- `RetryPolicy` retries requests that fail with a transient error, backing off
+  exponentially (the :code:`retry` option, a dictionary of keyword arguments).
+
+Each option may also be given as an instance of its policy. Pools of geopy
+geocoder objects (rather than a configuration) take the same options through
+the :code:`policies` argument of `errorgeopy.geocoders.GeocoderPool`.
+
+.. moduleauthor Richard Law <richard.m.law@gmail.com>
+"""
+
+import time
+import random
+import builtins
+import threading
+from collections import deque
+
+import geopy.exc
+
+
+class TokenBucket(object):
+    """A token bucket rate limiter. Tokens accrue at :code:`rate` per second,
+    up to :code:`burst` tokens; each request spends one token. Safe to use from
+    several threads.
+    """
+
+    def __init__(self, rate, burst=1):
+        """
+        Args:
+            rate (float): The sustained number of requests allowed per second.
+
+        Kwargs:
+            burst (float): The number of requests that may be made at once
+                after a period of inactivity.
+        """
+        if rate <= 0 or burst < 1:
+            raise ValueError(
+                "rate must be positive, and burst must be at least 1")
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds a `TokenBucket` from a geocoder's :code:`rate_limit` option;
+        either a number of requests per second, or a dictionary of keyword
+        arguments. Returns None if :code:`config` is None, and
+        :code:`config` itself if it is already a `TokenBucket`.
+        """
+        if config is None or isinstance(config, cls):
+            return config
+        if isinstance(config, dict):
+            return cls(**config)
+        return cls(config)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst,
+                           self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self):
+        """Spends a token if one is available.
+
+        Returns:
+            bool: Whether a token was spent.
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def delay(self):
+        """The number of seconds until a token will be available (0 if one is
+        available now). Does not spend a token.
+        """
+        with self._lock:
+            self._refill()
+            return max(0.0, (1 - self._tokens) / self.rate)
+
+    def reserve(self):
+        """Spends a token, which may not be available yet.
+
+        Returns:
+            float: The number of seconds the caller must wait before making
+            its request.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def refund(self):
+        """Returns a token spent (e.g. by `TokenBucket.reserve`) on a request
+        that was never made, such as one cancelled while it waited.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.burst, self._tokens + 1)
+
+    def acquire(self):
+        """Blocks until a token is available, and spends it.
+        """
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+
+
+#: Exceptions that `CircuitBreaker` does not record by default, because the
+#: fault is in the request rather than the service.
+CALLER_ERRORS = (geopy.exc.GeocoderQueryError, )
+
+
+class CircuitBreaker(object):
+    """A circuit breaker for a geocoding service. The outcomes of recent
+    requests are recorded; when too many of them fail (or are too slow), the
+    circuit "opens" and requests to the service are skipped. After
+    :code:`reset_timeout` seconds the circuit is "half-open": a single probe
+    request is allowed through, and the circuit closes again if it succeeds.
+    Errors that are the caller's fault (`CircuitBreaker.ignores`) are not
+    recorded. Safe to use from several threads.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_rate=0.5, window=20, min_calls=5,
+                 slow_call_duration=None, reset_timeout=30,
+                 ignore=CALLER_ERRORS):
+        """
+        Kwargs:
+            failure_rate (float): The proportion of failed requests, out of the
+                last `window`, at which the circuit opens.
+            window (int): The number of recent requests considered.
+            min_calls (int): The minimum number of recorded requests before
+                the circuit may open.
+            slow_call_duration (float): Requests taking longer than this many
+                seconds count as failures, even if they succeed.
+            reset_timeout (float): Seconds to wait after opening before a probe
+                request is allowed.
+            ignore (tuple): Exception classes (or their names, from
+                :code:`geopy.exc` or builtins) that say nothing of the health
+                of the service, and so are not recorded.
+        """
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.slow_call_duration = slow_call_duration
+        self.reset_timeout = reset_timeout
+        self.ignore = tuple(_exception_class(e) for e in ignore)
+        self._outcomes = deque(maxlen=window)
+        self._state = self.CLOSED
+        self._opened = None
+        self._probe = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds a `CircuitBreaker` from a geocoder's :code:`circuit_breaker`
+        option, a dictionary of keyword arguments (which may be empty, for the
+        defaults). Returns None if :code:`config` is None, and :code:`config`
+        itself if it is already a `CircuitBreaker`.
+        """
+        if config is None or isinstance(config, cls):
+            return config
+        return cls(**config)
+
+    @property
+    def state(self):
+        """One of "closed", "open" or "half-open".
+        """
+        with self._lock:
+            if (self._state == self.OPEN and
+                    time.monotonic() - self._opened >= self.reset_timeout):
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """Whether a request may be made to the service now. When half-open,
+        only one caller (the probe) is allowed at a time.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if now - self._opened < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+            if (self._probe is not None and
+                    now - self._probe < self.reset_timeout):
+                return False
+            self._probe = now
+            return True
+
+    def ignores(self, error):
+        """Whether a request that raised :code:`error` should go unrecorded
+        (see `CircuitBreaker.release`).
+        """
+        return isinstance(error, self.ignore)
+
+    def release(self):
+        """Gives up a request allowed by `CircuitBreaker.allow` without
+        recording an outcome (e.g. one that was abandoned before it was made,
+        or that failed through the fault of the caller). If it was the probe
+        of a half-open circuit, another probe is allowed straight away.
+        """
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probe = None
+
+    def record(self, success, duration=None):
+        """Records the outcome of a request to the service.
+
+        Args:
+            success (bool): Whether the request succeeded.
+
+        Kwargs:
+            duration (float): How long the request took, in seconds.
+        """
+        if (success and duration is not None and
+                self.slow_call_duration is not None and
+                duration > self.slow_call_duration):
+            success = False
+        with self._lock:
+            if self._state == self.OPEN:
+                # A request that started before the circuit opened
+                return
+            if self._state == self.HALF_OPEN:
+                self._probe = None
+                if success:
+                    self._state = self.CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._state = self.OPEN
+                    self._opened = time.monotonic()
+                return
+            self._outcomes.append(success)
+            calls = len(self._outcomes)
+            failures = calls - sum(self._outcomes)
+            if (calls >= self.min_calls and
+                    failures / calls >= self.failure_rate):
+                self._state = self.OPEN
+                self._opened = time.monotonic()
+
+
+#: Exceptions that `RetryPolicy` retries by default.
+RETRYABLE = (geopy.exc.GeocoderServiceError, ConnectionError)
+
+#: Subclasses of the `RETRYABLE` exceptions that are never retried by default,
+#: because repeating the request cannot change the outcome.
+NOT_RETRYABLE = (geopy.exc.GeocoderQueryError,
+                 geopy.exc.GeocoderAuthenticationFailure,
+                 geopy.exc.GeocoderInsufficientPrivileges)
+
+
+def _exception_class(name):
+    """Resolves the name of an exception class, from geopy.exc or builtins.
+    """
+    if not isinstance(name, str):
+        return name
+    cls = getattr(geopy.exc, name, None) or getattr(builtins, name, None)
+    if not (isinstance(cls, type) and issubclass(cls, BaseException)):
+        raise ValueError("Unknown exception class: {}".format(name))
+    return cls
+
+
+class RetryPolicy(object):
+    """Retries requests to a geocoding service that fail with a transient
+    error. The delay before each retry grows exponentially, and is randomised
+    ("full jitter") so that retries from many threads do not arrive together.
+    """
+
+    def __init__(self, max_attempts=3, backoff=0.5, multiplier=2,
+                 max_backoff=10, jitter=True, retry_on=RETRYABLE,
+                 give_up_on=NOT_RETRYABLE, seed=None):
+        """
+        Kwargs:
+            max_attempts (int): The maximum number of attempts at a request,
+                including the first.
+            backoff (float): The delay, in seconds, before the first retry.
+            multiplier (float): The factor by which the delay grows with each
+                further retry.
+            max_backoff (float): The maximum delay, in seconds.
+            jitter (bool): Whether to draw each delay uniformly at random from
+                between zero and the exponential backoff.
+            retry_on (tuple): Exception classes (or their names, from
+                :code:`geopy.exc` or builtins) that are retried.
+            give_up_on (tuple): Exception classes (or names) that are not
+                retried, even if they are subclasses of `retry_on`.
+            seed: Seed for the random delays.
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.multiplier = multiplier
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_on = tuple(_exception_class(e) for e in retry_on)
+        self.give_up_on = tuple(_exception_class(e) for e in give_up_on)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds a `RetryPolicy` from a geocoder's :code:`retry` option, a
+        dictionary of keyword arguments (which may be empty, for the
+        defaults). Returns None if :code:`config` is None, and :code:`config`
+        itself if it is already a `RetryPolicy`.
+        """
+        if config is None or isinstance(config, cls):
+            return config
+        return cls(**config)
+
+    def should_retry(self, error, attempt):
+        """Whether a request that raised :code:`error` on its
+        :code:`attempt`-th attempt should be tried again.
+        """
+        return (attempt < self.max_attempts and
+                isinstance(error, self.retry_on) and
+                not isinstance(error, self.give_up_on))
+
+    def delay(self, attempt):
+        """The number of seconds to wait after the :code:`attempt`-th attempt
+        at a request fails, before trying again.
+        """
+        delay = min(self.max_backoff,
+                    self.backoff * self.multiplier**(attempt - 1))
+        if self.jitter:
+            with self._lock:
+                delay = self._random.uniform(0, delay)
+        return delay
@@ -0,0 +1,136 @@
+"""Projection of candidate locations (longitude and latitude, on WGS84) into
+metric coordinate reference systems, so that error geometry can be measured in
+metres rather than degrees.
+
+pyproj transformers are slow to build, so each one is built once (per thread,
+as they are not safe to share between threads) and cached, keyed by its source
+and target coordinate reference systems. Each transforms a whole array of
+points in one call::
+
+    crs = local_crs(location.coordinates)
+    xy = project(location.coordinates, crs)
+
+`local_crs` chooses a projection suited to a set of points: the UTM zone of
+their centre if they span no more than a zone's width, or else an azimuthal
+equidistant projection centred on them. A coordinate reference system is given
+either as an EPSG code (an int) or as a PROJ string.
+
+.. moduleauthor Richard Law <richard.m.law@gmail.com>
+"""
+
+import threading
+from collections import OrderedDict
+from functools import partial
+
+import numpy as np
+
+#: EPSG code of the coordinate reference system of geocoder responses.
+WGS84 = 4326
+
+#: Greatest span of longitude, in degrees, of points projected to a UTM zone;
+#: wider sets of points are given an azimuthal equidistant projection.
+UTM_MAX_SPAN = 6.0
+
+#: Maximum number of transformers cached (per thread).
+CACHE_SIZE = 128
+
+_local = threading.local()
+
+
+def _crs(crs):
+    if isinstance(crs, (int, np.integer)) or str(crs).isdigit():
+        return 'EPSG:{}'.format(crs)
+    return crs
+
+
+def get_transformer(source, target):
+    """A function transforming coordinates from :code:`source` to
+    :code:`target` (each an EPSG code or PROJ string). It takes and returns
+    arrays of x (or longitude) and y (or latitude), and optionally z, as
+    expected by `shapely.ops.transform`. Cached per thread.
+    """
+    cache = getattr(_local, 'transformers', None)
+    if cache is None:
+        cache = _local.transformers = OrderedDict()
+    key = (source, target)
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+    import pyproj
+    if hasattr(pyproj, 'Transformer'):
+        transform = pyproj.Transformer.from_crs(
+            _crs(source), _crs(target), always_xy=True).transform
+    else:
+        # pyproj < 2
+        transform = partial(pyproj.transform, *(
+            pyproj.Proj(init=_crs(crs)) if str(crs).isdigit() else
+            pyproj.Proj(crs) for crs in (source, target)))
+    cache[key] = transform
+    if len(cache) > CACHE_SIZE:
+        cache.popitem(last=False)
+    return transform
+
+
+def project(coordinates, crs, source=WGS84):
+    """Projects an (n, >=2) array of (longitude, latitude, ...) to an (n, 2)
+    array of (x, y) in :code:`crs`.
+    """
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    if not len(coordinates):
+        return np.zeros((0, 2))
+    x, y = get_transformer(source, crs)(coordinates[:, 0], coordinates[:, 1])
+    return np.column_stack([x, y])
+
+
+def unproject(coordinates, crs, target=WGS84):
+    """Projects an (n, >=2) array of (x, y, ...) in :code:`crs` back to an
+    (n, 2) array of (longitude, latitude).
+    """
+    return project(coordinates, target, source=crs)
+
+
+def utm_crs(longitude, latitude):
+    """The EPSG code of the (WGS84) UTM zone of a point.
+    """
+    zone = int((longitude + 180) // 6) % 60 + 1
+    return (32600 if latitude >= 0 else 32700) + zone
+
+
+def azimuthal_crs(longitude, latitude):
+    """A PROJ string of the azimuthal equidistant projection centred on a
+    point (rounded to a tenth of a degree, so that nearby sets of points share
+    a transformer).
+    """
+    return ('+proj=aeqd +lat_0={:.1f} +lon_0={:.1f} +x_0=0 +y_0=0 '
+            '+datum=WGS84 +units=m +no_defs'.format(latitude, longitude))
+
+
+def _unwrap(longitudes):
+    """Longitudes expressed relative to their circular mean, within 180
+    degrees of it, so that sets of points crossing the antimeridian are not
+    taken to span the globe.
+    """
+    radians = np.radians(longitudes)
+    centre = np.degrees(
+        np.arctan2(np.sin(radians).mean(), np.cos(radians).mean()))
+    return centre + (longitudes - centre + 180) % 360 - 180
+
+
+def local_crs(coordinates):
+    """A metric coordinate reference system suited to an (n, >=2) array of
+    (longitude, latitude, ...): the UTM zone of their centre, if they span no
+    more than `UTM_MAX_SPAN` degrees of longitude (and lie where UTM is
+    defined), or else an azimuthal equidistant projection about their centre.
+    Spans and centres are measured across the antimeridian where that is
+    shorter. None if there are no points.
+    """
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    if not len(coordinates):
+        return None
+    longitudes, latitudes = _unwrap(coordinates[:, 0]), coordinates[:, 1]
+    longitude = (longitudes.mean() + 180) % 360 - 180
+    latitude = latitudes.mean()
+    if (longitudes.max() - longitudes.min() <= UTM_MAX_SPAN
+            and latitudes.min() >= -80 and latitudes.max() <= 84):
+        return utm_crs(longitude, latitude)
+    return azimuthal_crs(longitude, latitude)
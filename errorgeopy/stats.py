@@ -0,0 +1,145 @@
+"""Instrumentation of the requests a `errorgeopy.geocoders.GeocoderPool` makes
+to its geocoding services. Each request to a provider produces a
+`RequestEvent`, which is passed to any hooks registered with the pool and, if
+the pool is instrumented, aggregated into `PoolStats`: per provider and method,
+a latency histogram and counts of requests, timeouts, errors, empty responses
+and candidates returned. For example::
+
+    gpool = GeocoderPool(instrument=True)
+    gpool.add_hook(lambda event: print(event.provider, event.duration))
+    gpool.geocode('Oriental Bay, Wellington')
+    gpool.stats.snapshot()['Nominatim']['geocode']['requests']
+
+When a pool is neither instrumented nor has any hooks, no events are built.
+
+.. moduleauthor Richard Law <richard.m.law@gmail.com>
+"""
+
+import bisect
+import threading
+from collections import namedtuple
+
+import geopy.exc
+
+#: Default upper bounds (in seconds) of the latency histogram buckets.
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+RequestEvent = namedtuple(
+    'RequestEvent',
+    ['provider', 'method', 'query', 'duration', 'candidates', 'error'])
+RequestEvent.__doc__ = """The outcome of one request (attempt) to a provider.
+
+Attributes:
+    provider (str): Name of the geocoder.
+    method (str): "geocode" or "reverse".
+    query: The query, as sent to the provider.
+    duration (float): Seconds taken by the request.
+    candidates (int): Number of candidates in the response (0 on error).
+    error (Exception): The exception raised by the request, or None.
+"""
+
+
+class Histogram(object):
+    """A cumulative histogram of observations, with fixed bucket bounds. Not
+    thread-safe by itself; `PoolStats` serialises access.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        """Dictionary with the cumulative count of observations less than or
+        equal to each bucket bound (keyed by the bound, with "+Inf" for all
+        observations), and the total count and sum of observations.
+        """
+        cumulative, total = {}, 0
+        for bound, count in zip(self.buckets + ('+Inf', ), self.counts):
+            total += count
+            cumulative[bound] = total
+        return {'buckets': cumulative, 'count': self.count, 'sum': self.sum}
+
+
+class ProviderStats(object):
+    """Aggregated statistics of the requests made to one provider with one
+    method.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.requests = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.empty = 0
+        self.candidates = 0
+        self.latency = Histogram(buckets)
+
+    def record(self, event):
+        self.requests += 1
+        self.latency.observe(event.duration)
+        if event.error is not None:
+            if isinstance(event.error, geopy.exc.GeocoderTimedOut):
+                self.timeouts += 1
+            else:
+                self.errors += 1
+        elif not event.candidates:
+            self.empty += 1
+        self.candidates += event.candidates
+
+    def snapshot(self):
+        return {
+            'requests': self.requests,
+            'timeouts': self.timeouts,
+            'errors': self.errors,
+            'empty': self.empty,
+            'candidates': self.candidates,
+            'latency': self.latency.snapshot()
+        }
+
+
+class PoolStats(object):
+    """Statistics of the requests made by a pool, by provider and method. Safe
+    to update from several threads.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Kwargs:
+            buckets (sequence of float): Upper bounds, in seconds, of the
+                latency histogram buckets.
+        """
+        self.buckets = buckets
+        self._providers = {}
+        self._lock = threading.Lock()
+
+    def record(self, event):
+        """Adds a `RequestEvent` to the statistics.
+        """
+        key = (event.provider, event.method)
+        with self._lock:
+            stats = self._providers.get(key)
+            if stats is None:
+                stats = self._providers[key] = ProviderStats(self.buckets)
+            stats.record(event)
+
+    def reset(self):
+        """Discards all recorded statistics.
+        """
+        with self._lock:
+            self._providers = {}
+
+    def snapshot(self):
+        """A copy of the statistics, as nested dictionaries keyed by provider
+        name and then by method ("geocode" or "reverse").
+        """
+        with self._lock:
+            snapshot = {}
+            for (provider, method), stats in self._providers.items():
+                snapshot.setdefault(provider, {})[method] = stats.snapshot()
+            return snapshot
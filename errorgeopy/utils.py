@@ -1,27 +1,25 @@
 """Utility functions for ErrorGeoPy. Inteded to be private functions, their
 call signatures are not considered strictly static.
 
+The scientific libraries (shapely, scipy, scikit-learn and pyproj) are slow to
+import, so they are imported by the functions that need them, when first
+called, rather than when this module is imported.
+
 .. moduleauthor Richard Law <richard.m.law@gmail.com>
 """
 
+import math
+import random
 import numpy as np
 from collections import namedtuple
-from functools import partial, wraps
+from functools import wraps
 from itertools import compress
 import inspect
 
 import geopy
 from geopy.point import Point as GeopyPoint
-from shapely.geometry import Point, MultiPoint, Polygon
-from scipy.spatial import Delaunay
-from scipy.spatial.distance import pdist, squareform
-from sklearn.cluster import MeanShift, AffinityPropagation, DBSCAN, estimate_bandwidth
-from sklearn.preprocessing import Imputer, StandardScaler
-from sklearn import metrics
-from sklearn.metrics.pairwise import euclidean_distances
-import pyproj
 
-from errorgeopy.smallestenclosingcircle import make_circle
+from errorgeopy.metrics import timed
 
 
 def check_location_type(func):
@@ -60,6 +58,7 @@ def geopy_point_to_shapely_point(point):
     Args:
         point (geopy.point.Point)
     """
+    from shapely.geometry import Point
     if not isinstance(point, GeopyPoint):
         raise TypeError
     return Point(point.longitude, point.latitude, point.altitude)
@@ -82,30 +81,87 @@ def array_geopy_points_to_xyz_tuples(points):
     Args:
         points (sequence of geopy.point.Point objects)
     """
-    return [geopy_point_to_shapely_point(p).coords[0] for p in points]
+    return [tuple(c) for c in array_geopy_points_to_xyz_array(points).tolist()]
+
+
+def array_geopy_points_to_xyz_array(points):
+    """Converts an array of geopy.point.Point objects to an (N, 3) numpy array
+    of float64 (x, y, z), i.e. (longitude, latitude, altitude).
+
+    Args:
+        points (sequence of geopy.point.Point objects)
+    """
+    return np.array(
+        [(p.longitude, p.latitude, p.altitude) for p in points],
+        dtype=np.float64).reshape((-1, 3))
+
 
+def xyz_array_to_shapely_points(coordinates):
+    """Converts an (N, 3) array of (x, y, z) coordinates to an array of
+    shapely.geometry.Point objects.
+    """
+    from shapely.geometry import Point
+    return [Point(x, y, z) for x, y, z in coordinates.tolist()]
 
-def sq_norm(v):
-    return np.linalg.norm(v)**2
+
+def circumcircles(triangles):
+    """The circumcentres and circumradii of an (M, 3, 2) array of triangles,
+    computed in closed form in one vectorised (float64) pass:
+    https://en.wikipedia.org/wiki/Circumscribed_circle#Cartesian_coordinates_2
+
+    Degenerate (collinear) triangles have a NaN centre and infinite radius.
+
+    Returns:
+        tuple: ((M, 2) array of centres, (M, ) array of radii)
+    """
+    triangles = np.asarray(triangles, dtype=np.float64).reshape((-1, 3, 2))
+    # Relative to the first vertex, for precision far from the origin
+    origin = triangles[:, 0]
+    b = triangles[:, 1] - origin
+    c = triangles[:, 2] - origin
+    d = 2 * (b[:, 0] * c[:, 1] - b[:, 1] * c[:, 0])
+    b2 = (b**2).sum(axis=1)
+    c2 = (c**2).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        u = np.stack([(c[:, 1] * b2 - b[:, 1] * c2) / d,
+                      (b[:, 0] * c2 - c[:, 0] * b2) / d], axis=1)
+    radii = np.hypot(u[:, 0], u[:, 1])
+    degenerate = d == 0
+    u[degenerate] = np.nan
+    radii[degenerate | ~np.isfinite(radii)] = np.inf
+    return origin + u, radii
+
+
+def circumradii(triangles):
+    """The circumradii of an (M, 3, 2) array of triangles (infinite for
+    degenerate triangles).
+    """
+    return circumcircles(triangles)[1]
 
 
 def circumcircle(points, simplex):
-    """Computes the circumcentre and circumradius of a triangle:
-    https://en.wikipedia.org/wiki/Circumscribed_circle#Circumcircle_equations
-    """
-    A = [points[simplex[k]] for k in range(3)]
-    M = np.asarray(
-        [[1.0] * 4] +
-        [[sq_norm(A[k]), A[k][0], A[k][1], 1.0] for k in range(3)],
-        dtype=np.float32)
-    S = np.array([
-        0.5 * np.linalg.det(M[1:, [0, 2, 3]]),
-        -0.5 * np.linalg.det(M[1:, [0, 1, 3]])
-    ])
-    a = np.linalg.det(M[1:, 1:])
-    b = np.linalg.det(M[1:, [0, 1, 2]])
-    centre, radius = S / a, np.sqrt(b / a + sq_norm(S) / a**2)
-    return centre, radius
+    """Computes the circumcentre and circumradius of a triangle: the
+    vertices of :code:`points` indexed by :code:`simplex`. See
+    `circumcircles` for many triangles at once.
+    """
+    centres, radii = circumcircles(np.asarray(points)[list(simplex)][:, :2])
+    return centres[0], radii[0]
+
+
+def triangle_quality(triangles):
+    """The radius ratio of each of an (M, 3, 2) array of triangles: twice the
+    inradius over the circumradius, which is 1 for an equilateral triangle
+    and tends to 0 as a triangle becomes a sliver.
+    """
+    triangles = np.asarray(triangles, dtype=np.float64).reshape((-1, 3, 2))
+    sides = np.hypot(*(triangles - np.roll(triangles, 1, axis=1)).T).T
+    b = triangles[:, 1] - triangles[:, 0]
+    c = triangles[:, 2] - triangles[:, 0]
+    area = np.abs(b[:, 0] * c[:, 1] - b[:, 1] * c[:, 0]) / 2
+    # 2r / R, with r = area / s and R = abc / (4 area)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        quality = 16 * area**2 / (sides.sum(axis=1) * sides.prod(axis=1))
+    return np.nan_to_num(quality)
 
 
 def get_alpha_complex(alpha, points, simplexes):
@@ -116,29 +172,59 @@ def get_alpha_complex(alpha, points, simplexes):
         points: data points
         simplexes: the list of indices that define 2-simplexes in the Delaunay
             triangulation
+
+    Returns:
+        The (K, 3) array of the simplexes whose circumradius is less than
+        alpha.
     """
-    return filter(lambda simplex: circumcircle(points, simplex)[1] < alpha,
-                  simplexes)
+    points = np.asarray(points, dtype=np.float64)
+    simplexes = np.asarray(simplexes)
+    return simplexes[circumradii(points[simplexes]) < alpha]
 
 
 def concave_hull(points, alpha, delunay_args=None):
-    """Computes the concave hull (alpha-shape) of a set of points.
+    """Computes the concave hull (alpha-shape) of a set of points: the union
+    of the triangles of their Delaunay triangulation whose circumradius is
+    less than :code:`alpha` (in the units of the points).
+
+    Returns:
+        A shapely.geometry.Polygon, or a MultiPolygon if the alpha shape is in
+        several parts, or None if no triangle is small enough (or the points
+        cannot be triangulated, being collinear).
     """
+    from scipy.spatial import Delaunay
+    from shapely.ops import polygonize, unary_union
     delunay_args = delunay_args or {
         'furthest_site': False,
         'incremental': False,
         'qhull_options': None
     }
-    triangulation = Delaunay(np.array(points))
-    alpha_complex = get_alpha_complex(alpha, points, triangulation.simplices)
-    X, Y = [], []
-    for s in triangulation.simplices:
-        X.append([points[s[k]][0] for k in [0, 1, 2, 0]])
-        Y.append([points[s[k]][1] for k in [0, 1, 2, 0]])
-    poly = Polygon(list(zip(X[0], Y[0])))
-    for i in range(1, len(X)):
-        poly = poly.union(Polygon(list(zip(X[i], Y[i]))))
-    return poly
+    points = np.asarray(points, dtype=np.float64)
+    try:
+        triangulation = Delaunay(points, **delunay_args)
+    except RuntimeError:
+        # scipy.spatial.qhull.QhullError
+        return None
+    kept = circumradii(points[triangulation.simplices]) < alpha
+    if not kept.any():
+        return None
+    # The boundary of the union of the kept triangles is made of the edges
+    # that belong to only one of them; polygonizing these gives the faces of
+    # the boundary, each either part of the shape or a hole in it
+    simplices = triangulation.simplices[kept]
+    edges = np.sort(
+        np.concatenate([simplices[:, [0, 1]], simplices[:, [1, 2]],
+                        simplices[:, [2, 0]]]),
+        axis=1).astype(np.int64)
+    keys, counts = np.unique(edges[:, 0] * len(points) + edges[:, 1],
+                             return_counts=True)
+    keys = keys[counts == 1]
+    boundary = points[np.stack([keys // len(points), keys % len(points)], 1)]
+    faces = list(polygonize(boundary.tolist()))
+    inside = triangulation.find_simplex(
+        np.array([f.representative_point().coords[0] for f in faces]))
+    return unary_union(
+        [face for face, i in zip(faces, inside) if i >= 0 and kept[i]])
 
 
 def point_nearest_point(points, point):
@@ -159,18 +245,34 @@ def cross(o, a, b):
     return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
 
 
-# https://en.wikibooks.org/wiki/Algorithm_Implementation/Geometry/Convex_hull/Monotone_chain#Python
-def convex_hull(points):
-    """Computes the convex hull of a set of 2D points.
+#: Number of points from which `convex_hull` uses qhull (through scipy) rather
+#: than the pure Python monotone chain, which is faster for fewer points.
+CONVEX_HULL_THRESHOLD = 32
+
 
-    Takes an iterable sequence of hashable (x, y, ...) tuples representing the
-    points. Only the (x, y) pairs are used, so output is in two-dimensions.
-    Outputs a shapely.geometry.Polygon representing the convex hull, in
-    counter-clockwise order, starting from the vertex with the lexicographically
-    smallest coordinates. Implements Andrew's monotone chain algorithm.
-    O(n log n) complexity.
+def _hull_geometry(vertices):
+    """A shapely geometry of the (counter-clockwise) vertices of a convex hull:
+    a Polygon, or a LineString or Point if the points are collinear or
+    coincident, or None if there are none.
     """
-    # Convert, sort the points lexicographically, and remove duplicates
+    from shapely.geometry import Point, LineString, Polygon
+    if len(vertices) >= 3:
+        return Polygon(vertices)
+    if len(vertices) == 2:
+        return LineString(vertices)
+    if len(vertices) == 1:
+        return Point(vertices[0])
+    return None
+
+
+# https://en.wikibooks.org/wiki/Algorithm_Implementation/Geometry/Convex_hull/Monotone_chain#Python
+def _monotone_chain(points):
+    """The vertices of the convex hull of a set of hashable (x, y) tuples, in
+    counter-clockwise order, starting from the vertex with the
+    lexicographically smallest coordinates. Implements Andrew's monotone
+    chain algorithm. O(n log n) complexity.
+    """
+    # Sort the points lexicographically, and remove duplicates
     points = sorted(set(points))
     if len(points) <= 1:
         return points
@@ -192,21 +294,567 @@ def convex_hull(points):
     # Concatenation of the lower and upper hulls gives the convex hull.
     # Last point of each list is omitted because it is repeated at the
     # beginning of the other list.
-    # Input to Polygon is a list of vertices in counter-clockwise order,
-    # starting at the point with the lexicographically smallest coordinates
-    return Polygon(lower[:-1] + upper[:-1])
+    return lower[:-1] + upper[:-1]
+
 
+def _qhull(points):
+    """The vertices of the convex hull of an (n, 2) array of points, as
+    `_monotone_chain` gives them, computed with qhull. None if qhull cannot
+    compute the hull (of fewer than three points, not all collinear).
+    """
+    from scipy.spatial import ConvexHull
+    try:
+        vertices = points[ConvexHull(points).vertices]
+    except (RuntimeError, ValueError):
+        # scipy.spatial.qhull.QhullError
+        return None
+    # qhull gives 2D vertices counter-clockwise, from an arbitrary vertex
+    start = np.lexsort((vertices[:, 1], vertices[:, 0]))[0]
+    return [tuple(v) for v in np.roll(vertices, -start, axis=0).tolist()]
 
-def minimum_bounding_circle(points):
+
+def convex_hull(points):
+    """Computes the convex hull of a set of 2D points.
+
+    Takes either an iterable sequence of (x, y, ...) tuples, or an (n, >=2)
+    array, representing the points. Only the (x, y) pairs are used, so output
+    is in two-dimensions. Outputs a shapely.geometry.Polygon representing the
+    convex hull, in counter-clockwise order, starting from the vertex with the
+    lexicographically smallest coordinates; or a LineString or Point if there
+    are fewer than three distinct points, or they are collinear.
+
+    From `CONVEX_HULL_THRESHOLD` points, the hull is computed with qhull on a
+    numpy array; otherwise with a pure Python monotone chain.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if not len(points):
+        return None
+    points = points.reshape((len(points), -1))[:, :2]
+    vertices = None
+    if len(points) >= CONVEX_HULL_THRESHOLD:
+        vertices = _qhull(points)
+    if vertices is None:
+        vertices = _monotone_chain([tuple(p) for p in points.tolist()])
+    return _hull_geometry(vertices)
+
+
+def minimum_bounding_circle(points, resolution=16, seed=0):
     """Returns the minimum bounding circle of a set of points as a
-    shapely.geometry.Polygon (64-sided polygon approximating a circle)
+    shapely.geometry.Polygon (by default, a 64-sided polygon approximating a
+    circle). See `enclosing_circle` for the circle alone.
+
+    Kwargs:
+        resolution (int): Number of segments per quarter circle.
+        seed (int): Seed of the shuffling of the points.
     """
     # TODO using cartesian coordinates, not geographic
-    mbc = make_circle(points)
-    if not mbc:
+    circle = enclosing_circle(points, seed)
+    if circle is None:
+        return None
+    return circle.polygon(resolution)
+
+
+#: Mean radius of the Earth, in metres.
+EARTH_RADIUS = 6371008.8
+
+
+def ragged_reduce(ufunc, values, offsets, empty=np.nan):
+    """Reduces consecutive rows of :code:`values` with a numpy ufunc (such as
+    :code:`np.maximum`), where row i of the result is the reduction of
+    :code:`values[offsets[i]:offsets[i + 1]]`. Empty rows give :code:`empty`.
+    """
+    values = np.asarray(values)
+    offsets = np.asarray(offsets)
+    sizes = np.diff(offsets)
+    result = np.full((len(sizes), ) + values.shape[1:], empty,
+                     dtype=np.result_type(values, empty))
+    rows = sizes > 0
+    if rows.any():
+        result[rows] = ufunc.reduceat(values, offsets[:-1][rows], axis=0)
+    return result
+
+
+def ragged_means(values, offsets):
+    """Means of consecutive rows of :code:`values` (an (M, d) array), where row
+    i of the result is the mean of :code:`values[offsets[i]:offsets[i + 1]]`.
+    Empty rows have a mean of NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    sizes = np.diff(offsets).reshape((-1, ) + (1, ) * (values.ndim - 1))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return ragged_reduce(np.add, values, offsets, 0) / sizes
+
+
+def ragged_apply(func, values, offsets, empty=np.nan, chunk=2**20):
+    """Applies :code:`func` to groups of equally-sized rows of a ragged array.
+
+    Rows are gathered into dense (n, k, d) arrays, one per distinct row size
+    k (in chunks of about :code:`chunk` elements), so that :code:`func` can
+    be vectorised over all rows of a size without padding.
+
+    Args:
+        func: Function of an (n, k, d) array, returning an array of n results
+            (or a tuple of such arrays).
+        values (numpy.ndarray): (M, d) array of the members of all rows.
+        offsets (numpy.ndarray): (N + 1) array; row i is
+            :code:`values[offsets[i]:offsets[i + 1]]`.
+
+    Kwargs:
+        empty: Result for empty rows.
+        chunk (int): Approximate maximum number of elements passed to
+            :code:`func` at once.
+
+    Returns:
+        An array of N results (or a tuple of such arrays).
+    """
+    values = np.asarray(values)
+    offsets = np.asarray(offsets)
+    sizes = np.diff(offsets)
+    outputs = None
+    for size in np.unique(sizes[sizes > 0]):
+        rows = np.flatnonzero(sizes == size)
+        step = max(1, chunk // (int(size)**3 * values.shape[1]))
+        for start in range(0, len(rows), step):
+            subset = rows[start:start + step]
+            result = func(values[offsets[subset][:, None] + np.arange(size)])
+            result = result if isinstance(result, tuple) else (result, )
+            if outputs is None:
+                outputs = tuple(
+                    np.full((len(sizes), ) + r.shape[1:], empty,
+                            dtype=np.result_type(r, empty)) for r in result)
+            for output, r in zip(outputs, result):
+                output[subset] = r
+    if outputs is None:
+        return np.full(len(sizes), empty)
+    return outputs if len(outputs) > 1 else outputs[0]
+
+
+def ragged_argmin(values, offsets):
+    """The index (into :code:`values`, an (M, ) array) of the least value of
+    each row of a ragged array, or -1 for empty rows. Ties go to the first.
+    """
+    offsets = np.asarray(offsets)
+    sizes = np.diff(offsets)
+    rows = np.repeat(np.arange(len(sizes)), sizes)
+    order = np.lexsort((np.arange(len(rows)), values, rows))
+    result = np.full(len(sizes), -1, dtype=np.int64)
+    result[sizes > 0] = order[offsets[:-1][sizes > 0]]
+    return result
+
+
+def haversine(a, b):
+    """Great-circle distances, in metres, between (..., 2) arrays of
+    (longitude, latitude) in degrees (broadcast against one another).
+    """
+    a = np.radians(a)
+    b = np.radians(b)
+    dlon = b[..., 0] - a[..., 0]
+    dlat = b[..., 1] - a[..., 1]
+    h = (np.sin(dlat / 2)**2 +
+         np.cos(a[..., 1]) * np.cos(b[..., 1]) * np.sin(dlon / 2)**2)
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(h, 0, 1)))
+
+
+def local_metres(lonlat, origin):
+    """Projects (..., k, 2) arrays of (longitude, latitude) to (x, y) metres
+    on an equirectangular projection about an (..., 2) origin. Accurate for
+    sets of points spanning up to tens of kilometres.
+    """
+    lonlat = np.radians(lonlat)
+    origin = np.radians(origin)[..., None, :]
+    x = (lonlat[..., 0] - origin[..., 0]) * np.cos(origin[..., 1])
+    y = lonlat[..., 1] - origin[..., 1]
+    return EARTH_RADIUS * np.stack([x, y], axis=-1)
+
+
+def _outside(points, centres, radii):
+    """Whether each of an (n, 2) array of points lies outside the
+    corresponding circle (allowing for rounding error).
+    """
+    distances = np.hypot(*(points - centres).T)
+    return distances > radii * (1 + 1e-9) + 1e-9
+
+
+def _circle_two(a, b):
+    centres = (a + b) / 2
+    return centres, np.hypot(*(a - centres).T)
+
+
+def _circle_three(a, b, c):
+    """Circumcircles of (n, 2) arrays of triangle vertices. Degenerate
+    (collinear) triangles get the circle on their longest side.
+    """
+    ox, oy = a.T
+    bx, by = (b - a).T
+    cx, cy = (c - a).T
+    d = 2 * (bx * cy - by * cx)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ux = (cy * (bx**2 + by**2) - by * (cx**2 + cy**2)) / d
+        uy = (bx * (cx**2 + cy**2) - cx * (bx**2 + by**2)) / d
+    centres = np.stack([ox + ux, oy + uy], axis=-1)
+    radii = np.hypot(ux, uy)
+    degenerate = ~np.isfinite(radii)
+    if degenerate.any():
+        sides = [_circle_two(p[degenerate], q[degenerate])
+                 for p, q in ((a, b), (b, c), (a, c))]
+        longest = np.argmax([r for _, r in sides], axis=0)
+        centres[degenerate] = np.choose(longest[:, None],
+                                        [c for c, _ in sides])
+        radii[degenerate] = np.choose(longest, [r for _, r in sides])
+    return centres, radii
+
+
+def batch_enclosing_circles(points, seed=0):
+    """Minimum enclosing circles of many equally-sized sets of points, by the
+    incremental algorithm (Welzl's, made iterative) run in lockstep over all
+    sets.
+
+    Args:
+        points (numpy.ndarray): (n, k, 2) array of n sets of k points.
+
+    Kwargs:
+        seed (int): Seed of the shuffling of each set, which makes the
+            expected running time linear in k whatever the order of the
+            points; None to keep their order.
+
+    Returns:
+        tuple: (n, 2) array of circle centres, and (n, ) array of radii.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    n, k = points.shape[:2]
+    if seed is not None and k > 3:
+        order = np.random.RandomState(seed).rand(n, k).argsort(axis=1)
+        points = points[np.arange(n)[:, None], order]
+    centres = points[:, 0].copy()
+    radii = np.zeros(n)
+    for i in range(1, k):
+        rows = np.flatnonzero(_outside(points[:, i], centres, radii))
+        if not len(rows):
+            continue
+        # Circle of points[:i + 1] with points[i] on its boundary
+        p = points[rows, i]
+        c, r = p.copy(), np.zeros(len(rows))
+        for j in range(i):
+            sub = np.flatnonzero(_outside(points[rows, j], c, r))
+            if not len(sub):
+                continue
+            # ... with points[i] and points[j] on its boundary
+            q = points[rows[sub], j]
+            cj, rj = _circle_two(p[sub], q)
+            for m in range(j):
+                out = np.flatnonzero(
+                    _outside(points[rows[sub], m], cj, rj))
+                if len(out):
+                    cj[out], rj[out] = _circle_three(
+                        p[sub][out], q[out], points[rows[sub][out], m])
+            c[sub], r[sub] = cj, rj
+        centres[rows], radii[rows] = c, r
+    return centres, radii
+
+
+def _next_outside(points, start, stop, centre, radius):
+    """The index of the first of :code:`points[start:stop]` outside a circle,
+    or None.
+    """
+    if start >= stop:
         return None
-    x, y, radius = mbc
-    return Point(x, y).buffer(radius)
+    outside = _outside(points[start:stop], centre, radius)
+    index = outside.argmax()
+    return start + index if outside[index] else None
+
+
+def _circle_with_point(points, i):
+    """The minimum enclosing circle of points[:i + 1], with points[i] on its
+    boundary.
+    """
+    centre, radius = points[i], 0.0
+    j = _next_outside(points, 0, i, centre, radius)
+    while j is not None:
+        centre, radius = _circle_with_points(points, i, j)
+        j = _next_outside(points, j + 1, i, centre, radius)
+    return centre, radius
+
+
+def _circle_with_points(points, i, j):
+    """The minimum enclosing circle of points[:j + 1] and points[i], with
+    points[i] and points[j] on its boundary.
+    """
+    p, q = points[i][None], points[j][None]
+    centre, radius = _circle_two(p, q)
+    m = _next_outside(points, 0, j, centre[0], radius[0])
+    while m is not None:
+        centre, radius = _circle_three(p, q, points[m][None])
+        m = _next_outside(points, m + 1, j, centre[0], radius[0])
+    return centre[0], radius[0]
+
+
+def _tuple_outside(p, circle):
+    x, y, radius = circle
+    return math.hypot(p[0] - x, p[1] - y) > radius * (1 + 1e-9) + 1e-9
+
+
+def _tuple_circle_two(a, b):
+    x, y = (a[0] + b[0]) / 2, (a[1] + b[1]) / 2
+    return x, y, math.hypot(a[0] - x, a[1] - y)
+
+
+def _tuple_circle_three(a, b, c):
+    """As `_circle_three`, for one triangle of tuples.
+    """
+    bx, by = b[0] - a[0], b[1] - a[1]
+    cx, cy = c[0] - a[0], c[1] - a[1]
+    d = 2 * (bx * cy - by * cx)
+    if d:
+        ux = (cy * (bx**2 + by**2) - by * (cx**2 + cy**2)) / d
+        uy = (bx * (cx**2 + cy**2) - cx * (bx**2 + by**2)) / d
+        if math.isfinite(ux) and math.isfinite(uy):
+            return a[0] + ux, a[1] + uy, math.hypot(ux, uy)
+    return max((_tuple_circle_two(p, q) for p, q in ((a, b), (b, c), (a, c))),
+               key=lambda circle: circle[2])
+
+
+def _tuple_enclosing_circle(points):
+    """The same algorithm as `enclosing_circle`, in pure Python on a list of
+    (x, y) tuples (near the origin); faster for few points.
+    """
+    circle = points[0] + (0.0, )
+    for i, p in enumerate(points):
+        if not _tuple_outside(p, circle):
+            continue
+        circle = p + (0.0, )
+        for j, q in enumerate(points[:i]):
+            if not _tuple_outside(q, circle):
+                continue
+            circle = _tuple_circle_two(p, q)
+            for r in points[:j]:
+                if _tuple_outside(r, circle):
+                    circle = _tuple_circle_three(p, q, r)
+    return circle
+
+
+#: Number of points from which `enclosing_circle` vectorises its scans; for
+#: fewer, scanning tuples in pure Python is faster.
+ENCLOSING_CIRCLE_THRESHOLD = 10000
+
+
+class Circle(namedtuple('Circle', ['x', 'y', 'radius'])):
+    """A circle, which unpacks as (x, y, radius) (like the circles of
+    `errorgeopy.smallestenclosingcircle.make_circle`). Its polygon is only
+    built when asked for.
+    """
+    __slots__ = ()
+
+    @property
+    def centre(self):
+        return (self.x, self.y)
+
+    def polygon(self, resolution=16):
+        """A shapely.geometry.Polygon approximating the circle.
+
+        Kwargs:
+            resolution (int): Number of segments per quarter circle.
+        """
+        from shapely.geometry import Point
+        return Point(self.x, self.y).buffer(self.radius, resolution)
+
+
+def enclosing_circle(points, seed=0):
+    """The minimum enclosing circle of a set of points, by Welzl's algorithm
+    (made iterative), where each scan for a point outside the current circle
+    is vectorised (from `ENCLOSING_CIRCLE_THRESHOLD` points).
+
+    Args:
+        points: (n, >=2) array, or sequence of (x, y, ...) tuples.
+
+    Kwargs:
+        seed (int): Seed of the shuffling of the points (with a random state
+            of its own), which makes the expected running time linear; None to
+            keep their order.
+
+    Returns:
+        Circle, or None if there are no points.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if not len(points):
+        return None
+    points = points.reshape((len(points), -1))[:, :2]
+    if seed is not None:
+        order = list(range(len(points)))
+        random.Random(seed).shuffle(order)
+        points = points[order]
+    # Relative to a local origin, as the circle formulae lose precision far
+    # from the origin (e.g. in projected coordinates)
+    origin = points.mean(axis=0)
+    points = points - origin
+    if len(points) < ENCLOSING_CIRCLE_THRESHOLD:
+        x, y, radius = _tuple_enclosing_circle(
+            [tuple(p) for p in points.tolist()])
+        return Circle(x + float(origin[0]), y + float(origin[1]), radius)
+    centre, radius = points[0], 0.0
+    i = _next_outside(points, 1, len(points), centre, radius)
+    while i is not None:
+        centre, radius = _circle_with_point(points, i)
+        i = _next_outside(points, i + 1, len(points), centre, radius)
+    return Circle(float(centre[0] + origin[0]), float(centre[1] + origin[1]),
+                  float(radius))
+
+
+def enclosing_circles(point_sets, seed=0):
+    """The minimum enclosing circles of many sets of points; sets of the same
+    size are computed together, with `batch_enclosing_circles`.
+
+    Args:
+        point_sets: Sequence of (k, >=2) arrays (or sequences of tuples).
+
+    Kwargs:
+        seed (int): Seed of the shuffling of the points.
+
+    Returns:
+        (N, 3) array of the (x, y, radius) of each circle (NaN for empty
+        sets).
+    """
+    point_sets = [
+        np.asarray(points, dtype=np.float64).reshape((len(points), -1))[:, :2]
+        if len(points) else np.zeros((0, 2)) for points in point_sets
+    ]
+    offsets = np.concatenate(
+        [[0], np.cumsum([len(points) for points in point_sets])])
+    if not offsets[-1]:
+        return np.full((len(point_sets), 3), np.nan)
+    centres, radii = ragged_apply(
+        lambda points: batch_enclosing_circles(points, seed),
+        np.concatenate(point_sets), offsets)
+    return np.column_stack([centres, radii])
+
+
+def _batch_chain(points):
+    """Half of the monotone chain algorithm (see `_monotone_chain`), run in
+    lockstep over an (n, k, 2) array of sets of points, each sorted.
+
+    Returns:
+        tuple: (n, k) array of the indices of the points of each chain, and
+        (n, ) array of the length of each chain.
+    """
+    n, k = points.shape[:2]
+    rows = np.arange(n)
+    chain = np.zeros((n, k), dtype=np.int64)
+    length = np.zeros(n, dtype=np.int64)
+    for j in range(k):
+        p = points[:, j]
+        while True:
+            a = points[rows, chain[rows, np.maximum(length - 2, 0)]]
+            b = points[rows, chain[rows, np.maximum(length - 1, 0)]]
+            turn = ((b[:, 0] - a[:, 0]) * (p[:, 1] - a[:, 1]) -
+                    (b[:, 1] - a[:, 1]) * (p[:, 0] - a[:, 0]))
+            pop = (length >= 2) & (turn <= 0)
+            if not pop.any():
+                break
+            length -= pop
+        chain[rows, length] = j
+        length += 1
+    return chain, length
+
+
+def _chain_shoelace(points, chain, length):
+    """The shoelace sums of the edges of chains of points.
+    """
+    rows = np.arange(len(points))[:, None]
+    vertices = points[rows, chain]
+    x, y = vertices[..., 0], vertices[..., 1]
+    terms = x[:, :-1] * y[:, 1:] - x[:, 1:] * y[:, :-1]
+    edges = np.arange(chain.shape[1] - 1) < (length - 1)[:, None]
+    return (terms * edges).sum(axis=1)
+
+
+def batch_convex_hull_areas(points):
+    """Areas of the convex hulls of many equally-sized sets of points, by the
+    monotone chain algorithm (see `_monotone_chain`) run in lockstep over all
+    sets: O(k log k) time and O(k) memory for each set of k points. The area
+    is the shoelace formula over the edges of the lower and upper hulls.
+
+    Args:
+        points (numpy.ndarray): (n, k, 2) array of n sets of k points.
+
+    Returns:
+        (n, ) array of areas.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if points.shape[1] < 3:
+        return np.zeros(len(points))
+    order = np.lexsort((points[..., 1], points[..., 0]), axis=-1)
+    points = np.take_along_axis(points, order[..., None], axis=1)
+    lower = _chain_shoelace(points, *_batch_chain(points))
+    upper = points[:, ::-1]
+    upper = _chain_shoelace(upper, *_batch_chain(upper))
+    return np.abs(lower + upper) / 2
+
+
+#: Number of points in a set above which `batch_cluster_counts` finds its
+#: clusters with `cluster_count`, rather than from the dense array of distances
+#: between every pair of points (of quadratic size).
+CLUSTER_COUNT_THRESHOLD = 64
+
+
+def cluster_count(points, epsilon):
+    """Number of clusters in a set of points, where points within
+    :code:`epsilon` of one another are in the same cluster: the connected
+    components of the neighbourhood graph, found from the pairs of neighbours
+    given by a k-d tree (through scipy), so that memory grows with the number
+    of neighbouring pairs rather than with the square of the number of points.
+
+    Args:
+        points (numpy.ndarray): (k, 2) array of points.
+        epsilon (float): Neighbourhood distance.
+
+    Returns:
+        int: The number of clusters.
+    """
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+    from scipy.spatial import cKDTree
+    points = np.asarray(points, dtype=np.float64)
+    k = len(points)
+    if not k:
+        return 0
+    pairs = cKDTree(points).query_pairs(epsilon, output_type='ndarray')
+    graph = coo_matrix(
+        (np.ones(len(pairs), dtype=np.int8), (pairs[:, 0], pairs[:, 1])),
+        shape=(k, k))
+    return int(connected_components(graph, directed=False)[0])
+
+
+def batch_cluster_counts(points, epsilon):
+    """Numbers of clusters in many equally-sized sets of points, where points
+    within :code:`epsilon` of one another are in the same cluster (i.e. the
+    connected components of the neighbourhood graph, as found by DBSCAN with a
+    minimum cluster size of 1).
+
+    Sets of up to `CLUSTER_COUNT_THRESHOLD` points are vectorised over dense
+    arrays of pairwise distances; larger ones are counted one at a time with
+    `cluster_count`.
+
+    Args:
+        points (numpy.ndarray): (n, k, 2) array of n sets of k points.
+        epsilon (float): Neighbourhood distance.
+
+    Returns:
+        (n, ) array of cluster counts.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    n, k = points.shape[:2]
+    if k > CLUSTER_COUNT_THRESHOLD:
+        return np.array([cluster_count(p, epsilon) for p in points],
+                        dtype=np.intp)
+    differences = points[:, :, None, :] - points[:, None, :, :]
+    neighbours = np.hypot(differences[..., 0], differences[..., 1]) <= epsilon
+    labels = np.broadcast_to(np.arange(k), (n, k))
+    while True:
+        # Each point takes the smallest label among its neighbours
+        spread = np.where(neighbours, labels[:, None, :], k).min(axis=-1)
+        if (spread == labels).all():
+            break
+        labels = spread
+    return (labels == np.arange(k)).sum(axis=-1)
 
 
 def cluster_named_tuple():
@@ -222,6 +870,7 @@ def cluster_named_tuple():
     return namedtuple('Cluster', ['label', 'centroid', 'location'])
 
 
+@timed('clustering')
 def mean_shift(location, location_callback, bandwidth=None):
     """Returns one or more clusters of a set of points, using a mean shift
     algorithm.
@@ -235,10 +884,12 @@ def mean_shift(location, location_callback, bandwidth=None):
         A list of NamedTuples (see get_cluster_named_tuple for a definition
         of the tuple).
     """
-    pts = location._tuple_points()
-    if not pts:
+    from shapely.geometry import Point
+    from sklearn.cluster import MeanShift, estimate_bandwidth
+    from sklearn.preprocessing import Imputer
+    X = np.array(location.coordinates)
+    if not len(X):
         return None
-    X = np.array(pts).reshape((len(pts), len(pts[0])))
     if np.any(np.isnan(X)) or not np.all(np.isfinite(X)):
         return None
     X = Imputer().fit_transform(X)
@@ -262,6 +913,7 @@ def mean_shift(location, location_callback, bandwidth=None):
     return clusters
 
 
+@timed('clustering')
 def affinity_propagation(location, location_callback):
     """Returns one or more clusters of a set of points, using an affinity
     propagation algorithm.
@@ -271,10 +923,12 @@ def affinity_propagation(location, location_callback):
         A list of NamedTuples (see get_cluster_named_tuple for a definition
         of the tuple).
     """
-    pts = location._tuple_points()
-    if not pts:
+    from shapely.geometry import Point
+    from sklearn.cluster import AffinityPropagation
+    from sklearn.preprocessing import Imputer
+    X = np.array(location.coordinates)
+    if not len(X):
         return None
-    X = np.array(pts).reshape((len(pts), len(pts[0])))
     if np.any(np.isnan(X)) or not np.all(np.isfinite(X)):
         return None
     X = Imputer().fit_transform(X)
@@ -306,6 +960,7 @@ def affinity_propagation(location, location_callback):
     return clusters
 
 
+@timed('clustering')
 def dbscan(location, location_callback, core_only=False, epsilon=1, **kwargs):
     """Returns one or more clusters of a set of points, using a DBSCAN
     algorithm.
@@ -328,10 +983,14 @@ def dbscan(location, location_callback, core_only=False, epsilon=1, **kwargs):
     # TODO I don't know why, but in tests this raises
     # errorgeopy/.tox/py35/lib/python3.5/site-packages/sklearn/utils/validation.py:386: DeprecationWarning: Passing 1d arrays as data is deprecated in 0.17 and willraise ValueError in 0.19. Reshape your data either using X.reshape(-1, 1) if your data has a single feature or X.reshape(1, -1) if it contains a single sample.
     # Even though all methods using 2D arrays
-    pts = [p[0:2] for p in location._tuple_points()]
-    if not pts or len(pts) == 1:
+    from scipy.spatial.distance import pdist, squareform
+    from shapely.geometry import Point, MultiPoint
+    from sklearn.cluster import DBSCAN
+    from sklearn.metrics.pairwise import euclidean_distances
+    from sklearn.preprocessing import StandardScaler
+    pts = location.coordinates[:, :2]
+    if len(pts) <= 1:
         return None
-    pts = np.array(pts)
     # print(pts.ndim)
     X = squareform(pdist(pts, metric='cityblock'))
     if np.any(np.isnan(X)) or not np.all(np.isfinite(X)):
@@ -393,13 +1052,11 @@ def long_substr(data):
 
 
 def get_proj(epsg):
-    """Returns a pyproj partial representing a projedction from WGS84 to
-    a given projection.
+    """Returns a function projecting from WGS84 to a given projection, for use
+    with shapely.ops.transform (see `errorgeopy.projection.get_transformer`).
 
     Args:
         epsg: EPSG code for the target projection.
     """
-    project = partial(
-        pyproj.transform,
-        pyproj.Proj(init='EPSG:4326'),
-        pyproj.Proj(init='EPSG:{epsg}'.format(epsg=epsg)))
+    from errorgeopy.projection import WGS84, get_transformer
+    return get_transformer(WGS84, epsg)
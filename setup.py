@@ -93,7 +93,7 @@ Intended to work with as many of the providers supported by geopy as you care to
 configure. Without configuration, will use free global provdiders that don't
 require API tokens.
 
-Only supports Python 3. Tested with Python 3.4 and 3.5.
+Only supports Python 3.5 and later. Tested with Python 3.5.
 """
 }
 
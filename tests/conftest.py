@@ -0,0 +1,36 @@
+"""Shared fixtures of the tests.
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+
+def _brute_force_mbc(points):
+    """The radius of the minimum enclosing circle of a few points: the least
+    of the circles through each pair (as diameter) and each triple of points
+    that encloses them all.
+    """
+    points = np.asarray(points, dtype=np.float64)[:, :2]
+    points = points - points.mean(axis=0)
+    if len(points) == 1:
+        return 0.0
+    circles = []
+    for a, b in itertools.combinations(points, 2):
+        circles.append(((a + b) / 2, np.hypot(*(a - b)) / 2))
+    for a, b, c in itertools.combinations(points, 3):
+        b, c = b - a, c - a
+        d = 2 * (b[0] * c[1] - b[1] * c[0])
+        if d:
+            u = np.array([c[1] * b.dot(b) - b[1] * c.dot(c),
+                          b[0] * c.dot(c) - c[0] * b.dot(b)]) / d
+            circles.append((a + u, np.hypot(*u)))
+    return min(radius for centre, radius in circles
+               if (np.hypot(*(points - centre).T) <= radius * (1 + 1e-9)
+                   + 1e-9).all())
+
+
+@pytest.fixture
+def brute_force_mbc():
+    return _brute_force_mbc
@@ -0,0 +1,90 @@
+"""Tests of the response caches in `errorgeopy.cache`.
+"""
+
+import os
+import time
+
+import pytest
+import geopy
+
+from errorgeopy.cache import MemoryCache, SQLiteCache, make_key
+
+
+@pytest.fixture
+def response():
+    return [geopy.Location('1 Fake Street', geopy.Point(-41.29, 174.78), {})]
+
+
+def test_make_key():
+    key = make_key('Nominatim', 'geocode', ' 66  Great North Road ',
+                   {'language': 'en', 'exactly_one': False})
+    assert key == make_key('Nominatim', 'geocode', '66 Great North Road',
+                           {'exactly_one': False, 'language': 'en'})
+    assert key != make_key('ArcGIS', 'geocode', '66 Great North Road',
+                           {'exactly_one': False, 'language': 'en'})
+    assert make_key('Nominatim', 'reverse', (-41.29, 174.78)) == make_key(
+        'Nominatim', 'reverse', geopy.Point(-41.29, 174.78))
+
+
+def test_make_key_hashed():
+    key = make_key('GoogleV3', 'geocode', 'Wellington', None,
+                   {'api_key': 'sekrit'})
+    assert len(key) == 64 and int(key, 16) >= 0
+    assert 'sekrit' not in key
+    assert key != make_key('GoogleV3', 'geocode', 'Wellington', None,
+                           {'api_key': 'other'})
+    assert key != make_key('GoogleV3', 'geocode', 'Wellington', None,
+                           {'api_key': 'sekrit'}, {'index': 1})
+    # Objects are keyed by their type, never by a repr carrying an address
+    assert make_key('Nominatim', 'geocode', 'a', {'session': object()}) == \
+        make_key('Nominatim', 'geocode', 'a', {'session': object()})
+
+
+def test_memory_cache_lru(response):
+    cache = MemoryCache(maxsize=2)
+    cache.set('a', response)
+    cache.set('b', response)
+    assert cache.get('a') is response
+    cache.set('c', response)
+    assert 'b' not in cache
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert cache.stats == {'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+
+
+def test_memory_cache_ttl(response):
+    cache = MemoryCache(ttl=0.05)
+    cache.set('a', response)
+    assert cache.get('a') is response
+    time.sleep(0.1)
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_sqlite_cache(tmpdir, response):
+    path = os.path.join(str(tmpdir), 'cache.sqlite')
+    cache = SQLiteCache(path, ttl=60)
+    assert cache.get('a') is None
+    cache.set('a', response)
+    # A second cache (e.g. in another process) sees the same entries
+    other = SQLiteCache(path)
+    cached = other.get('a')
+    assert [(l.address, l.point) for l in cached] == [
+        (l.address, l.point) for l in response
+    ]
+    assert other.stats['hits'] == 1
+    assert cache.stats['misses'] == 1
+    cache.clear()
+    assert len(other) == 0
+    cache.close()
+    other.close()
+
+
+def test_sqlite_cache_ttl(tmpdir, response):
+    cache = SQLiteCache(os.path.join(str(tmpdir), 'cache.sqlite'), ttl=0.05)
+    cache.set('a', response)
+    cache.set('b', response)
+    time.sleep(0.1)
+    assert cache.get('a') is None
+    cache.purge()
+    assert len(cache) == 0
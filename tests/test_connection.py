@@ -0,0 +1,113 @@
+"""Tests of `errorgeopy.connection`, against a local HTTP server.
+"""
+
+import json
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from urllib.error import HTTPError
+from urllib.request import Request
+
+import pytest
+
+from errorgeopy.connection import KeepAliveOpener
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+        if self.path.startswith(('/moved', '/loop', '/unchanged')):
+            self.send_response(304 if self.path == '/unchanged' else 302)
+            if self.path != '/unchanged':
+                self.send_header('Location', self.path.replace(
+                    '/moved', '/search'))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        status = 404 if self.path.startswith('/missing') else 200
+        body = json.dumps({
+            'path': self.path,
+            'agent': self.headers.get('User-Agent'),
+            'agents': self.headers.get_all('User-Agent')
+        }).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture
+def server():
+    httpd = Server(('127.0.0.1', 0), Handler)
+    httpd.connections = set()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _url(server, path):
+    return 'http://127.0.0.1:{}{}'.format(server.server_port, path)
+
+
+def test_connection_reused(server):
+    opener = KeepAliveOpener(headers={'User-Agent': 'errorgeopy-test'})
+    for i in range(5):
+        page = opener(_url(server, '/search?q={}'.format(i)), timeout=5)
+        assert page.getcode() == 200
+        assert page.headers.get_param('charset') == 'utf-8'
+        content = json.loads(page.read().decode('utf-8'))
+        assert content == {
+            'path': '/search?q={}'.format(i),
+            'agent': 'errorgeopy-test',
+            'agents': ['errorgeopy-test']
+        }
+    assert len(server.connections) == 1
+    opener.close()
+
+
+def test_http_errors_raised(server):
+    opener = KeepAliveOpener()
+    with pytest.raises(HTTPError) as error:
+        opener(_url(server, '/missing'), timeout=5)
+    assert error.value.code == 404
+    # The connection survives an error response
+    assert opener(_url(server, '/search'), timeout=5).getcode() == 200
+    assert len(server.connections) == 1
+    opener.close()
+
+
+def test_redirects_followed(server):
+    opener = KeepAliveOpener()
+    page = opener(_url(server, '/moved?q=1'), timeout=5)
+    assert page.getcode() == 200
+    assert page.geturl() == _url(server, '/search?q=1')
+    assert json.loads(page.read().decode('utf-8'))['path'] == '/search?q=1'
+    with pytest.raises(HTTPError) as error:
+        opener(_url(server, '/loop'), timeout=5)
+    assert error.value.code == 302
+    with pytest.raises(HTTPError) as error:
+        opener(_url(server, '/unchanged'), timeout=5)
+    assert error.value.code == 304
+    opener.close()
+
+
+def test_request_headers_override(server):
+    opener = KeepAliveOpener(headers={'User-Agent': 'errorgeopy-test'})
+    # urllib stores the header as "User-agent"; it replaces the opener's
+    request = Request(_url(server, '/search'),
+                      headers={'User-Agent': 'errorgeopy-request'})
+    content = json.loads(opener(request, timeout=5).read().decode('utf-8'))
+    assert content['agents'] == ['errorgeopy-request']
+    opener.close()
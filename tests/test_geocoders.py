@@ -110,10 +110,14 @@ def _generic_test_geocoderpool(gpool):
             res.multipoint is None and len(res) == 0)
         assert isinstance(res.mbc, shapely.geometry.Polygon) or (
             res.mbc is None and len(res) < 2)
-        assert isinstance(res.concave_hull, shapely.geometry.Polygon) or (
-            res.concave_hull is None and len(res) < 4)
+        # None also when no triangle is within alpha (distant candidates)
+        assert isinstance(res.concave_hull, (
+            shapely.geometry.Polygon, shapely.geometry.MultiPolygon)) or (
+                res.concave_hull is None)
         assert isinstance(res.convex_hull, shapely.geometry.Polygon) or (
-            res.convex_hull is None and len(res) < 3)
+            res.convex_hull is None and len(res) < 3) or isinstance(
+                res.convex_hull,
+                (shapely.geometry.Point, shapely.geometry.LineString))
         assert isinstance(
             res.centroid,
             shapely.geometry.Point) or (res.centroid is None and len(res) == 0)
@@ -0,0 +1,43 @@
+"""Tests that importing errorgeopy stays cheap: the scientific libraries are
+not imported, and no geocoders are built, until they are needed.
+"""
+
+import os
+import sys
+import subprocess
+
+import errorgeopy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+def _modules_after(code):
+    """The names of the top-level modules imported after running code in a
+    fresh interpreter.
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    output = subprocess.check_output(
+        [sys.executable, '-c', code + '\nimport sys; print(" ".join(sys.modules))'],
+        env=env, cwd=ROOT)
+    return {m.split('.')[0] for m in output.decode('utf-8').split()}
+
+
+def test_import_is_light():
+    modules = _modules_after('import errorgeopy.geocoders')
+    for heavy in ('sklearn', 'scipy', 'shapely', 'pyproj'):
+        assert heavy not in modules
+
+
+def test_default_pool_built_lazily():
+    _modules_after('import errorgeopy.geocoders\n'
+                   'assert errorgeopy._default_pool_members is None')
+
+
+def test_default_pool_accessor(monkeypatch):
+    # The public accessor works on every supported Python; the module
+    # attribute (where available) gives the same shared members
+    members = (object(), object())
+    monkeypatch.setattr(errorgeopy, '_default_pool_members', members)
+    assert errorgeopy.default_pool_members() is members
+    if sys.version_info >= (3, 7):
+        assert errorgeopy.DEFAULT_GEOCODER_POOL is members
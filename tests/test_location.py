@@ -0,0 +1,325 @@
+"""Offline tests of `errorgeopy.location.Location`.
+"""
+
+import random
+
+import geopy
+import geopy.distance
+import pytest
+import numpy as np
+from scipy.spatial import Delaunay
+from shapely.geometry import MultiPoint, Polygon
+from shapely.ops import unary_union
+
+from errorgeopy import utils
+from errorgeopy.smallestenclosingcircle import make_circle, _make_circumcircle
+from errorgeopy.location import Location, LocationBatch, batch_metrics
+
+
+def _candidates(points):
+    return [
+        geopy.Location('Candidate {}'.format(i), geopy.Point(lat, lon), {})
+        for i, (lat, lon) in enumerate(points)
+    ]
+
+
+@pytest.fixture
+def location():
+    return Location(
+        _candidates([(-41.29, 174.78), (-41.3, 174.79), (-41.28, 174.8),
+                     (-41.31, 174.77), (-41.295, 174.785)]))
+
+
+def test_geometries_cached(location, monkeypatch):
+    conversions = []
+    convert = utils.array_geopy_points_to_xyz_array
+
+    def counting(points):
+        conversions.append(points)
+        return convert(points)
+
+    monkeypatch.setattr(utils, 'array_geopy_points_to_xyz_array', counting)
+    for _ in range(3):
+        location.multipoint
+        location.centroid
+        location.most_central_location
+        location.mbc
+        location.convex_hull
+        location.concave_hull
+    assert len(conversions) == 1
+    assert location.centroid is location.centroid
+    assert location.mbc is location.mbc
+
+
+def test_cache_invalidated_on_setitem(location):
+    centroid = location.centroid
+    mbc = location.mbc
+    location[0] = _candidates([(-41.5, 174.5)])[0]
+    assert not location.centroid.equals(centroid)
+    assert location.mbc.area > mbc.area
+    assert (-41.5, 174.5) in [(p.latitude, p.longitude)
+                              for p in location.points]
+
+
+def test_coordinates(location):
+    coordinates = location.coordinates
+    assert coordinates.shape == (5, 3)
+    assert coordinates.dtype == np.float64
+    assert tuple(coordinates[1]) == (174.79, -41.3, 0.0)
+    with pytest.raises(ValueError):
+        coordinates[0, 0] = 0
+    assert location._tuple_points()[1] == (174.79, -41.3, 0.0)
+    assert location._shapely_points()[1].coords[0] == (174.79, -41.3, 0.0)
+    assert Location([]).coordinates.shape == (0, 3)
+
+
+def test_alpha_shape():
+    rng = np.random.RandomState(0)
+    points = np.concatenate([
+        rng.normal([-41.29, 174.78], 0.01, size=(30, 2)),
+        rng.normal([-41.29, 175.78], 0.01, size=(30, 2))
+    ])
+    location = Location(_candidates(points))
+    assert location.concave_hull.geom_type == 'MultiPolygon'
+    assert len(location.concave_hull.geoms) == 2
+    assert location.concave_hull.area < location.convex_hull.area / 10
+    assert np.isclose(location.alpha_shape(1e9).area,
+                      location.convex_hull.area)
+    assert location.alpha_shape(1e-6) is None
+    # With holes and islands, the same as the union of the kept triangles
+    angles = rng.uniform(0, 2 * np.pi, 300)
+    radii = rng.uniform(0.6, 1, 300)
+    points = np.concatenate([
+        rng.uniform(-0.3, 0.3, size=(300, 2)),
+        np.stack([radii * np.cos(angles), radii * np.sin(angles)], 1)
+    ])
+    triangles = points[utils.get_alpha_complex(
+        0.06, points, Delaunay(points).simplices)]
+    expected = unary_union([Polygon(t) for t in triangles.tolist()])
+    assert utils.concave_hull(points, 0.06).symmetric_difference(
+        expected).area < 1e-9
+    collinear = Location(_candidates([(-41.29, 174.78 + i) for i in range(4)]))
+    assert collinear.concave_hull is None
+
+
+def test_circumcircles():
+    rng = np.random.RandomState(0)
+    triangles = rng.uniform(size=(20, 3, 2)) + [174.78, -41.29]
+    centres, radii = utils.circumcircles(triangles)
+    for triangle, centre, radius in zip(triangles.tolist(), centres, radii):
+        x, y, r = _make_circumcircle(*triangle)
+        assert np.allclose(centre, (x, y)) and np.isclose(radius, r)
+    assert np.allclose(utils.circumradii(triangles), radii)
+    centre, radius = utils.circumcircle(triangles[3], [0, 1, 2])
+    assert np.allclose(centre, centres[3]) and radius == radii[3]
+    centres, radii = utils.circumcircles([[(0, 0), (1, 1), (2, 2)]])
+    assert np.isnan(centres).all() and radii[0] == np.inf
+    equilateral = [(0, 0), (1, 0), (0.5, np.sqrt(3) / 2)]
+    assert np.allclose(
+        utils.triangle_quality([equilateral, [(0, 0), (1, 0), (2, 0)]]),
+        [1, 0])
+
+
+def test_triangulation(location):
+    triangulation = location.triangulation
+    n = len(triangulation.simplices)
+    assert triangulation.simplices.shape == (n, 3)
+    assert triangulation.circumcentres.shape == (n, 2)
+    assert ((triangulation.quality > 0) & (triangulation.quality <= 1)).all()
+    triangles = location.coordinates[triangulation.simplices][..., :2]
+    assert np.isclose(
+        sum(Polygon(t).area for t in triangles.tolist()),
+        location.convex_hull.area)
+    assert Location(location.locations[:2]).triangulation is None
+
+
+@pytest.fixture
+def batch():
+    rng = np.random.RandomState(0)
+    locations = []
+    for size in (3, 0, 1, 6, 3, 2):
+        location = Location(
+            _candidates(rng.normal([-41.29, 174.78], 0.01, size=(size, 2))))
+        location.providers = ['Nominatim', 'ArcGIS'] * (size // 2) + [
+            'Nominatim'
+        ] * (size % 2)
+        locations.append(location)
+    return locations, LocationBatch.from_results(
+        ('Query {}'.format(i), l) for i, l in enumerate(locations))
+
+
+def test_location_batch(batch):
+    locations, batch = batch
+    assert len(batch) == 6
+    assert list(batch.sizes) == [3, 0, 1, 6, 3, 2]
+    assert batch.provider_names == ('Nominatim', 'ArcGIS')
+    row = batch[3]
+    assert row.query == 'Query 3'
+    assert row.providers == locations[3].providers
+    assert row.addresses == locations[3].addresses
+    assert row.location() == locations[3]
+    assert batch[-1].query == 'Query 5'
+    with pytest.raises(AttributeError):
+        row.extra = 1
+    with pytest.raises(ValueError):
+        batch.coordinates[0, 0] = 0
+
+
+def test_location_batch_metrics(batch):
+    locations, batch = batch
+    for location, centroid in zip(locations, batch.centroids):
+        if len(location):
+            assert np.allclose(centroid, location.centroid.coords[0][:2])
+        else:
+            assert np.isnan(centroid).all()
+    radii = batch.mbc_radii
+    assert np.isnan(radii[1])
+    assert radii[2] == 0
+    areas = batch.hull_areas
+    assert areas[5] == 0
+    for i in (0, 3, 4):
+        row = batch[i]
+        metres = utils.local_metres(row.coordinates[:, :2], row.centroid)
+        assert np.isclose(radii[i], make_circle(metres.tolist())[2])
+        assert np.isclose(areas[i], MultiPoint(metres.tolist()).convex_hull.area)
+    counts = batch.cluster_counts(epsilon=1e6)
+    assert list(counts) == [1, 0, 1, 1, 1, 1]
+    assert list(batch.cluster_counts(epsilon=0)) == list(batch.sizes)
+
+
+def test_batch_cluster_counts():
+    rng = np.random.RandomState(0)
+    k = utils.CLUSTER_COUNT_THRESHOLD
+    points = rng.uniform(0, 1000, size=(10, 2 * k, 2))
+    # The sparse path for large sets agrees with the dense one
+    for epsilon in (0, 20, 50, 100, 2000):
+        dense = np.concatenate([
+            utils.batch_cluster_counts(points[:, :k], epsilon),
+            utils.batch_cluster_counts(points[:, k:], epsilon)
+        ])
+        assert list(dense) == [
+            utils.cluster_count(p, epsilon)
+            for p in np.concatenate([points[:, :k], points[:, k:]])
+        ]
+        assert utils.batch_cluster_counts(points, epsilon).shape == (10, )
+    # A long chain is one cluster, and a line of isolated points many
+    chain = np.column_stack([np.arange(2000.), np.zeros(2000)])
+    assert list(utils.batch_cluster_counts(chain[None], 1)) == [1]
+    assert utils.cluster_count(chain * 2, 1) == 2000
+    assert utils.cluster_count(np.zeros((0, 2)), 1) == 0
+
+
+def test_batch_convex_hull_areas():
+    rng = np.random.RandomState(0)
+    for k in (1, 2, 3, 4, 7, 50, 600):
+        points = rng.normal(size=(20, k, 2))
+        # Repeated and collinear points
+        points[:, -1] = points[:, 0]
+        points[:5, :, 1] = points[:5, :, 0]
+        expected = [MultiPoint(p.tolist()).convex_hull.area for p in points]
+        assert np.allclose(utils.batch_convex_hull_areas(points), expected)
+
+
+def test_batch_metrics(batch):
+    locations, batch = batch
+    from_batch = batch_metrics(batch)
+    from_locations = batch_metrics(locations)
+    from_arrays = batch_metrics([l.coordinates[:, :2] for l in locations])
+    for metrics in (from_locations, from_arrays):
+        for expected, actual in zip(from_batch, metrics):
+            assert np.allclose(expected, actual, equal_nan=True)
+    for i in (0, 2, 3, 4, 5):
+        location = locations[i]
+        assert tuple(from_batch.most_central[i]) == \
+            location.most_central_location.coords[0][:2]
+        distances = [
+            geopy.distance.great_circle(
+                (lat, lon), location.centroid.coords[0][1::-1]).m
+            for lon, lat in location.coordinates[:, :2].tolist()
+        ]
+        assert np.isclose(from_batch.max_distances[i], max(distances))
+        assert np.isclose(from_batch.mean_distances[i], np.mean(distances))
+    assert from_batch.max_distances[2] == 0
+    assert np.isnan(from_batch.most_central[1]).all()
+    assert np.isnan(from_batch.mean_distances[1])
+    assert batch[3].max_distance == from_batch.max_distances[3]
+
+
+def test_convex_hull():
+    rng = np.random.RandomState(0)
+    points = rng.normal([174.78, -41.29], 0.01, size=(200, 2))
+    expected = MultiPoint(points.tolist()).convex_hull
+    for n in (3, 10, utils.CONVEX_HULL_THRESHOLD, 200):
+        small = utils.convex_hull([tuple(p) for p in points[:n].tolist()])
+        large = utils.convex_hull(points[:n])
+        assert small.equals(MultiPoint(points[:n].tolist()).convex_hull)
+        assert list(small.exterior.coords) == list(large.exterior.coords)
+    hull = utils.convex_hull(points)
+    assert hull.exterior.coords[0] == min(map(tuple, points.tolist()))
+    assert hull.exterior.is_ccw and hull.equals(expected)
+    assert utils.convex_hull(np.zeros((100, 3))).geom_type == 'Point'
+    line = utils.convex_hull([(i % 3, i % 3) for i in range(100)])
+    assert line.geom_type == 'LineString' and line.length == np.hypot(2, 2)
+    assert utils.convex_hull([]) is None
+    collinear = Location(_candidates([(-41.29, 174.78 + i) for i in range(4)]))
+    assert collinear.convex_hull.geom_type == 'LineString'
+
+
+def test_enclosing_circle():
+    rng = np.random.RandomState(0)
+    for n in (1, 2, 3, 5, 50, 1000, utils.ENCLOSING_CIRCLE_THRESHOLD):
+        points = rng.normal(size=(n, 2))
+        circle = utils.enclosing_circle(points)
+        x, y, r = make_circle(points.tolist())
+        assert np.allclose(circle, (x, y, r))
+        assert np.allclose(utils.enclosing_circle(points[::-1]), circle)
+        assert utils.enclosing_circle(points, seed=None) is not None
+    state = random.getstate()
+    assert utils.enclosing_circle(points) == utils.enclosing_circle(points)
+    assert utils.enclosing_circle(points[:10]) == utils.enclosing_circle(
+        points[:10])
+    assert random.getstate() == state
+    assert utils.enclosing_circle([]) is None
+    assert tuple(utils.enclosing_circle([(0, 0), (1, 1), (2, 2)])) == (
+        1, 1, np.hypot(1, 1))
+    circle = utils.Circle(174.78, -41.29, 0.01)
+    assert len(circle.polygon().exterior.coords) == 65
+    assert len(circle.polygon(4).exterior.coords) == 17
+    sets = [rng.normal(size=(n, 2)) for n in (3, 0, 7, 3, 1)]
+    circles = utils.enclosing_circles(sets)
+    assert circles.shape == (5, 3) and np.isnan(circles[1]).all()
+    for points, expected in zip(sets, circles):
+        if len(points):
+            assert np.allclose(make_circle(points.tolist()), expected)
+
+
+def test_enclosing_circle_brute_force(brute_force_mbc):
+    rng = np.random.RandomState(1)
+    for offset in ((0, 0), (174.78, -41.29), (1.75e6, 5.43e6), (3e5, 7e6)):
+        for _ in range(200):
+            n = rng.randint(1, 10)
+            scale = 10**rng.uniform(-3, 3)
+            points = offset + rng.normal(scale=scale, size=(n, 2))
+            if rng.rand() < 0.2:
+                # Repeated and collinear points
+                points[-1] = points[0]
+                points[1:n // 2] = points[0] + np.outer(
+                    rng.rand(len(points[1:n // 2])), [scale, scale])
+            circle = utils.enclosing_circle(points)
+            assert np.isclose(circle.radius, brute_force_mbc(points),
+                              rtol=1e-6, atol=1e-9 * scale)
+            assert (np.hypot(*(points - circle.centre).T) <=
+                    circle.radius * (1 + 1e-6)).all()
+    # The vectorised path, far from the origin
+    points = (1.75e6, 5.43e6) + rng.normal(
+        scale=100, size=(utils.ENCLOSING_CIRCLE_THRESHOLD + 10, 2))
+    circle = utils.enclosing_circle(points)
+    expected = make_circle((points - points.mean(axis=0)).tolist())
+    assert np.isclose(circle.radius, expected[2])
+
+
+def test_mbc_circle(location):
+    x, y, radius = location.mbc_circle
+    assert np.allclose(make_circle(location.coordinates[:, :2].tolist()),
+                       (x, y, radius))
+    assert location.mbc.equals(location.mbc_circle.polygon())
@@ -0,0 +1,85 @@
+"""Tests of `errorgeopy.metrics`.
+"""
+
+import urllib.request
+
+import geopy
+import pytest
+
+from errorgeopy import metrics
+from errorgeopy.cache import MemoryCache
+from errorgeopy.geocoders import GeocoderPool
+from errorgeopy.location import Location
+from errorgeopy.metrics import MetricsRegistry
+
+
+class FakeGeocoder(geopy.geocoders.base.Geocoder):
+
+    def geocode(self, query, **kwargs):
+        return geopy.Location(query, geopy.Point(-41.29, 174.78), {})
+
+
+@pytest.fixture
+def timing():
+    metrics.REGISTRY.reset()
+    metrics.enable_timing()
+    yield metrics.REGISTRY
+    metrics.disable_timing()
+    metrics.REGISTRY.reset()
+
+
+def test_render_pool_and_cache():
+    with GeocoderPool(
+            geocoders=[FakeGeocoder()], cache=MemoryCache(),
+            instrument=True) as gpool:
+        registry = MetricsRegistry()
+        registry.register_pool(gpool, 'test')
+        gpool.geocode('Oriental Bay, Wellington')
+        gpool.geocode('Oriental Bay, Wellington')
+        text = registry.render()
+    labels = '{method="geocode",pool="test",provider="FakeGeocoder"}'
+    assert 'errorgeopy_provider_requests_total' + labels + ' 1' in text
+    assert 'errorgeopy_provider_candidates_total' + labels + ' 1' in text
+    assert ('errorgeopy_provider_request_duration_seconds_bucket{le="+Inf",'
+            'method="geocode",pool="test",provider="FakeGeocoder"} 1') in text
+    assert ('errorgeopy_provider_request_duration_seconds_count' + labels +
+            ' 1') in text
+    assert 'errorgeopy_cache_hits_total{cache="test"} 1.0' in text
+    assert 'errorgeopy_cache_hit_ratio{cache="test"} 0.5' in text
+    assert '# TYPE errorgeopy_cache_hit_ratio gauge' in text
+
+
+def test_uninstrumented_pool_rejected():
+    with pytest.raises(ValueError):
+        MetricsRegistry().register_pool(GeocoderPool(geocoders=[FakeGeocoder()]))
+
+
+def test_timed_operations(timing):
+    points = [(-41.29, 174.78), (-41.3, 174.79), (-41.28, 174.8)]
+    location = Location(
+        [geopy.Location(str(p), geopy.Point(*p), {}) for p in points])
+    location.convex_hull
+    location.mbc
+    metrics.disable_timing()
+    location.mbc
+    text = timing.render()
+    assert ('errorgeopy_operation_duration_seconds_count'
+            '{kind="geometry",operation="mbc"} 1') in text
+    assert ('errorgeopy_operation_duration_seconds_count'
+            '{kind="geometry",operation="convex_hull"} 1') in text
+
+
+def test_serve():
+    registry = MetricsRegistry()
+    registry.observe('geometry', 'mbc', 0.01)
+    server = registry.serve()
+    try:
+        url = 'http://{}:{}/metrics'.format(*server.server_address)
+        with urllib.request.urlopen(url) as response:
+            assert response.headers['Content-Type'] == metrics.CONTENT_TYPE
+            body = response.read().decode('utf-8')
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert body == registry.render()
+    assert 'operation="mbc"' in body
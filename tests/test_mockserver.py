@@ -0,0 +1,85 @@
+"""End-to-end tests of `errorgeopy.geocoders.GeocoderPool` against
+`errorgeopy.mockserver.MockGeocodingServer`.
+"""
+
+import time
+
+import pytest
+
+from errorgeopy.geocoders import GeocoderPool
+from errorgeopy.mockserver import MockGeocodingServer, uniform
+
+
+@pytest.fixture
+def server():
+    with MockGeocodingServer(candidates=3, seed=1) as server:
+        yield server
+
+
+def test_geocode(server):
+    with GeocoderPool(server.config()) as gpool:
+        location = gpool.geocode('Oriental Bay, Wellington')
+        again = gpool.geocode('Oriental Bay, Wellington')
+    assert len(location) == 2
+    assert location.addresses == again.addresses
+    assert location.points == again.points
+    assert location.points[0] != location.points[1]
+    assert server.requests == {
+        ('Nominatim', 'geocode'): 2,
+        ('ArcGIS', 'geocode'): 2
+    }
+
+
+def test_canned_responses(server):
+    server.add_response('Oriental Bay', [('Oriental Bay, Wellington',
+                                          -41.2910862, 174.7882479)])
+    server.add_response('Nowhere', [], dialect='ArcGIS')
+    server.add_response((-41.2296258, 174.8828724),
+                        [('10 Aurora Street, Petone', -41.2296, 174.8828)])
+    with GeocoderPool(server.config()) as gpool:
+        location = gpool.geocode('Oriental Bay')
+        assert location.addresses == ['Oriental Bay, Wellington'] * 2
+        assert location.points[0].latitude == -41.2910862
+        assert len(gpool.geocode('Nowhere')) == 1
+        address = gpool.reverse((-41.2296258, 174.8828724))
+        assert [a.address for a in address.addresses
+                ] == ['10 Aurora Street, Petone'] * 2
+
+
+def test_geocoders(server):
+    geocoders = server.geocoders(['ArcGIS'])
+    assert geocoders[0].api.startswith(server.url)
+    with GeocoderPool(geocoders=geocoders) as gpool:
+        assert len(gpool.geocode('Oriental Bay')) == 1
+    assert len(geocoders[0].geocode('Oriental Bay', exactly_one=False)) == 3
+
+
+def test_errors():
+    with MockGeocodingServer(dialects={'ArcGIS': {'error_rate': 1}}) as server:
+        with GeocoderPool(server.config()) as gpool:
+            with pytest.warns(UserWarning, match='ArcGIS'):
+                location = gpool.geocode('Oriental Bay')
+    assert len(location) == 1
+    assert location.dropped == ['ArcGIS']
+    with MockGeocodingServer(error_rate=1, error_status=503) as server:
+        with GeocoderPool(server.config(['Nominatim'])) as gpool:
+            assert len(gpool.geocode('Oriental Bay')) == 0
+
+
+def test_latency():
+    with MockGeocodingServer(
+            latency=uniform(0.1, 0.2),
+            dialects={'Nominatim': {'latency': 0}}) as server:
+        with GeocoderPool(server.config()) as gpool:
+            start = time.monotonic()
+            location = gpool.geocode('Oriental Bay', timeout=0.05)
+            assert time.monotonic() - start < 0.1
+            assert location.dropped == ['ArcGIS']
+            start = time.monotonic()
+            assert len(gpool.geocode('Lambton Quay')) == 2
+            assert time.monotonic() - start >= 0.1
+
+
+def test_not_started():
+    with pytest.raises(RuntimeError):
+        MockGeocodingServer().url
@@ -0,0 +1,37 @@
+"""Tests of query normalisation with `errorgeopy.normalize.QueryNormalizer`.
+"""
+
+import geopy
+
+from errorgeopy.normalize import QueryNormalizer
+
+
+def test_forward_queries_collapse():
+    normalizer = QueryNormalizer()
+    queries = ('66 Great North Road, Grey Lynn', '66 great north rd grey lynn',
+               '  66 GREAT NORTH RD., Grey   Lynn ')
+    assert {normalizer.geocode(q) for q in queries} == {
+        '66 great north road grey lynn'
+    }
+    assert normalizer.normalize(queries[0], 'geocode') == normalizer.geocode(
+        queries[0])
+
+
+def test_forward_steps_configurable():
+    expand_nz = lambda q: q.replace('NZ', 'New Zealand')
+    normalizer = QueryNormalizer(
+        casefold=False, abbreviations=None, steps=[expand_nz])
+    assert normalizer.geocode('Oriental Bay,  Wellington, NZ') == (
+        'Oriental Bay Wellington New Zealand')
+    normalizer = QueryNormalizer(abbreviations={'vay': 'bay'})
+    assert normalizer.geocode('Oriental Vay') == 'oriental bay'
+
+
+def test_reverse_queries_quantized():
+    normalizer = QueryNormalizer(precision=4)
+    queries = ((-41.291086, 174.788248), [-41.2910862, 174.7882479],
+               geopy.Point(-41.29109, 174.78824), '-41.29108, 174.78824')
+    assert {normalizer.reverse(q) for q in queries} == {(-41.2911, 174.7882)}
+    assert normalizer.normalize(queries[0], 'reverse') == (-41.2911, 174.7882)
+    assert QueryNormalizer(precision=None).reverse(queries[1]) == (
+        -41.2910862, 174.7882479)
@@ -0,0 +1,139 @@
+"""Tests of the per-geocoder request policies in `errorgeopy.policies`.
+"""
+
+import time
+
+import pytest
+import geopy
+
+from errorgeopy.policies import TokenBucket, CircuitBreaker, RetryPolicy
+
+
+def test_token_bucket_burst():
+    bucket = TokenBucket(rate=10, burst=3)
+    assert [bucket.try_acquire() for _ in range(4)] == [True] * 3 + [False]
+    assert 0 < bucket.delay() <= 0.1
+    time.sleep(0.11)
+    assert bucket.try_acquire()
+
+
+def test_token_bucket_reserve():
+    bucket = TokenBucket(rate=20)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.05, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start == pytest.approx(0.15, abs=0.03)
+
+
+def test_token_bucket_refund():
+    bucket = TokenBucket(rate=1)
+    bucket.reserve()
+    assert bucket.reserve() > 0.9
+    bucket.refund()
+    bucket.refund()
+    bucket.refund()
+    # Refunds never fill the bucket beyond its burst
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+
+def test_token_bucket_from_config():
+    assert TokenBucket.from_config(None) is None
+    assert TokenBucket.from_config(2).rate == 2
+    bucket = TokenBucket.from_config({'rate': 0.5, 'burst': 2})
+    assert (bucket.rate, bucket.burst) == (0.5, 2)
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+
+def test_circuit_breaker_opens_on_failures():
+    breaker = CircuitBreaker(failure_rate=0.5, window=4, min_calls=2,
+                             reset_timeout=0.05)
+    assert breaker.allow()
+    breaker.record(True)
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    # Only one probe at a time
+    assert not breaker.allow()
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_circuit_breaker_slow_calls():
+    breaker = CircuitBreaker(min_calls=1, slow_call_duration=0.5)
+    breaker.record(True, 0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record(True, 1.0)
+    breaker.record(True, 1.0)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_circuit_breaker_release():
+    breaker = CircuitBreaker(min_calls=1, reset_timeout=0.05)
+    breaker.record(False)
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()
+    # An abandoned probe lets another through at once
+    breaker.release()
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_breaker_ignores_caller_errors():
+    breaker = CircuitBreaker()
+    assert breaker.ignores(geopy.exc.GeocoderQueryError('Bad query'))
+    assert not breaker.ignores(geopy.exc.GeocoderServiceError('Down'))
+    breaker = CircuitBreaker.from_config({'ignore': ['TypeError']})
+    assert breaker.ignores(TypeError())
+    assert not breaker.ignores(geopy.exc.GeocoderQueryError('Bad query'))
+
+
+def test_circuit_breaker_from_config():
+    assert CircuitBreaker.from_config(None) is None
+    assert CircuitBreaker.from_config({}).state == CircuitBreaker.CLOSED
+    assert CircuitBreaker.from_config({'min_calls': 1}).min_calls == 1
+
+
+def test_retry_policy_should_retry():
+    policy = RetryPolicy(max_attempts=3)
+    error = geopy.exc.GeocoderServiceError('Bad gateway')
+    assert policy.should_retry(error, 1)
+    assert policy.should_retry(ConnectionResetError(), 2)
+    assert not policy.should_retry(error, 3)
+    assert not policy.should_retry(geopy.exc.GeocoderQueryError('Bad'), 1)
+    assert not policy.should_retry(ValueError(), 1)
+
+
+def test_retry_policy_backoff():
+    policy = RetryPolicy(backoff=1, multiplier=2, max_backoff=5, jitter=False)
+    assert [policy.delay(a) for a in range(1, 5)] == [1, 2, 4, 5]
+    jittered = RetryPolicy(backoff=1, seed=1)
+    delays = [jittered.delay(a) for a in range(1, 5)]
+    replayed = RetryPolicy(backoff=1, seed=1)
+    assert delays == [replayed.delay(a) for a in range(1, 5)]
+    assert all(0 <= d <= 2**(a - 1) for a, d in enumerate(delays, 1))
+
+
+def test_retry_policy_from_config():
+    assert RetryPolicy.from_config(None) is None
+    policy = RetryPolicy.from_config({
+        'max_attempts': 5,
+        'retry_on': ['GeocoderTimedOut', 'ConnectionError']
+    })
+    assert policy.max_attempts == 5
+    assert policy.retry_on == (geopy.exc.GeocoderTimedOut, ConnectionError)
+    with pytest.raises(ValueError):
+        RetryPolicy(retry_on=['NotAnException'])
@@ -0,0 +1,797 @@
+"""Offline tests of `errorgeopy.geocoders.GeocoderPool` mechanics, using fake
+geocoders in place of remote services.
+"""
+
+import time
+import asyncio
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import geopy
+
+import errorgeopy.geocoders
+from errorgeopy.geocoders import Geocoder, GeocoderPool
+from errorgeopy.connection import KeepAliveOpener
+from errorgeopy.cache import MemoryCache
+from errorgeopy.normalize import QueryNormalizer
+from errorgeopy.policies import TokenBucket, CircuitBreaker, RetryPolicy
+
+
+class FakeGeocoder(geopy.geocoders.base.Geocoder):
+    """Answers every query with a single location, recording the thread it was
+    called from."""
+
+    def __init__(self, point=(-41.29, 174.78)):
+        super(FakeGeocoder, self).__init__()
+        self.point = point
+        self.threads = set()
+
+    def geocode(self, query, **kwargs):
+        self.threads.add(threading.current_thread().ident)
+        return geopy.Location(query, geopy.Point(*self.point), {})
+
+    def reverse(self, query, **kwargs):
+        self.threads.add(threading.current_thread().ident)
+        return geopy.Location('1 Fake Street', geopy.Point(*query), {})
+
+
+@pytest.fixture
+def fake_geocoder(monkeypatch):
+    fake = FakeGeocoder()
+    monkeypatch.setattr(Geocoder, 'geocoder', property(lambda self: fake))
+    return fake
+
+
+@pytest.fixture
+def config():
+    return {'Nominatim': {}, 'ArcGIS': {}}
+
+
+def test_executor_sized_to_geocoders(fake_geocoder, config):
+    with GeocoderPool(config) as gpool:
+        assert gpool.executor._max_workers == len(config)
+        assert gpool.executor is gpool.executor
+
+
+def test_executor_reused_across_queries(fake_geocoder, config):
+    with GeocoderPool(config) as gpool:
+        executor = gpool.executor
+        for _ in range(5):
+            res = gpool.geocode('Oriental Bay, Wellington')
+            assert isinstance(res, errorgeopy.location.Location)
+            assert len(res) == len(config)
+        assert gpool.executor is executor
+        assert len(fake_geocoder.threads) <= len(config)
+
+
+def test_close(fake_geocoder, config):
+    gpool = GeocoderPool(config)
+    executor = gpool.executor
+    gpool.close()
+    assert gpool.closed
+    with pytest.raises(RuntimeError):
+        executor.submit(lambda: None)
+    with pytest.raises(RuntimeError):
+        gpool.geocode('Oriental Bay, Wellington')
+
+
+def test_closed_pool_async(fake_geocoder, config):
+    for executor_used in (False, True):
+        gpool = GeocoderPool(config)
+        if executor_used:
+            gpool.geocode('Oriental Bay, Wellington')
+        gpool.close()
+        with pytest.raises(RuntimeError):
+            gpool.geocode('Lambton Quay, Wellington')
+        with pytest.raises(RuntimeError):
+            _run(gpool.ageocode('Lambton Quay, Wellington'))
+
+
+def test_shared_executor(fake_geocoder, config):
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        with GeocoderPool(config, executor=executor) as gpool1:
+            gpool2 = GeocoderPool(config, executor=executor)
+            assert gpool1.executor is gpool2.executor is executor
+            res = gpool2.reverse((-41.29, 174.78))
+            assert isinstance(res, errorgeopy.address.Address)
+        # Closing a pool leaves a shared executor running
+        assert executor.submit(lambda: 1).result() == 1
+        gpool2.close()
+
+
+def test_geocoder_built_once():
+    geocoder = Geocoder('Nominatim', {
+        'user_agent': 'errorgeopy-test',
+        'geocode': {
+            'exactly_one': False
+        }
+    })
+    assert geocoder.geocoder is geocoder.geocoder
+    assert geocoder._geocode_kwargs == {'exactly_one': False}
+
+
+def test_supplied_geocoders_are_used():
+    fakes = [FakeGeocoder(), FakeGeocoder(point=(-41.3, 174.8))]
+    with GeocoderPool(geocoders=fakes) as gpool:
+        assert [g.geocoder for g in gpool.geocoders] == fakes
+        res = gpool.geocode('Oriental Bay, Wellington')
+        assert len(res) == 2
+        assert all(fake.threads for fake in fakes)
+
+
+def test_default_opener_replaced_with_keep_alive():
+    fake = FakeGeocoder()
+    fake.urlopen = urllib.request.urlopen
+    geocoder = Geocoder('FakeGeocoder', None, geocoder=fake)
+    assert isinstance(geocoder.geocoder.urlopen, KeepAliveOpener)
+    assert geocoder.geocoder.urlopen is geocoder.geocoder.urlopen
+    fake = FakeGeocoder()
+    fake.urlopen = urllib.request.urlopen
+    fake.proxies = {'https': 'proxy.example.com:8080'}
+    geocoder = Geocoder('FakeGeocoder', None, geocoder=fake)
+    assert geocoder.geocoder.urlopen is urllib.request.urlopen
+
+
+def test_environment_proxies_keep_default_opener(monkeypatch):
+    monkeypatch.setenv('HTTPS_PROXY', 'http://proxy.example.com:8080')
+    fake = FakeGeocoder()
+    fake.urlopen = urllib.request.urlopen
+    geocoder = Geocoder('FakeGeocoder', None, geocoder=fake)
+    assert geocoder.geocoder.urlopen is urllib.request.urlopen
+
+
+class SleepyGeocoder(FakeGeocoder):
+    """Takes the number of seconds given in the query to answer it."""
+
+    def geocode(self, query, **kwargs):
+        time.sleep(float(query))
+        return super(SleepyGeocoder, self).geocode(query, **kwargs)
+
+
+def test_geocode_many_ordered():
+    queries = ['0.05', '0', '0.02', '0', '0.01']
+    with GeocoderPool(
+            geocoders=[SleepyGeocoder(), FakeGeocoder()],
+            max_workers=6) as gpool:
+        results = list(gpool.geocode_many(queries))
+    assert [q for q, _ in results] == queries
+    for query, res in results:
+        assert isinstance(res, errorgeopy.location.Location)
+        assert res.addresses == [query, query]
+
+
+def test_geocode_many_unordered():
+    queries = ['0.2', '0', '0']
+    with GeocoderPool(
+            geocoders=[SleepyGeocoder()], max_workers=3) as gpool:
+        results = list(gpool.geocode_many(queries, ordered=False))
+    assert sorted(q for q, _ in results) == sorted(queries)
+    assert results[-1][0] == '0.2'
+
+
+def test_geocode_many_bounded():
+    consumed = []
+
+    def queries():
+        for i in range(100):
+            consumed.append(i)
+            yield '0'
+
+    with GeocoderPool(geocoders=[SleepyGeocoder()]) as gpool:
+        results = gpool.geocode_many(queries(), max_pending=4)
+        next(results)
+        assert len(consumed) <= 5
+        assert len(list(results)) == 99
+
+
+def test_reverse_many():
+    points = [(-41.29, 174.78), (-37.8, 174.86)]
+    with GeocoderPool(geocoders=[FakeGeocoder()]) as gpool:
+        results = list(gpool.reverse_many(points))
+    assert [q for q, _ in results] == points
+    assert all(isinstance(r, errorgeopy.address.Address) for _, r in results)
+
+
+class CountingGeocoder(SleepyGeocoder):
+    """Records the greatest number of queries it was answering at once."""
+
+    def __init__(self, *args, **kwargs):
+        super(CountingGeocoder, self).__init__(*args, **kwargs)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def geocode(self, query, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            return super(CountingGeocoder, self).geocode(query, **kwargs)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_ageocode_and_areverse():
+    with GeocoderPool(geocoders=[FakeGeocoder(), FakeGeocoder()]) as gpool:
+        res = _run(gpool.ageocode('Oriental Bay, Wellington'))
+        assert isinstance(res, errorgeopy.location.Location)
+        assert len(res) == 2
+        res = _run(gpool.areverse((-41.29, 174.78)))
+        assert isinstance(res, errorgeopy.address.Address)
+        assert len(res.addresses) == 2
+
+
+def test_ageocode_many_concurrency_limit():
+    counting = CountingGeocoder()
+    gpool = GeocoderPool(
+        geocoders=[counting],
+        max_workers=8,
+        policies={'CountingGeocoder': {
+            'concurrency': 2
+        }})
+    # Distinct queries, so that they are not coalesced
+    queries = ['0.02' + '0' * i for i in range(8)]
+    results = _run(gpool.ageocode_many(queries, max_pending=8))
+    gpool.close()
+    assert [q for q, _ in results] == queries
+    assert all(len(r) == 1 for _, r in results)
+    assert counting.max_active == 2
+
+
+def test_ageocode_many_draws_queries_lazily():
+    counting = SlowCountingGeocoder()
+
+    def queries():
+        for i in range(6):
+            # No more than max_pending queries are drawn ahead of those made
+            assert counting.calls >= i - 2
+            yield 'Query {}'.format(i)
+
+    with GeocoderPool(geocoders=[counting], max_workers=4) as gpool:
+        results = _run(gpool.ageocode_many(queries(), max_pending=2))
+    assert [q for q, _ in results] == ['Query {}'.format(i) for i in range(6)]
+    assert counting.calls == 6
+
+
+def test_cancelled_coroutine_leaves_flight():
+    geocoder = SlowCountingGeocoder()
+    with GeocoderPool(geocoders=[geocoder], max_workers=2) as gpool:
+
+        async def clients():
+            patient = asyncio.ensure_future(gpool.ageocode('a'))
+            await asyncio.sleep(0.01)
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(gpool.ageocode('a'), 0.01)
+            counts = [flight[1] for flight in gpool._flights.values()]
+            return counts, await patient
+
+        counts, result = _run(clients())
+        assert counts == [1]
+        assert len(result) == 1
+        assert not gpool._flights
+    assert geocoder.calls == 1
+
+
+def test_concurrency_config():
+    gpool = GeocoderPool({'Nominatim': {'concurrency': 1}, 'ArcGIS': {}})
+    concurrency = {g.name: g.concurrency for g in gpool.geocoders}
+    assert concurrency == {'Nominatim': 1, 'ArcGIS': None}
+    assert all('concurrency' not in g.config for g in gpool.geocoders)
+
+
+def test_cache_skips_providers():
+    fake = FakeGeocoder()
+    cache = MemoryCache()
+    with GeocoderPool(geocoders=[fake], cache=cache) as gpool:
+        first = gpool.geocode('Oriental Bay, Wellington')
+        fake.threads.clear()
+        second = gpool.geocode('Oriental  Bay, Wellington')
+        assert not fake.threads
+        assert first.addresses == second.addresses
+        assert cache.stats['hits'] == 1
+        assert cache.stats['misses'] == 1
+        res = _run(gpool.ageocode('Oriental Bay, Wellington'))
+        assert res.addresses == first.addresses
+        assert not fake.threads
+
+
+class TimingGeocoder(FakeGeocoder):
+    """Records the time at which each query arrives."""
+
+    def __init__(self, *args, **kwargs):
+        super(TimingGeocoder, self).__init__(*args, **kwargs)
+        self.times = []
+
+    def geocode(self, query, **kwargs):
+        self.times.append(time.monotonic())
+        return super(TimingGeocoder, self).geocode(query, **kwargs)
+
+
+class LimitedGeocoder(TimingGeocoder):
+    """A `TimingGeocoder` (of its own class, to be given its own policies)."""
+
+
+def test_rate_limit_config():
+    gpool = GeocoderPool({
+        'Nominatim': {
+            'rate_limit': {
+                'rate': 1,
+                'burst': 1
+            }
+        },
+        'ArcGIS': {}
+    })
+    limits = {g.name: g.rate_limit for g in gpool.geocoders}
+    assert limits['Nominatim'].rate == 1
+    assert limits['ArcGIS'] is None
+
+
+def test_rate_limit_policies():
+    shared = TokenBucket(rate=1)
+    geocoders = [LimitedGeocoder(), LimitedGeocoder(), TimingGeocoder()]
+    with GeocoderPool(
+            geocoders=geocoders,
+            policies={'LimitedGeocoder': {
+                'rate_limit': shared,
+                'retry': {}
+            }}) as gpool:
+        assert [g.rate_limit for g in gpool.geocoders] == [
+            shared, shared, None
+        ]
+        assert gpool.geocoders[0].retry is not gpool.geocoders[1].retry
+        assert gpool.geocoders[2].retry is None
+    with pytest.raises(ValueError):
+        GeocoderPool(
+            geocoders=geocoders,
+            policies={'LimitedGeocoder': {
+                'rate': 1
+            }})
+    with pytest.raises(ValueError):
+        GeocoderPool({'Nominatim': {}}, policies={'Nominatim': {}})
+
+
+def test_rate_limited_batch():
+    limited, fast = LimitedGeocoder(), TimingGeocoder()
+    with GeocoderPool(
+            geocoders=[limited, fast],
+            max_workers=2,
+            policies={'LimitedGeocoder': {
+                'rate_limit': 5
+            }}) as gpool:
+        start = time.monotonic()
+        results = list(gpool.geocode_many(map(str, range(6)), max_pending=6))
+    assert [q for q, _ in results] == list(map(str, range(6)))
+    assert all(len(r) == 2 for _, r in results)
+    gaps = [b - a for a, b in zip(limited.times, limited.times[1:])]
+    assert min(gaps) >= 0.15
+    # The unlimited geocoder is not held up by the limited one (which takes
+    # a second over its six queries)
+    assert max(fast.times) - start < 0.5
+
+
+def test_rate_limited_query():
+    limited = LimitedGeocoder()
+    with GeocoderPool(
+            geocoders=[limited],
+            policies={'LimitedGeocoder': {
+                'rate_limit': 5
+            }}) as gpool:
+        for _ in range(3):
+            gpool.geocode('Oriental Bay, Wellington')
+        _run(gpool.ageocode('Oriental Bay, Wellington'))
+    gaps = [b - a for a, b in zip(limited.times, limited.times[1:])]
+    assert min(gaps) >= 0.15
+
+
+def test_rate_limited_query_holds_no_worker():
+    limited, fast = LimitedGeocoder(), TimingGeocoder()
+    with GeocoderPool(
+            geocoders=[limited, fast],
+            max_workers=1,
+            policies={'LimitedGeocoder': {
+                'rate_limit': 0.5
+            }}) as gpool:
+        gpool.geocode('Oriental Bay, Wellington')
+        start = time.monotonic()
+        res = gpool.geocode('Lambton Quay, Wellington', timeout=1)
+        # The limited geocoder's request waits (two seconds) for its token
+        # without occupying the only worker, so the other geocoder answers
+        # at once
+        assert res.dropped == ['LimitedGeocoder']
+        assert len(res) == 1
+        assert fast.times[-1] - start < 0.5
+    assert len(limited.times) == 1
+
+
+def test_abandoned_requests_refund_tokens():
+    limited = LimitedGeocoder()
+    with GeocoderPool(
+            geocoders=[limited],
+            policies={'LimitedGeocoder': {
+                'rate_limit': 1
+            }}) as gpool:
+        for i in range(30):
+            gpool.geocode('Query {}'.format(i), timeout=0.01)
+
+        async def clients():
+            for i in range(10):
+                with pytest.raises(asyncio.TimeoutError):
+                    await asyncio.wait_for(
+                        gpool.ageocode('Async query {}'.format(i)), 0.01)
+
+        _run(clients())
+        assert len(limited.times) == 1
+        # Only the request actually made has spent a token, so the provider
+        # is reachable again a second after it
+        time.sleep(max(0, limited.times[0] + 1.1 - time.monotonic()))
+        res = gpool.geocode('Oriental Bay, Wellington', timeout=1)
+        assert res.dropped == []
+        assert len(limited.times) == 2
+
+
+def test_deadline_drops_stragglers():
+    slow, fast = SleepyGeocoder(), FakeGeocoder()
+    with GeocoderPool(geocoders=[slow, fast]) as gpool:
+        start = time.monotonic()
+        res = gpool.geocode('1', timeout=0.1)
+        assert time.monotonic() - start < 0.6
+        assert len(res) == 1
+        assert res.dropped == ['SleepyGeocoder']
+        res = gpool.geocode('0.01', timeout=1)
+        assert len(res) == 2
+        assert res.dropped == []
+
+
+def test_deadline_keeps_cached_responses():
+    slow = SleepyGeocoder()
+    with GeocoderPool(geocoders=[slow], cache=MemoryCache()) as gpool:
+        assert len(gpool.geocode('0.01')) == 1
+        res = gpool.geocode('0.01', timeout=0)
+        assert len(res) == 1
+        assert res.dropped == []
+
+
+def test_first_k_providers():
+    geocoders = [SleepyGeocoder(), FakeGeocoder(), FakeGeocoder()]
+    with GeocoderPool(geocoders=geocoders) as gpool:
+        start = time.monotonic()
+        res = gpool.geocode('1', first=2)
+        assert time.monotonic() - start < 0.6
+        assert len(res) == 2
+        assert res.dropped == ['SleepyGeocoder']
+        res = gpool.reverse((-41.29, 174.78), first=1, timeout=1)
+        assert isinstance(res, errorgeopy.address.Address)
+        assert len(res.addresses) >= 1
+        assert len(res.addresses) + len(res.dropped) == 3
+
+
+class BrokenGeocoder(FakeGeocoder):
+    """Times out after a delay, until it is fixed."""
+
+    def __init__(self, *args, **kwargs):
+        super(BrokenGeocoder, self).__init__(*args, **kwargs)
+        self.broken = True
+        self.calls = 0
+
+    def geocode(self, query, **kwargs):
+        self.calls += 1
+        if self.broken:
+            time.sleep(0.05)
+            raise geopy.exc.GeocoderTimedOut('Service timed out')
+        return super(BrokenGeocoder, self).geocode(query, **kwargs)
+
+
+def test_circuit_breaker_skips_failing_provider():
+    broken = BrokenGeocoder()
+    breaker = CircuitBreaker(min_calls=2, reset_timeout=0.5)
+    with GeocoderPool(
+            geocoders=[broken, FakeGeocoder()],
+            policies={'BrokenGeocoder': {
+                'circuit_breaker': breaker
+            }}) as gpool:
+        for _ in range(2):
+            res = gpool.geocode('Oriental Bay, Wellington')
+            assert len(res) == 1
+            assert res.dropped == []
+        # Skipped without being queried
+        res = gpool.geocode('Oriental Bay, Wellington')
+        assert broken.calls == 2
+        assert res.dropped == ['BrokenGeocoder']
+        results = list(gpool.geocode_many(['a', 'b']))
+        assert [r.dropped for _, r in results] == [['BrokenGeocoder']] * 2
+        res = _run(gpool.ageocode('Oriental Bay, Wellington'))
+        assert res.dropped == ['BrokenGeocoder']
+        assert broken.calls == 2
+        # Re-admitted once it recovers
+        broken.broken = False
+        time.sleep(0.5)
+        res = gpool.geocode('Oriental Bay, Wellington')
+        assert len(res) == 2
+        assert res.dropped == []
+
+
+def test_circuit_breaker_abandoned_probe():
+    flaky = FlakyGeocoder(1)
+    with GeocoderPool(
+            geocoders=[flaky],
+            policies={
+                'FlakyGeocoder': {
+                    'circuit_breaker': {
+                        'min_calls': 1,
+                        'reset_timeout': 0.3
+                    },
+                    'rate_limit': 1
+                }
+            }) as gpool:
+        with pytest.warns(UserWarning):
+            gpool.geocode('Oriental Bay, Wellington')
+        time.sleep(0.35)
+        # The probe waits on the rate limit, and is abandoned before it is
+        # made; it must not hold the circuit half-open
+        res = gpool.geocode('Oriental Bay, Wellington', timeout=0.05)
+        assert res.dropped == ['FlakyGeocoder']
+        res = gpool.geocode('Oriental Bay, Wellington', timeout=1)
+        assert res.dropped == []
+        assert flaky.calls == 2
+    assert gpool.geocoders[0].circuit_breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_breaker_ignores_query_errors():
+    flaky = FlakyGeocoder(3, error=geopy.exc.GeocoderQueryError)
+    with GeocoderPool(
+            geocoders=[flaky],
+            policies={'FlakyGeocoder': {
+                'circuit_breaker': {
+                    'min_calls': 1
+                }
+            }}) as gpool:
+        for _ in range(3):
+            with pytest.warns(UserWarning):
+                gpool.geocode('Oriental Bay, Wellington')
+        assert gpool.geocoders[0].circuit_breaker.state == (
+            CircuitBreaker.CLOSED)
+        assert len(gpool.geocode('Oriental Bay, Wellington')) == 1
+
+
+def test_circuit_breaker_config():
+    gpool = GeocoderPool({'Nominatim': {'circuit_breaker': {}}, 'ArcGIS': {}})
+    breakers = {g.name: g.circuit_breaker for g in gpool.geocoders}
+    assert isinstance(breakers['Nominatim'], CircuitBreaker)
+    assert breakers['ArcGIS'] is None
+
+
+class FlakyGeocoder(FakeGeocoder):
+    """Fails the given number of times, and then recovers."""
+
+    def __init__(self, failures, error=geopy.exc.GeocoderServiceError):
+        super(FlakyGeocoder, self).__init__()
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def geocode(self, query, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error('Service unavailable')
+        return super(FlakyGeocoder, self).geocode(query, **kwargs)
+
+
+def test_retry_transient_errors():
+    flaky = FlakyGeocoder(2)
+    retry = RetryPolicy(max_attempts=3, backoff=0.01)
+    with GeocoderPool(
+            geocoders=[flaky, FakeGeocoder()],
+            policies={'FlakyGeocoder': {
+                'retry': retry
+            }}) as gpool:
+        res = gpool.geocode('Oriental Bay, Wellington')
+    assert flaky.calls == 3
+    assert len(res) == 2
+    assert res.dropped == []
+
+
+def test_failure_isolated_from_other_providers():
+    flaky = FlakyGeocoder(10, error=geopy.exc.GeocoderQueryError)
+    retry = RetryPolicy(max_attempts=3, backoff=0.01)
+    with GeocoderPool(
+            geocoders=[flaky, FakeGeocoder()],
+            policies={'FlakyGeocoder': {
+                'retry': retry
+            }}) as gpool:
+        with pytest.warns(UserWarning, match='FlakyGeocoder'):
+            res = gpool.geocode('Oriental Bay, Wellington')
+        assert flaky.calls == 1
+        assert len(res) == 1
+        assert res.dropped == ['FlakyGeocoder']
+        with pytest.warns(UserWarning):
+            results = list(gpool.geocode_many(['a', 'b']))
+        assert all(len(r) == 1 for _, r in results)
+        assert all(r.dropped == ['FlakyGeocoder'] for _, r in results)
+        with pytest.warns(UserWarning):
+            res = _run(gpool.ageocode('Oriental Bay, Wellington'))
+        assert res.dropped == ['FlakyGeocoder']
+
+
+def test_retry_config():
+    gpool = GeocoderPool({'Nominatim': {'retry': {'max_attempts': 2}}})
+    assert gpool.geocoders[0].retry.max_attempts == 2
+
+
+class SlowCountingGeocoder(FakeGeocoder):
+    """Counts queries, taking a little while to answer each."""
+
+    def __init__(self, *args, **kwargs):
+        super(SlowCountingGeocoder, self).__init__(*args, **kwargs)
+        self.calls = 0
+
+    def geocode(self, query, **kwargs):
+        self.calls += 1
+        time.sleep(0.1)
+        return super(SlowCountingGeocoder, self).geocode(query, **kwargs)
+
+
+def test_coalesce_concurrent_queries():
+    geocoder = SlowCountingGeocoder()
+    with GeocoderPool(geocoders=[geocoder], max_workers=4) as gpool:
+        with ThreadPoolExecutor(max_workers=4) as clients:
+            results = list(
+                clients.map(gpool.geocode, ['Oriental Bay, Wellington'] * 4))
+        assert geocoder.calls == 1
+        assert all(len(r) == 1 for r in results)
+
+        results = list(gpool.geocode_many(['a', 'a', 'b'], max_pending=3))
+        assert geocoder.calls == 3
+        assert [len(r) for _, r in results] == [1, 1, 1]
+
+        async def clients():
+            query = 'Oriental Bay, Wellington'
+            return await asyncio.gather(
+                *[gpool.ageocode(query) for _ in range(4)])
+
+        results = _run(clients())
+        assert geocoder.calls == 4
+        assert all(len(r) == 1 for r in results)
+
+
+def test_coalesced_query_survives_abandonment():
+    geocoder = SlowCountingGeocoder()
+    with GeocoderPool(geocoders=[geocoder], max_workers=1) as gpool:
+        with ThreadPoolExecutor(max_workers=2) as clients:
+            patient = clients.submit(gpool.geocode, 'a')
+            time.sleep(0.01)
+            impatient = gpool.geocode('a', timeout=0.01)
+            assert impatient.dropped == ['SlowCountingGeocoder']
+            assert len(patient.result()) == 1
+    assert geocoder.calls == 1
+
+
+def test_same_class_geocoders_kept_apart():
+    geocoders = [SlowCountingGeocoder(), SlowCountingGeocoder()]
+    cache = MemoryCache()
+    with GeocoderPool(geocoders=geocoders, cache=cache) as gpool:
+        assert len(gpool.geocode('Oriental Bay, Wellington')) == 2
+        assert [g.calls for g in geocoders] == [1, 1]
+        assert len(cache) == 2
+        assert len(gpool.geocode('Oriental Bay, Wellington')) == 2
+        assert [g.calls for g in geocoders] == [1, 1]
+
+
+def test_coalesce_disabled():
+    geocoder = SlowCountingGeocoder()
+    with GeocoderPool(
+            geocoders=[geocoder], max_workers=4, coalesce=False) as gpool:
+        with ThreadPoolExecutor(max_workers=4) as clients:
+            list(clients.map(gpool.geocode, ['a'] * 4))
+    assert geocoder.calls == 4
+
+
+class RecordingGeocoder(FakeGeocoder):
+    """Records the queries it receives."""
+
+    def __init__(self, *args, **kwargs):
+        super(RecordingGeocoder, self).__init__(*args, **kwargs)
+        self.queries = []
+
+    def geocode(self, query, **kwargs):
+        self.queries.append(query)
+        return super(RecordingGeocoder, self).geocode(query, **kwargs)
+
+    def reverse(self, query, **kwargs):
+        self.queries.append(query)
+        return super(RecordingGeocoder, self).reverse(query, **kwargs)
+
+
+def test_normalized_queries_share_cache():
+    geocoder = RecordingGeocoder()
+    with GeocoderPool(
+            geocoders=[geocoder],
+            cache=MemoryCache(),
+            normalizer=QueryNormalizer(precision=5)) as gpool:
+        gpool.geocode('66 Great North Road, Grey Lynn')
+        gpool.geocode('66 great north rd grey lynn')
+        list(gpool.geocode_many(['66 GREAT NORTH RD, GREY LYNN']))
+        _run(gpool.ageocode('66 Great North Rd., Grey Lynn'))
+        gpool.reverse((-41.291086213, 174.788247912))
+        gpool.reverse((-41.291086209, 174.788247899))
+    # Providers are sent the first of each set of equivalent queries, as given
+    assert geocoder.queries == [
+        '66 Great North Road, Grey Lynn', (-41.291086213, 174.788247912)
+    ]
+
+
+def test_normalized_queries_sent_as_given():
+    geocoder = RecordingGeocoder()
+    with GeocoderPool(
+            geocoders=[geocoder], normalizer=QueryNormalizer()) as gpool:
+        gpool.geocode('12 St Heliers Bay Rd, St Heliers')
+        list(gpool.geocode_many(['1 Dr Taylor Tce']))
+        _run(gpool.ageocode('2 Dr Taylor Tce'))
+    assert geocoder.queries == [
+        '12 St Heliers Bay Rd, St Heliers', '1 Dr Taylor Tce',
+        '2 Dr Taylor Tce'
+    ]
+
+
+class EmptyGeocoder(FakeGeocoder):
+    """Finds nothing."""
+
+    def geocode(self, query, **kwargs):
+        return None
+
+
+def test_instrumented_pool():
+    broken = BrokenGeocoder()
+    flaky = FlakyGeocoder(1, error=geopy.exc.GeocoderQueryError)
+    geocoders = [FakeGeocoder(), EmptyGeocoder(), broken, flaky]
+    with GeocoderPool(geocoders=geocoders, instrument=True) as gpool:
+        events = []
+        gpool.add_hook(events.append)
+        with pytest.warns(UserWarning, match='FlakyGeocoder'):
+            gpool.geocode('Oriental Bay, Wellington')
+        gpool.remove_hook(events.append)
+        gpool.geocode('Oriental Bay, Wellington')
+        stats = gpool.stats.snapshot()
+    assert len(events) == 4
+    assert {e.provider for e in events} == set(stats)
+    assert all(e.method == 'geocode' for e in events)
+    assert stats['FakeGeocoder']['geocode']['requests'] == 2
+    assert stats['FakeGeocoder']['geocode']['candidates'] == 2
+    assert stats['EmptyGeocoder']['geocode']['empty'] == 2
+    assert stats['BrokenGeocoder']['geocode']['timeouts'] == 2
+    assert stats['FlakyGeocoder']['geocode']['errors'] == 1
+    latency = stats['BrokenGeocoder']['geocode']['latency']
+    assert latency['count'] == 2
+    assert latency['sum'] >= 0.1
+    assert latency['buckets'][0.05] == 0
+    assert latency['buckets']['+Inf'] == 2
+
+
+def test_uninstrumented_pool(fake_geocoder, config):
+    with GeocoderPool(config) as gpool:
+        gpool.geocode('Oriental Bay, Wellington')
+        assert gpool.stats is None
+
+
+def test_candidate_providers():
+    with GeocoderPool(
+            geocoders=[FakeGeocoder(), EmptyGeocoder(), RecordingGeocoder()]
+    ) as gpool:
+        expected = ['FakeGeocoder', 'RecordingGeocoder']
+        assert gpool.geocode('Oriental Bay').providers == expected
+        assert [r.providers for _, r in gpool.geocode_many(['a', 'b'])
+                ] == [expected] * 2
+        assert _run(gpool.ageocode('Oriental Bay')).providers == expected
+        assert gpool.reverse((-41.29, 174.78)).providers == [
+            'FakeGeocoder', 'EmptyGeocoder', 'RecordingGeocoder'
+        ]
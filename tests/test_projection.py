@@ -0,0 +1,102 @@
+"""Tests of `errorgeopy.projection`, and of the metric error measures of
+`errorgeopy.location.Location`.
+"""
+
+import threading
+
+import geopy
+import geopy.distance
+import numpy as np
+
+from errorgeopy import projection, utils
+from errorgeopy.location import Location, LocationBatch
+
+
+def _location(points):
+    return Location([
+        geopy.Location('Candidate {}'.format(i), geopy.Point(lat, lon), {})
+        for i, (lat, lon) in enumerate(points)
+    ])
+
+
+def test_crs_selection():
+    assert projection.utm_crs(174.78, -41.29) == 32760
+    assert projection.utm_crs(-0.13, 51.5) == 32630
+    assert projection.utm_crs(180, 0) == 32601
+    wellington = [(174.78, -41.29), (174.9, -41.2)]
+    assert projection.local_crs(wellington) == 32760
+    country = [(166.5, -46.5), (178.5, -37.5)]
+    crs = projection.local_crs(country)
+    assert crs.startswith('+proj=aeqd') and '+lat_0=-42.0' in crs
+    assert projection.local_crs([(0, 85), (1, 86)]).startswith('+proj=aeqd')
+    assert projection.local_crs(np.zeros((0, 3))) is None
+    # Sets crossing the antimeridian span a few degrees, not the globe
+    chatham = [(179.8, -44.0), (-179.9, -44.1), (-179.5, -43.9)]
+    assert projection.local_crs(chatham) == 32701
+    assert np.ptp(projection.project(chatham, 32701)[:, 0]) < 1e5
+    fiji = [(170, -17), (-170, -18)]
+    crs = projection.local_crs(fiji)
+    assert '+lon_0=180.0' in crs or '+lon_0=-180.0' in crs
+
+
+def test_project():
+    lonlat = np.array([(174.78, -41.29, 0), (174.9, -41.2, 0)])
+    for crs in (2193, projection.local_crs(lonlat),
+                projection.azimuthal_crs(174.8, -41.2)):
+        xy = projection.project(lonlat, crs)
+        assert xy.shape == (2, 2)
+        assert np.allclose(projection.unproject(xy, crs), lonlat[:, :2])
+        expected = geopy.distance.geodesic((-41.29, 174.78), (-41.2, 174.9)).m
+        assert abs(np.hypot(*(xy[1] - xy[0])) - expected) < expected * 1e-3
+    assert projection.project(np.zeros((0, 2)), 2193).shape == (0, 2)
+
+
+def test_transformers_cached_per_thread():
+    transformer = projection.get_transformer(projection.WGS84, 2193)
+    assert projection.get_transformer(projection.WGS84, 2193) is transformer
+    assert utils.get_proj(2193) is transformer
+    other = []
+    thread = threading.Thread(target=lambda: other.append(
+        projection.get_transformer(projection.WGS84, 2193)))
+    thread.start()
+    thread.join()
+    assert other[0] is not transformer
+
+
+def test_metric_measures():
+    rng = np.random.RandomState(0)
+    points = rng.normal([-41.29, 174.78], 0.01, size=(20, 2))
+    location = _location(points)
+    assert location.crs == 32760
+    projected = location.projected()
+    assert projected.shape == (20, 2) and not projected.flags.writeable
+    assert location.projected(2193).shape == (20, 2)
+    batch = LocationBatch.from_locations([location])
+    assert np.isclose(location.mbc_radius, batch.mbc_radii[0], rtol=1e-3)
+    assert np.isclose(location.hull_area, batch.hull_areas[0], rtol=2e-3)
+    assert location.cluster_count(1e5) == 1
+    assert location.cluster_count(0) == 20
+    assert location.cluster_count(1000) == batch.cluster_counts(1000)[0]
+    assert _location(points[:1]).mbc_radius == 0
+    assert _location(points[:1]).hull_area == 0
+    assert Location([]).mbc_radius is None
+    nztm = location._tuple_points(epsg=2193)
+    assert len(nztm[0]) == 3
+    assert 1.7e6 < nztm[0][0] < 1.8e6 and 5.4e6 < nztm[0][1] < 5.5e6
+    assert location._shapely_points(epsg=2193)[0].coords[0] == nztm[0]
+
+
+def test_mbc_radius_small_sets(brute_force_mbc):
+    rng = np.random.RandomState(0)
+    locations = []
+    for _ in range(300):
+        size = (rng.randint(3, 10), 2)
+        points = rng.normal([-41.29, 174.78], 0.01, size=size)
+        location = _location(points)
+        assert np.isclose(location.mbc_radius,
+                          brute_force_mbc(location.projected()), rtol=1e-6)
+        locations.append(location)
+    # The batch's equirectangular projection and the UTM zone differ in
+    # scale by up to a few parts in ten thousand
+    radii = LocationBatch.from_locations(locations).mbc_radii
+    assert np.allclose([l.mbc_radius for l in locations], radii, rtol=3e-3)
@@ -0,0 +1,40 @@
+"""Tests of `errorgeopy.stats`.
+"""
+
+import geopy
+
+from errorgeopy.stats import Histogram, PoolStats, RequestEvent
+
+
+def test_histogram():
+    histogram = Histogram([1, 0.1])
+    for value in (0.05, 0.1, 0.5, 2):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot['buckets'] == {0.1: 2, 1: 3, '+Inf': 4}
+    assert snapshot['count'] == 4
+    assert snapshot['sum'] == 2.65
+
+
+def test_pool_stats():
+    stats = PoolStats(buckets=[1])
+    stats.record(RequestEvent('Nominatim', 'geocode', 'a', 0.5, 3, None))
+    stats.record(RequestEvent('Nominatim', 'geocode', 'b', 2, 0, None))
+    stats.record(
+        RequestEvent('Nominatim', 'reverse', (0, 0), 1.5, 0,
+                     geopy.exc.GeocoderTimedOut()))
+    stats.record(
+        RequestEvent('ArcGIS', 'geocode', 'a', 0.1, 0,
+                     geopy.exc.GeocoderServiceError()))
+    snapshot = stats.snapshot()
+    assert set(snapshot) == {'Nominatim', 'ArcGIS'}
+    geocode = snapshot['Nominatim']['geocode']
+    assert geocode['requests'] == 2
+    assert geocode['candidates'] == 3
+    assert geocode['empty'] == 1
+    assert geocode['latency']['buckets'] == {1: 1, '+Inf': 2}
+    assert snapshot['Nominatim']['reverse']['timeouts'] == 1
+    assert snapshot['Nominatim']['reverse']['empty'] == 0
+    assert snapshot['ArcGIS']['geocode']['errors'] == 1
+    stats.reset()
+    assert stats.snapshot() == {}